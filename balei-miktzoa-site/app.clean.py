@@ -1,10 +1,8 @@
 # === Imports (clean) ===
-import os, re, ssl, json, time, math, smtplib, secrets, unicodedata, mimetypes, hashlib, threading, logging, copy
-from io import BytesIO
+import os, re, ssl, json, time, math, smtplib, secrets, unicodedata, mimetypes, hashlib, threading, copy, functools, stat
 from pathlib import Path
 from datetime import datetime, timedelta, date, timezone, time as dt_time
 from zoneinfo import ZoneInfo
-from collections import defaultdict
 from typing import Any
 from urllib.parse import urlparse, parse_qs, urljoin
 
@@ -12,12 +10,14 @@ from collections import Counter
 
 from flask import (
     Flask, render_template, request, redirect, url_for, flash, g, jsonify,
-    session, send_from_directory, Response, current_app, abort
+    session, send_from_directory, send_file, Response, current_app, abort, stream_with_context
 )
+from markupsafe import Markup, escape
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.routing import BuildError
+from werkzeug.http import is_resource_modified
 
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -36,11 +36,26 @@ except ImportError:  # Python < 3.9 or zoneinfo backport not installed
         """Fallback exception type when zoneinfo is unavailable."""
 
 
-from threading import Lock
 from services.ai_writer import generate_draft
 from services.ai_variants import list_variants, assign_variant
 from services.worker_descriptions import generate_worker_descriptions
-from services.json_store import atomic_write_json
+from services import json_codec
+from services.worker_catalog import WorkerCatalog
+from services.storage import open_repository
+from services.request_registry import RequestRegistry
+from services.job_store import JobStore
+from services import analytics_rollup
+from services.analytics_rollup import AnalyticsRollups
+from services.analytics_series import BUCKETS as SERIES_BUCKETS, SeriesIndex
+from services import analytics_export
+from services.event_log import BufferedEventWriter
+from services.view_dedup import ViewDedup
+from services import user_agent
+from services.log_rotation import LogMaintenance
+from services.review_index import ReviewIndex, parse_review_date
+from services import image_variants
+from services.image_pool import ImagePool, PoolBusy
+from services.image_variants import CONTENT_TYPES as IMG_CONTENT_TYPES, VariantCache, render_variant
 from services.translation import translate as translate_text
 
 
@@ -51,12 +66,6 @@ load_dotenv()
 GOOGLE_WEBHOOK_URL = os.environ.get("GOOGLE_WEBHOOK_URL", "").strip()
 GOOGLE_WEBHOOK_SECRET = os.environ.get("GOOGLE_WEBHOOK_SECRET", "")
 
-# === Locks ===
-DESCRIPTION_JOB_LOCK = Lock()
-
-DESCRIPTION_JOBS: dict[str, dict] = {}
-DESCRIPTION_JOB_BY_REQ: dict[str, str] = {}
-
 
 # ------------------------------
 # קבועים כלליים (שפה/בניית קישורי סטטיק)
@@ -398,10 +407,101 @@ DATA_FOLDER = str(BASE_DIR / 'data')
 # === Analytics (אירועים) ===
 ANALYTICS_DIR = os.path.join(DATA_FOLDER, 'analytics')
 os.makedirs(ANALYTICS_DIR, exist_ok=True)
+# סיכומים יומיים (data/analytics/rollups) – ימים סגורים נסכמים פעם אחת, רק היום הנוכחי נסרק חי.
+# בתוך הבקשות הסריקה טורית; סריקה מקבילית (process pool) רק ב-scripts/rollup_analytics.py
+ANALYTICS_ROLLUPS = AnalyticsRollups(ANALYTICS_DIR)
+# סדרות זמן לכל בעל מקצוע – מערכים יומיים מחושבים מראש מעל הסיכומים
+ANALYTICS_SERIES = SeriesIndex(ANALYTICS_ROLLUPS)
+SERIES_MAX_DAYS = int(os.environ.get('ANALYTICS_SERIES_MAX_DAYS', '1830'))
+SERIES_MAX_WORKERS = int(os.environ.get('ANALYTICS_SERIES_MAX_WORKERS', '500'))
+# כתיבת אירועי מעקב ברקע (תור חסום + כתיבה במנות) – /api/track לא נוגע בדיסק
+ANALYTICS_WRITER = BufferedEventWriter(
+    max_queue=int(os.environ.get('ANALYTICS_QUEUE_SIZE', '10000')),
+    batch_size=int(os.environ.get('ANALYTICS_BATCH_SIZE', '500')),
+    flush_interval=float(os.environ.get('ANALYTICS_FLUSH_MS', '1000')) / 1000.0,
+    policy=os.environ.get('ANALYTICS_DROP_POLICY', 'drop_new'),
+)
+# דחיסת ימים סגורים (gzip/zstd), גלגול events.log ושמירה לפי ימים לכל זרם (0 = לתמיד)
+LOG_MAINTENANCE_SECONDS = int(os.environ.get('LOG_MAINTENANCE_SECONDS', '3600'))
+LOG_MAINTENANCE = LogMaintenance(
+    ANALYTICS_DIR,
+    rollup_dir=ANALYTICS_ROLLUPS.rollup_dir,
+    rolling_logs=(os.path.join(DATA_FOLDER, 'events.log'),),
+    codec=os.environ.get('LOG_COMPRESSION', 'gzip'),
+    analytics_retain_days=int(os.environ.get('ANALYTICS_RETAIN_DAYS', '0')),
+    rollup_retain_days=int(os.environ.get('ANALYTICS_ROLLUP_RETAIN_DAYS', '0')),
+    # events.log כבר לא נכתב (/api/track כותב לאנליטיקס) – ההיסטוריה הישנה נשמרת אלא אם הוגדר אחרת
+    rolling_retain_days=int(os.environ.get('EVENTS_LOG_RETAIN_DAYS', '0')),
+    rolling_max_bytes=int(float(os.environ.get('EVENTS_LOG_MAX_MB', '50')) * 1024 * 1024),
+)
+
+
+def _maintain_logs_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            LOG_MAINTENANCE.run()
+        except Exception as e:
+            app.logger.warning(f"log maintenance failed: {e}")
+
+
+if LOG_MAINTENANCE_SECONDS > 0:
+    threading.Thread(
+        target=_maintain_logs_forever,
+        args=(LOG_MAINTENANCE_SECONDS,),
+        name='log-maintenance',
+        daemon=True,
+    ).start()
+
+# מניעת ספירה כפולה של צפיות (sid, worker) בחלון של 30 דק' – בצד השרת, משותף לכל התהליכים
+VIEW_DEDUP = ViewDedup(
+    os.environ.get('VIEW_DEDUP_DB') or os.path.join(DATA_FOLDER, 'view_dedup.sqlite3'),
+    window=30 * 60,
+)
+
+# שכבת אחסון: json (ברירת מחדל, pending/approved/worker_reviews.json תחת data) או sqlite (WAL, קובץ אחד עם אינדקסים)
+# מעבר ל-sqlite: python scripts/migrate_storage.py import --apply ואז STORAGE_BACKEND=sqlite
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+# JSON_GROUP_COMMIT_MS>0: כתיבות במקביל לאותו קובץ מאוחדות לכתיבה אחת (fsync אחד) בחלון הזמן הזה
+JSON_GROUP_COMMIT_MS = float(os.environ.get('JSON_GROUP_COMMIT_MS', '0') or 0)
+STORAGE = open_repository(
+    STORAGE_BACKEND, DATA_FOLDER, os.environ.get('STORAGE_SQLITE_PATH') or None,
+    group_commit_window=JSON_GROUP_COMMIT_MS / 1000.0,
+)
+
+# קטלוג עובדים מאושרים בזיכרון – נטען מחדש רק כשהנתונים משתנים
+WORKER_CATALOG = WorkerCatalog(STORAGE.collection('workers'))
+# אינדקס ביקורות לפי עובד (ממוצע, כמות, אחרונה) – נבנה פעם אחת לכל גרסת נתונים
+REVIEW_INDEX = ReviewIndex(STORAGE.collection('reviews'))
+
+# משימות יצירת תיאור (AI) – טבלה משותפת לכל תהליכי gunicorn, כך שסטטוס נראה מכל worker
+DESCRIPTION_JOB_TTL_SECONDS = int(os.environ.get('DESCRIPTION_JOB_TTL_SECONDS', '3600'))
+DESCRIPTION_JOBS = JobStore(
+    os.environ.get('DESCRIPTION_JOBS_DB') or os.path.join(DATA_FOLDER, 'jobs.sqlite3'),
+    ttl=DESCRIPTION_JOB_TTL_SECONDS,
+    kind='description',
+)
+
+# ביקורות חדשות/תרגומים נכתבים כשורה ביומן (journal) – כאן מקפלים אותו לקובץ הראשי מדי פעם
+REVIEW_JOURNAL_COMPACT_SECONDS = int(os.environ.get('REVIEW_JOURNAL_COMPACT_SECONDS', '300'))
+
+
+def _compact_review_journal_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            STORAGE.compact('reviews', on_commit=REVIEW_INDEX.record_rewrite)
+        except Exception as e:
+            app.logger.warning(f"review journal compaction failed: {e}")
 
-# קובצי pending ו-approved שמאחסנים בקשות ועובדים מאושרים
-PENDING_FILE = os.path.join(DATA_FOLDER, 'pending.json')
-APPROVED_FILE = os.path.join(DATA_FOLDER, 'approved.json')
+
+if REVIEW_JOURNAL_COMPACT_SECONDS > 0:
+    threading.Thread(
+        target=_compact_review_journal_forever,
+        args=(REVIEW_JOURNAL_COMPACT_SECONDS,),
+        name='review-journal-compactor',
+        daemon=True,
+    ).start()
 
 # תיקיית ההעלאות (תמונות/וידאו) בתוך static/upload_pending
 UPLOAD_FOLDER = str(BASE_DIR / 'static' / 'upload_pending')
@@ -675,30 +775,6 @@ def localize_service_slug(service_key: str, lang: str) -> str:
     return to_kebab_slug(label)
 
 
-# ------------------------------
-# עזרי קריאה/כתיבה קבצים
-# ------------------------------
-def read_json_file(path):
-    if not os.path.exists(path):
-        return []
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def write_json_file(path, data):
-    target = Path(path)
-    if isinstance(data, list):
-        with atomic_write_json(target, default_factory=list) as container:
-            container.clear()
-            container.extend(data)
-    elif isinstance(data, dict):
-        with atomic_write_json(target, default_factory=dict) as container:
-            container.clear()
-            container.update(data)
-    else:
-        raise TypeError("write_json_file supports only list or dict payloads")
-
-
 def _now_iso() -> str:
     ts = datetime.now(timezone.utc).isoformat()
     return ts.replace("+00:00", "Z")
@@ -868,20 +944,38 @@ def get_cities_in_radius(base_city, radius_km):
     return cities_in_range
 
 
-def get_latest_review(worker_id, lang='he'):
-    reviews_file = os.path.join(DATA_FOLDER, 'worker_reviews.json')
-    if not os.path.exists(reviews_file):
-        return None
+@functools.lru_cache(maxsize=4096)
+def _cities_within(base_city, radius_km):
+    return tuple(get_cities_in_radius(base_city, radius_km))
+
+
+def _worker_listing_field(w):
+    return _canon_he_field(w.get("field") or w.get("field_he") or "")
+
+
+def _worker_coverage(w):
+    """כל הערים שבהן העובד מופיע ברשימות: עיר בסיס, ערים פעילות, וערים ברדיוס."""
+    base_city = (w.get("base_city") or "").strip()
+    cities = [base_city] if base_city else []
+    cities.extend(c for c in (w.get("active_cities") or []) if isinstance(c, str))
     try:
-        with open(reviews_file, 'r', encoding='utf-8') as f:
-            all_reviews = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return None
-    worker_reviews = [r for r in all_reviews if str(r.get('worker_id')) == str(worker_id)]
-    if not worker_reviews:
+        r = int(w.get("work_radius") or 0)
+    except (TypeError, ValueError):
+        r = 0
+    if r > 0 and base_city in cities_coords:
+        cities.extend(_cities_within(base_city, r))
+    return cities
+
+
+# אינדקס (תחום, עיר) → עובדים – נבנה יחד עם הקטלוג בכל טעינה
+WORKER_CATALOG.configure(field_key=_worker_listing_field, coverage=_worker_coverage)
+
+
+def get_latest_review(worker_id, lang='he'):
+    latest = REVIEW_INDEX.stats(worker_id).latest
+    if not latest:
         return None
-    worker_reviews.sort(key=lambda x: x.get('date', ''), reverse=True)
-    latest = worker_reviews[0]
+    latest = dict(latest)
     # אם יש תרגומים שמורים ב־JSON
     if 'translations' in latest and lang in latest['translations']:
         latest['text'] = latest['translations'][lang]
@@ -890,26 +984,7 @@ def get_latest_review(worker_id, lang='he'):
 
 def _parse_review_date(value: Any) -> datetime | None:
     """Parse review date strings into datetime objects."""
-    if not value:
-        return None
-    if isinstance(value, datetime):
-        return value
-    if isinstance(value, date):
-        return datetime.combine(value, dt_time.min)
-    if not isinstance(value, str):
-        return None
-    cleaned = value.strip()
-    if not cleaned:
-        return None
-    cleaned = cleaned.replace('Z', '+00:00')
-    try:
-        return datetime.fromisoformat(cleaned)
-    except ValueError:
-        try:
-            base = cleaned.split('.')[0]
-            return datetime.fromisoformat(base)
-        except ValueError:
-            return None
+    return parse_review_date(value)
 
 
 def _format_review_date(
@@ -949,32 +1024,8 @@ def _format_review_date(
 
 
 def get_all_reviews(worker_id, lang=None):
-    """ מחזיר את כל הביקורות עבור עובד לפי worker_id. פרמטר lang נשמר כדי להתאים לקריאות קיימות אך אינו בשימוש. """
-    reviews_file = os.path.join(DATA_FOLDER, 'worker_reviews.json')
-    if not os.path.exists(reviews_file):
-        return []
-    try:
-        with open(reviews_file, 'r', encoding='utf-8') as f:
-            all_reviews = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
-    # השוואה כ-string כדי למנוע בעיות עם סוגי נתונים שונים
-    worker_id_str = str(worker_id)
-    reviews = [r for r in all_reviews if str(r.get('worker_id')) == worker_id_str]
-
-    def _review_sort_key(item):
-        if isinstance(item, dict):
-            dt = _parse_review_date(item.get('date'))
-            if dt is not None:
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                else:
-                    dt = dt.astimezone(timezone.utc)
-                return (1, dt.timestamp())
-        return (0, float('-inf'))
-
-    reviews.sort(key=_review_sort_key, reverse=True)
-    return reviews
+    """ מחזיר את כל הביקורות עבור עובד לפי worker_id (חדשות תחילה, מתוך האינדקס). פרמטר lang נשמר כדי להתאים לקריאות קיימות אך אינו בשימוש. """
+    return REVIEW_INDEX.reviews_for(worker_id)
 
 
 def translate_review(text, source_lang='he', target_langs=['en','ru']):
@@ -1068,36 +1119,34 @@ def _analytics_daily_path(dt=None):
 
 def log_analytics_event(event: str, worker_id: str, page_path: str = None) -> bool:
     """ רושם אירוע לוג יומי ב-JSON Lines.
-    - צפיות בפרופיל (view) נספרות פעם ב-30 דק' פר סשן לעובד.
+    - צפיות בפרופיל (view) נספרות פעם ב-30 דק' פר סשן לעובד (VIEW_DEDUP, לא בעוגייה).
     - קליקים נספרים תמיד.
+    - סוג הדפדפן (uc: b=בוט, a=in-app, m=מובייל, d=דסקטופ) נשמר ברשומה; בוטים לא נספרים בסיכומים.
     """
     if not worker_id:
         return False
 
-    if event == 'view':
-        last_views = session.get('last_views', {})
-        now = time.time()
-        key = f'v:{worker_id}'
-        prev = last_views.get(key, 0)
-        if now - prev < 30 * 60:
-            return False
-        last_views[key] = now
-        session['last_views'] = last_views
+    ua = request.headers.get('User-Agent', '')
+    uc = user_agent.classify(ua)
+    if event == 'view' and uc != user_agent.BOT:
+        sid = session.get('sid')
+        if sid:
+            try:
+                if not VIEW_DEDUP.first_seen(sid, worker_id):
+                    return False
+            except Exception as e:
+                app.logger.warning(f"view dedup failed: {e}")
 
     rec = {
         "ts": datetime.utcnow().isoformat(timespec='seconds') + 'Z',
         "event": event,
         "worker_id": str(worker_id),
         "sid": session.get('sid'),
-        "ua": request.headers.get('User-Agent', '')[:200],
+        "ua": ua[:200],
+        "uc": uc,
         "path": page_path or request.path
     }
-    try:
-        with open(_analytics_daily_path(), 'a', encoding='utf-8') as f:
-            f.write(json.dumps(rec, ensure_ascii=False) + '\n')
-        return True
-    except Exception:
-        return False
+    return ANALYTICS_WRITER.submit(_analytics_daily_path(), rec)
 
 
 
@@ -1511,7 +1560,7 @@ def load_translations(lang):
         file_name = f"{endpoint}.json"
         path = os.path.join(TRANSLATIONS_FOLDER, lang, file_name)
         with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            return json_codec.load(f)
     except:
         return {}
 
@@ -1529,7 +1578,7 @@ def _load_bundle(lang: str, bundle: str) -> dict:
     try:
         path = os.path.join(TRANSLATIONS_FOLDER, lang, f"{bundle}.json")
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            return json_codec.load(f)
     except Exception:
         return {}
     
@@ -1636,7 +1685,7 @@ app.config['PREFERRED_URL_SCHEME'] = 'https'
 @app.after_request
 def _force_img_content_type(resp):
     """
-    רץ על כל תגובה; אם הנתיב הוא /img/... – מכריח Content-Type של תמונה
+    רץ על כל תגובה; אם הנתיב הוא /img/... – מכריח Content-Type של תמונה (לא בתגובות שגיאה)
     ומוסיף דגלים שמונעים מ-after_request אחרים (כמו inline CSS) לגעת בזה.
     בנוסף מוסיף כותרות דיבאג.
     """
@@ -1648,9 +1697,19 @@ def _force_img_content_type(resp):
         # נוודא שאפשר לשנות את הגוף/כותרות (למקרה של passthrough)
         resp.direct_passthrough = False
 
-        # אם בטעות נהיה text/html או משהו שלא image/* – תקן לפי הפרמטרים/Accept
+        # תגובות שגיאה (404/500/503 "Image service busy") הן טקסט – לא מתייגים אותן כתמונה ולא שומרים במטמון לשנה
+        if resp.status_code >= 400:
+            resp.headers["X-Bypass-Inline"] = "1"
+            resp.headers["X-Content-Type-Options"] = "nosniff"
+            resp.headers.setdefault("Cache-Control", "no-store")
+            resp.headers["X-Which-After"] = "_force_img_content_type"
+            return resp
+
+        # אם בטעות נהיה text/html או משהו שלא image/* – תקן לפי הפרמטרים/Accept (304 נשאר בלי גוף ובלי סוג)
         ct = (resp.headers.get("Content-Type") or "").lower()
-        if not ct.startswith("image/"):
+        if resp.status_code == 304:
+            resp.headers.pop("Content-Type", None)
+        elif not ct.startswith("image/"):
             fmt_req = (request.args.get("format") or "auto").lower()
             accept = (request.headers.get("Accept") or "").lower()
 
@@ -1679,20 +1738,53 @@ def _force_img_content_type(resp):
 
 
 
+# מטמון וריאנטים של /img בדיסק (LRU לפי גודל) + מהירות קידוד WebP (0=מהיר ... 6=הכי איטי)
+IMG_VARIANTS = VariantCache(
+    os.environ.get('IMG_CACHE_DIR') or os.path.join(DATA_FOLDER, 'img_cache'),
+    max_bytes=int(os.environ.get('IMG_CACHE_MAX_MB', '512')) * 1024 * 1024,
+)
+IMG_WEBP_METHOD = max(0, min(int(os.environ.get('IMG_WEBP_METHOD', '4')), 6))
+# רוחבים ואיכויות מותרים – w/h/q מוצמדים לשלב הקרוב, כך שמספר הווריאנטים לכל תמונה חסום
+IMG_WIDTHS = image_variants.parse_steps(os.environ.get('IMG_WIDTHS'), image_variants.DEFAULT_WIDTHS)
+IMG_QUALITIES = image_variants.parse_steps(os.environ.get('IMG_QUALITIES'), image_variants.DEFAULT_QUALITIES)
+# עיבוד תמונות (Pillow) רץ במאגר threads חסום ולא על threads של הבקשות; וריאנט זהה מחושב פעם אחת.
+# כשהתור מלא – 503 מהיר עם Retry-After, כדי שדפי HTML לא ייתקעו בזמן חימום המטמון
+IMG_POOL = ImagePool(
+    workers=int(os.environ.get('IMG_WORKERS', '2')),
+    max_pending=int(os.environ.get('IMG_MAX_PENDING', '16')),
+    wait=float(os.environ.get('IMG_WAIT_SECONDS', '10')),
+)
+IMG_RETRY_AFTER = os.environ.get('IMG_RETRY_AFTER', '2')
+
+
+def _render_img_variant(key, src_path, w, h, fit, q, fmt_out):
+    """ רץ בתוך IMG_POOL: מייצר את הווריאנט ושומר במטמון; מחזיר (bytes, נשמר?) """
+    data = render_variant(src_path, w, h, fit, q, fmt_out, webp_method=IMG_WEBP_METHOD)
+    return data, IMG_VARIANTS.put(key, fmt_out, data) is not None
+
+
 @csrf.exempt
 @app.route("/img/<path:filename>")
 def img_proxy(filename):
     # פרמטרים
-    w = request.args.get("w", type=int)
-    h = request.args.get("h", type=int)
+    # פרמטרים (מוצמדים לשלבים המותרים: רוחב כלפי מעלה, איכות לקרובה ביותר)
+    w, h = image_variants.snap_size(request.args.get("w", type=int), request.args.get("h", type=int), IMG_WIDTHS)
     fit = (request.args.get("fit") or "cover").lower()
-    q = max(1, min(request.args.get("q", default=80, type=int), 95))
+    if fit not in image_variants.FITS:
+        fit = "cover"
+    q = image_variants.snap(request.args.get("q", default=80, type=int), IMG_QUALITIES, up=False)
     fmt_req = (request.args.get("format") or "auto").lower()
 
-    # קובץ מקור בתוך static
+    # קובץ מקור בתוך static (בלי לצאת מהתיקייה)
     safe = filename.lstrip("/").replace("\\", "/")
     src_path = os.path.join(app.static_folder, safe)
-    if not os.path.isfile(src_path):
+    static_root = os.path.realpath(app.static_folder)
+    try:
+        inside = os.path.commonpath([static_root, os.path.realpath(src_path)]) == static_root
+        src_stat = os.stat(src_path) if inside else None
+    except (OSError, ValueError):
+        src_stat = None
+    if src_stat is None or not stat.S_ISREG(src_stat.st_mode):
         resp = Response(b"Not Found", 404, {
             "Content-Type": "text/plain; charset=utf-8",
             "X-Bypass-Inline": "1",
@@ -1706,53 +1798,58 @@ def img_proxy(filename):
         fmt_out = "WEBP" if "image/webp" in accept else "JPEG"
     else:
         fmt_out = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}.get(fmt_req, "JPEG")
-    ct = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}[fmt_out]
-
-    # עיבוד ושינוי גודל
-    try:
-        with Image.open(src_path) as im:
-            if fmt_out == "JPEG":
-                if im.mode in ("RGBA", "LA"):
-                    bg = Image.new("RGB", im.size, (255, 255, 255))
-                    bg.paste(im, mask=im.split()[-1])
-                    im = bg
-                else:
-                    im = im.convert("RGB")
-            else:
-                if im.mode not in ("RGB", "RGBA"):
-                    im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
-
-            if w or h:
-                if not w and h:
-                    w = int(h * (im.width / im.height))
-                if not h and w:
-                    h = int(w / (im.width / im.height))
-                size = (w or im.width, h or im.height)
-                out = ImageOps.contain(im, size, Image.LANCZOS) if fit == "contain" \
-                      else ImageOps.fit(im, size, Image.LANCZOS, centering=(0.5, 0.5))
-            else:
-                out = im
-
-            buf = BytesIO()
-            save_kwargs = {}
-            if fmt_out == "JPEG":
-                save_kwargs.update(quality=q, optimize=True, progressive=False)
-            elif fmt_out == "WEBP":
-                save_kwargs.update(quality=q, method=6)
-            elif fmt_out == "PNG":
-                save_kwargs.update(optimize=True)
-            out.save(buf, fmt_out, **save_kwargs)
-            buf.seek(0)
-    except Exception:
-        resp = Response(b"Image processing error", 500, {
-            "Content-Type": "text/plain; charset=utf-8",
-            "X-Bypass-Inline": "1",
-        })
+    ct = IMG_CONTENT_TYPES[fmt_out]
+
+    # מטמון וריאנטים בדיסק: מפתח = (קובץ מקור + mtime/size, w, h, fit, q, פורמט)
+    key = IMG_VARIANTS.key(src_path, src_stat, w, h, fit, q, fmt_out, extra=f"m{IMG_WEBP_METHOD}")
+
+    # GET מותנה: ETag חזק = זהות המקור + פרמטרי ההמרה, Last-Modified = mtime של המקור.
+    # התאמה מחזירה 304 עוד לפני פתיחת התמונה
+    etag = key[:32]
+    last_modified = datetime.fromtimestamp(int(src_stat.st_mtime), timezone.utc)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        resp.last_modified = last_modified
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        resp.headers["Vary"] = "Accept"
         resp.headers["X-Which-Route"] = "/img"
         return resp
 
+    cached = IMG_VARIANTS.get(key, fmt_out)
+    data = resp = None
+    if cached is not None:
+        try:
+            resp = send_file(cached, mimetype=ct, conditional=False, etag=False)
+            resp.headers["X-Img-Cache"] = "HIT"
+        except OSError:
+            cached = None  # נמחק ע"י eviction בין הבדיקה לפתיחה
+    if resp is None:
+        # עיבוד ושינוי גודל (במאגר התמונות; בקשות מקבילות לאותו וריאנט ממתינות לאותה עבודה)
+        try:
+            data, stored = IMG_POOL.run(key, _render_img_variant, key, src_path, w, h, fit, q, fmt_out)
+        except PoolBusy:
+            resp = Response(b"Image service busy, retry shortly", 503, {
+                "Content-Type": "text/plain; charset=utf-8",
+                "X-Bypass-Inline": "1",
+            })
+            resp.headers["Retry-After"] = IMG_RETRY_AFTER
+            resp.headers["Cache-Control"] = "no-store"
+            resp.headers["X-Which-Route"] = "/img"
+            return resp
+        except Exception:
+            resp = Response(b"Image processing error", 500, {
+                "Content-Type": "text/plain; charset=utf-8",
+                "X-Bypass-Inline": "1",
+            })
+            resp.headers["X-Which-Route"] = "/img"
+            return resp
+        resp = Response(data, mimetype=ct)
+        resp.headers["X-Img-Cache"] = "MISS" if stored else "BYPASS"
+
     # תגובה: MIME נכון + דגלים + דיבאג
-    resp = Response(buf.getvalue(), mimetype=ct)
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
     resp.headers["Content-Type"] = ct
     resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
     resp.headers["X-Content-Type-Options"] = "nosniff"
@@ -1894,12 +1991,15 @@ def api_diag_img_proxy():
 
 @app.route("/static/<path:filename>", endpoint="static")
 def serve_static(filename):
-    resp = send_from_directory(STATIC_DIR, filename)
+    # send_from_directory מטפל ב-ETag/Last-Modified וב-If-None-Match/If-Modified-Since (304 בלי גוף).
+    # כתובת עם ?v= (static_url) משתנה בכל העלאת ASSETS_V – אפשר לשמור שנה; בלי גרסה – אימות מחדש בכל פעם
+    versioned = bool(request.args.get("v"))
+    resp = send_from_directory(STATIC_DIR, filename, max_age=31536000 if versioned else 0)
     guessed = mimetypes.guess_type(filename)[0]
-    if guessed:
+    if guessed and resp.status_code != 304:
         resp.headers["Content-Type"] = guessed
     resp.headers["X-Bypass-Inline"] = "1"
-    resp.headers.setdefault("Cache-Control", "public, max-age=31536000, immutable")
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable" if versioned else "public, no-cache"
     resp.headers["X-Content-Type-Options"] = "nosniff"
     return resp
 
@@ -1987,11 +2087,15 @@ OG_IMAGES_READY = False
 
 @app.before_request
 def _ensure_og_images_once():
+    # ברקע, במאגר התמונות – הבקשה לא ממתינה. אם המאגר מלא ננסה שוב בבקשה הבאה
     global OG_IMAGES_READY
     if OG_IMAGES_READY:
         return
-    for lang in OG_LANGS:
-        ensure_og_image(lang)
+    try:
+        for lang in OG_LANGS:
+            IMG_POOL.submit(("og", lang), ensure_og_image, lang)
+    except PoolBusy:
+        return
     OG_IMAGES_READY = True
 
 # -------- SEO: Meta defaults (OG/Twitter/Canonical) --------
@@ -2024,7 +2128,7 @@ def load_reviews_keys(lang):
     try:
         path = os.path.join(TRANSLATIONS_FOLDER, lang, 'reviews_keys.json')
         with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            return json_codec.load(f)
     except:
         return {}
 
@@ -2044,6 +2148,8 @@ def set_language():
     # --- מזהה סשן אנונימי (למניעת ספירה כפולה + ניתוחים) ---
     if 'sid' not in session:
         session['sid'] = secrets.token_hex(16)
+    # עוגיות ישנות נשאו מילון צפיות שגדל ללא הגבלה – כעת הספירה בצד השרת
+    session.pop('last_views', None)
 
     # טעינת תרגומים רגילים + מפתחות ביקורות
     g.translations = load_translations(lang)
@@ -2381,6 +2487,7 @@ def request_professional(lang):
 
         # בניית הרשומה החדשה לפנדינג
         new_request = {
+            "request_id": secrets.token_hex(8),   # מזהה יציב לניהול (אישור/מחיקה/טיוטות)
             "company_name": company_name,
             "name": name,
             "field":    i18n_field["he"],
@@ -2405,8 +2512,9 @@ def request_professional(lang):
         }
 
         # שמירה לפנדינג
-        with atomic_write_json(Path(PENDING_FILE), default_factory=list) as pending_list:
-            pending_list.append(new_request)
+        edit = REQUEST_REGISTRY.edit('pending')
+        edit.inserted(new_request)
+        STORAGE.insert('pending', new_request, on_commit=edit.on_commit)
 
         flash("הבקשה נשלחה בהצלחה! תודה רבה.")
         # שומרים את ה-key גם בחזרה, כדי שהעמוד יישאר נגיש ברענון
@@ -2463,19 +2571,9 @@ def show_workers(lang, field, area):
     search_field = resolved_field_he
     search_area  = resolved_area_he
 
-    # טעינת עובדים וסינון
-    all_workers = read_json_file(APPROVED_FILE)
-    if search_area:
-        workers = [
-            w for w in all_workers
-            if w.get('field') == search_field and (
-                w.get('base_city') == search_area or
-                search_area in w.get('active_cities', []) or        # רשימה שנשמרה
-                _in_radius(w, search_area)                           # 👈 בדיקה דינמית
-            )
-        ]
-    else:
-        workers = [w for w in all_workers if w.get('field') == search_field]
+    # טעינת עובדים מהאינדקס (תחום, עיר) – עיר בסיס / ערים פעילות / רדיוס מחושבים מראש
+    listing_field = _canon_he_field(search_field)
+    workers = WORKER_CATALOG.listing(listing_field, search_area)
 
     for w in workers:
         ensure_worker_languages(w)
@@ -2497,7 +2595,7 @@ def show_workers(lang, field, area):
     translation_file = os.path.join(TRANSLATIONS_FOLDER, lang, 'show_workers.json')
     if os.path.exists(translation_file):
         with open(translation_file, 'r', encoding='utf-8') as f:
-            translations = json.load(f)
+            translations = json_codec.load(f)
     default_template = translations.get('default_tagline', 'Professional in the field of {field}')
 
     # עיבוד נתונים לתצוגה
@@ -2535,15 +2633,10 @@ def show_workers(lang, field, area):
         elif lang == 'ru':
             w['experience_text'] = f"{w.get('experience')} лет опыта" if w.get('experience') else "Опыт не указан"
 
-        # דירוג ממוצע + מספר ביקורות
-        reviews = get_all_reviews(w.get('worker_id'), lang)
-        w['reviews_count'] = 0
-        if reviews:
-            ratings = [r['rating'] for r in reviews if r.get('rating') is not None]
-            w['reviews_count'] = len([r for r in reviews if r.get('rating') is not None])
-            w['rating'] = round(sum(ratings) / len(ratings), 1) if ratings else None
-        else:
-            w['rating'] = None
+        # דירוג ממוצע + מספר ביקורות (מהאינדקס – בלי לקרוא את קובץ הביקורות)
+        review_stats = REVIEW_INDEX.stats(w.get('worker_id'))
+        w['reviews_count'] = review_stats.rated_count
+        w['rating'] = round(review_stats.rating, 1) if review_stats.rating is not None else None
 
         latest_review = get_latest_review(w.get('worker_id'), lang) or {}
         w['latest_review'] = (latest_review.get('text') or '').strip()
@@ -2696,9 +2789,7 @@ def show_workers(lang, field, area):
 
     city_counter: Counter[str] = Counter()
     total_workers_in_field = 0
-    for candidate in all_workers:
-        if candidate.get('field') != search_field:
-            continue
+    for candidate in WORKER_CATALOG.listing(listing_field):
         total_workers_in_field += 1
         raw_cities = []
         service_areas = candidate.get('service_areas') or []
@@ -2806,28 +2897,10 @@ def service_landing(lang, service, area):
 
 
 
-def _in_radius(worker: dict, area_he: str) -> bool:
-    if not worker or not area_he:
-        return False
-    base = worker.get('base_city')
-    r = int(worker.get('work_radius') or 0)
-    if not base or r <= 0:
-        return False
-    if base in cities_coords and area_he in cities_coords:
-        (lat1, lon1) = cities_coords[base]
-        (lat2, lon2) = cities_coords[area_he]
-        return haversine(lat1, lon1, lat2, lon2) <= r
-    return False
-
-
-
-
-
 @app.route('/<lang>/worker/<worker_id>/reviews')
 def worker_reviews(lang, worker_id):
     # --- איתור העובד ---
-    all_workers = read_json_file(APPROVED_FILE)
-    worker = next((w for w in all_workers if str(w.get('worker_id')) == str(worker_id)), None)
+    worker = WORKER_CATALOG.get(worker_id)
     if not worker:
         return "Worker not found", 404
 
@@ -2958,42 +3031,16 @@ def worker_reviews(lang, worker_id):
 
 
     # --- ביקורות + חישוב ממוצע (הקריטי ל-HERO) ---
-    reviews_file = os.path.join(DATA_FOLDER, 'worker_reviews.json')
-    all_reviews  = read_json_file(reviews_file)
-    reviews      = [r for r in all_reviews if str(r.get('worker_id')) == str(worker_id)]
-
-    # סדר כרונולוגי: ביקורות חדשות תחילה על בסיס שדה התאריך
-    def _review_sort_key(item):
-        if isinstance(item, dict):
-            dt = _parse_review_date(item.get('date'))
-            if dt is not None:
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                else:
-                    dt = dt.astimezone(timezone.utc)
-                return (1, dt.timestamp())
-        return (0, float('-inf'))
-
-    reviews.sort(key=_review_sort_key, reverse=True)
-
-    ratings = []
+    # האינדקס מחזיק את הביקורות כבר ממוינות (חדשות תחילה) ואת הממוצע
+    review_stats = REVIEW_INDEX.stats(worker_id)
+    reviews = [dict(r) for r in review_stats.reviews]
     for r in reviews:
         # טקסט לפי שפה
         r['display_text'] = (r.get('translations', {}) or {}).get(lang) or r.get('text', '')
-        # דירוג מספרי (תמיכה גם בפסיק)
-        raw = r.get('rating')
-        if raw is None:
-            continue
-        try:
-            val = float(str(raw).replace(',', '.'))
-        except (TypeError, ValueError):
-            continue
-        if 0 <= val <= 5:
-            ratings.append(val)
 
-    if ratings:
-        worker['rating'] = round(sum(ratings) / len(ratings), 2)
-        worker['reviews_count'] = len(ratings)
+    if review_stats.rated_count:
+        worker['rating'] = round(review_stats.rating, 2)
+        worker['reviews_count'] = review_stats.rated_count
     else:
         worker['rating'] = None
         worker['reviews_count'] = 0
@@ -3063,7 +3110,7 @@ def worker_reviews(lang, worker_id):
 
 @app.route('/<lang>/add-review', methods=['GET', 'POST'])
 def add_review(lang):
-    all_workers = read_json_file(APPROVED_FILE)
+    all_workers = WORKER_CATALOG.all()
     success_message = None
 
     if request.method == 'POST':
@@ -3078,7 +3125,6 @@ def add_review(lang):
 
         # מזהה ייחודי לביקורת כדי לעדכן אותה אח"כ ברקע
         review_id    = secrets.token_hex(8)
-        reviews_file = os.path.join(DATA_FOLDER, 'worker_reviews.json')
 
         # כותבים מיידית את הרשומה (מהיר) — תרגומים נבצע ברקע
         new_review = {
@@ -3091,10 +3137,11 @@ def add_review(lang):
             "date":      datetime.now().isoformat()
         }
 
-        # כתיבה מוגנת מנעילה כדי למנוע דריסות בקבצים
-        # כתיבה מוגנת מנעילה כדי למנוע דריסות בקבצים
-        with atomic_write_json(Path(reviews_file), default_factory=list) as reviews_list:
-            reviews_list.insert(0, new_review)
+        # כתיבה מוגנת (בראש הרשימה – החדשה ראשונה) + עדכון האינדקס בזיכרון
+        STORAGE.insert(
+            'reviews', new_review, first=True,
+            on_commit=functools.partial(REVIEW_INDEX.record_insert, new_review),
+        )
 
         # סנכרון לשיטס (Webhook) - לא חוסם את הזרימה
         def _sync_to_sheets_async(_review: dict, _lang: str):
@@ -3116,18 +3163,17 @@ def add_review(lang):
 
 
         # ---- תרגום ברקע + עדכון הרשומה בקובץ ----
-        def _patch_translations_async(_rid: str, _text: str, _path: str):
+        def _patch_translations_async(_rid: str, _text: str):
             try:
                 # משתמש בפונקציה הגלובלית translate_review שכבר קיימת למעלה בקובץ
                 trans = translate_review(_text)  # {'he':..., 'en':..., 'ru':...}
             except Exception:
                 trans = {"he": _text}
             try:
-                with atomic_write_json(Path(_path), default_factory=list) as cur:
-                    for r in cur:
-                        if r.get("review_id") == _rid:
-                            r["translations"] = trans
-                            break
+                STORAGE.update(
+                    'reviews', {"review_id": _rid}, {"translations": trans},
+                    on_commit=functools.partial(REVIEW_INDEX.record_patch, _rid, {"translations": trans}),
+                )
             except Exception as e:
                 # לוג “best effort” אם תרצה לעקוב אחרי תקלות
                 try:
@@ -3138,7 +3184,7 @@ def add_review(lang):
 
         threading.Thread(
             target=_patch_translations_async,
-            args=(review_id, text, reviews_file),
+            args=(review_id, text),
             daemon=True
         ).start()
 
@@ -3252,21 +3298,30 @@ def _request_id_for_item(item: dict) -> str:
     return rid
 
 
+# מזהה בקשה → (pending/approved, מיקום) – חיפוש O(1); כתיבות דרך REQUEST_REGISTRY.edit()
+# מעדכנות את המפה במקום, וכתיבה מתהליך אחר גורמת לבנייה מחדש בחיפוש הבא
+REQUEST_REGISTRY = RequestRegistry(
+    {"pending": STORAGE.collection('pending'), "approved": STORAGE.collection('workers')},
+    id_for=lambda item: _request_id_for_item(dict(item)),
+)
+_STORE_COLLECTION = {"pending": "pending", "approved": "workers"}
+
+
 def _resolve_request_record(req_id: str):
-    req_id = (req_id or "").strip()
-    if not req_id:
+    """(record_type, position, item) לפי מזהה יציב, או None."""
+    located = REQUEST_REGISTRY.locate(req_id)
+    if not located:
         return None
+    return located.store, located.position, located.record
 
-    pending_list = read_json_file(PENDING_FILE)
-    for idx, item in enumerate(pending_list):
-        if _request_id_for_item(item) == req_id:
-            return "pending", pending_list, idx, item
-
-    approved_list = read_json_file(APPROVED_FILE)
-    for idx, item in enumerate(approved_list):
-        if _request_id_for_item(item) == req_id:
-            return "approved", approved_list, idx, item
 
+def _position_in(records: list, req_id: str, hint: int | None = None) -> int | None:
+    """מיקום הרשומה ברשימה – קודם לפי הרמז מהרישום, ורק אם זז – סריקה."""
+    if hint is not None and 0 <= hint < len(records) and _request_id_for_item(dict(records[hint])) == req_id:
+        return hint
+    for idx, record in enumerate(records):
+        if _request_id_for_item(dict(record)) == req_id:
+            return idx
     return None
 
 
@@ -3274,8 +3329,8 @@ def _get_request_snapshot(req_id: str):
     resolved = _resolve_request_record(req_id)
     if not resolved:
         return None
-    record_type, _, _, item = resolved
-    safe_copy = json.loads(json.dumps(item, ensure_ascii=False, default=str))
+    record_type, _, item = resolved
+    safe_copy = json_codec.to_plain(item)
     return record_type, safe_copy
 
 
@@ -3284,49 +3339,34 @@ def _persist_description_result(req_id: str, result: dict, generated_at: str):
     if not resolved:
         return
 
-    record_type, _, _, _ = resolved
-    safe_result = json.loads(json.dumps(result or {}, ensure_ascii=False, default=str))
-
-    path = Path(PENDING_FILE if record_type == "pending" else APPROVED_FILE)
-    with atomic_write_json(path, default_factory=list) as records:
-        for idx, record in enumerate(records):
-            if _request_id_for_item(record) == req_id:
-                record["description_generated_at"] = generated_at
-                record["description_variants"] = safe_result
-                if isinstance(safe_result, dict):
-                    record["description_used_fields"] = safe_result.get("used_fields") or {}
-                record["request_id"] = _request_id_for_item(record)
-                records[idx] = record
-                break
+    record_type, hint, _ = resolved
+    safe_result = json_codec.to_plain(result or {})
 
-
-def _set_job_status(job_id: str, status: str, **extra):
-    with DESCRIPTION_JOB_LOCK:
-        job = DESCRIPTION_JOBS.get(job_id)
-        if not job:
-            return
-        job["status"] = status
-        job.update(extra)
-        job["updated_at"] = time.time()
+    edit = REQUEST_REGISTRY.edit(record_type)
+    with STORAGE.mutate(_STORE_COLLECTION[record_type], on_commit=edit.on_commit) as records:
+        idx = _position_in(records, req_id, hint)
+        if idx is not None:
+            record = records[idx]
+            record["description_generated_at"] = generated_at
+            record["description_variants"] = safe_result
+            if isinstance(safe_result, dict):
+                record["description_used_fields"] = safe_result.get("used_fields") or {}
+            record["request_id"] = _request_id_for_item(record)
+            edit.updated(idx, record)
 
 
-def _prune_old_jobs(max_age_seconds: int = 3600):
-    cutoff = time.time() - max_age_seconds
-    with DESCRIPTION_JOB_LOCK:
-        to_drop: list[tuple[str, str | None]] = []
-        for job_id, meta in list(DESCRIPTION_JOBS.items()):
-            ts = meta.get("updated_at") or meta.get("created_at") or 0
-            if ts < cutoff:
-                to_drop.append((job_id, meta.get("req_id")))
-        for job_id, req in to_drop:
-            DESCRIPTION_JOBS.pop(job_id, None)
-            if req and DESCRIPTION_JOB_BY_REQ.get(req) == job_id:
-                DESCRIPTION_JOB_BY_REQ.pop(req, None)
+def _set_job_status(job_id: str, status: str, expected=("queued", "running"), **extra) -> bool:
+    """מעבר סטטוס אטומי – רק ממצב צפוי (done/error לא נדרסים ע"י running מאוחר)."""
+    try:
+        return DESCRIPTION_JOBS.transition(job_id, status, expected, **extra)
+    except Exception as e:
+        app.logger.warning(f"job status update failed ({job_id} -> {status}): {e}")
+        return False
 
 
 @app.route('/admin')
 def admin():
-    pending_list = read_json_file(PENDING_FILE)
+    pending_list = STORAGE.load('pending')
     for item in pending_list:
         item['_request_id'] = _request_id_for_item(item)
         variants = item.get('description_variants')
@@ -3342,27 +3382,23 @@ def admin_generate_description(req_id):
         return jsonify({"ok": False, "error": "not_found"}), 404
 
     record_type, snapshot = snapshot_info
-    _prune_old_jobs()
-
-    job_id = secrets.token_hex(12)
-    now_ts = time.time()
-    with DESCRIPTION_JOB_LOCK:
-        DESCRIPTION_JOBS[job_id] = {
-            "req_id": req_id,
-            "status": "queued",
-            "result": None,
-            "error": None,
-            "created_at": now_ts,
-            "updated_at": now_ts,
-            "record_type": record_type,
-        }
-        DESCRIPTION_JOB_BY_REQ[req_id] = job_id
+    DESCRIPTION_JOBS.prune()
+
+    # לחיצה חוזרת על אותה בקשה בזמן שמשימה רצה (בכל תהליך) → מחזירים את הקיימת
+    job, created = DESCRIPTION_JOBS.start(req_id, record_type)
+    job_id = job["job_id"]
+    if not created:
+        return jsonify({"ok": True, "job_id": job_id, "status": job["status"],
+                        "record_type": job.get("record_type") or record_type, "reused": True})
 
     def _runner():
-        _set_job_status(job_id, "running")
+        if not _set_job_status(job_id, "running", expected=("queued",)):
+            return
         try:
-            result = generate_worker_descriptions(snapshot)
-            safe_result = json.loads(json.dumps(result, ensure_ascii=False, default=str))
+            # ההפקה עלולה להימשך יותר מ-stale_after – פעימות שומרות על המשימה חיה
+            with DESCRIPTION_JOBS.keepalive(job_id):
+                result = generate_worker_descriptions(snapshot)
+            safe_result = json_codec.to_plain(result)
             generated_at = _now_iso()
             _set_job_status(job_id, "done", result=safe_result, generated_at=generated_at)
             _persist_description_result(req_id, safe_result, generated_at)
@@ -3380,16 +3416,10 @@ def admin_description_status(req_id):
     record_type = None
     item = None
     if resolved:
-        record_type, _, _, item = resolved
-        item = json.loads(json.dumps(item, ensure_ascii=False, default=str))
+        record_type, _, item = resolved
+        item = json_codec.to_plain(item)
 
-    job_snapshot = None
-    with DESCRIPTION_JOB_LOCK:
-        job_id = DESCRIPTION_JOB_BY_REQ.get(req_id)
-        if job_id and job_id in DESCRIPTION_JOBS:
-            snap = DESCRIPTION_JOBS[job_id].copy()
-            snap['job_id'] = job_id
-            job_snapshot = snap
+    job_snapshot = DESCRIPTION_JOBS.latest_for(req_id)
 
     response: dict[str, Any] = {"ok": True, "req_id": req_id, "record_type": record_type}
 
@@ -3434,7 +3464,7 @@ def admin_select_description(req_id):
     if not resolved:
         return jsonify({"ok": False, "error": "not_found"}), 404
 
-    record_type, _, _, _ = resolved
+    record_type, hint, _ = resolved
 
     if not source:
         source = 'manual'
@@ -3449,23 +3479,20 @@ def admin_select_description(req_id):
 
     job_result = None
     generated_at = None
-    with DESCRIPTION_JOB_LOCK:
-        job_id = DESCRIPTION_JOB_BY_REQ.get(req_id)
-        if job_id:
-            job_meta = DESCRIPTION_JOBS.get(job_id)
-            if job_meta:
-                job_result = job_meta.get('result')
-                generated_at = job_meta.get('generated_at')
-
-    path = Path(PENDING_FILE if record_type == 'pending' else APPROVED_FILE)
+    job_meta = DESCRIPTION_JOBS.latest_for(req_id)
+    if job_meta:
+        job_result = job_meta.get('result')
+        generated_at = job_meta.get('generated_at')
+
     updated_item = None
-    with atomic_write_json(path, default_factory=list) as records:
-        for idx, record in enumerate(records):
-            if _request_id_for_item(record) != req_id:
-                continue
+    edit = REQUEST_REGISTRY.edit(record_type)
+    with STORAGE.mutate(_STORE_COLLECTION[record_type], on_commit=edit.on_commit) as records:
+        idx = _position_in(records, req_id, hint)
+        if idx is not None:
+            record = records[idx]
 
             if job_result:
-                safe_result = json.loads(json.dumps(job_result, ensure_ascii=False, default=str))
+                safe_result = json_codec.to_plain(job_result)
                 record['description_variants'] = safe_result
                 if isinstance(safe_result, dict):
                     record['description_used_fields'] = safe_result.get('used_fields') or {}
@@ -3491,9 +3518,8 @@ def admin_select_description(req_id):
             if record_type == 'approved':
                 record['updated_at'] = _now_iso()
 
-            records[idx] = record
-            updated_item = json.loads(json.dumps(record, ensure_ascii=False, default=str))
-            break
+            updated_item = json_codec.to_plain(record)
+            edit.updated(idx, record)
 
     if not updated_item:
         return jsonify({"ok": False, "error": "not_found"}), 404
@@ -3507,12 +3533,17 @@ def admin_select_description(req_id):
     }
     return jsonify(response)
 
-@app.route('/approve/<int:index>', methods=['POST'])
-def approve_professional(index):
+@app.route('/admin/requests/<req_id>/approve', methods=['POST'])
+def approve_professional(req_id):
     popped_item = None
-    with atomic_write_json(Path(PENDING_FILE), default_factory=list) as pending_list:
-        if 0 <= index < len(pending_list):
-            popped_item = pending_list.pop(index)
+    resolved = _resolve_request_record(req_id)
+    if resolved and resolved[0] == 'pending':
+        edit = REQUEST_REGISTRY.edit('pending')
+        with STORAGE.mutate('pending', on_commit=edit.on_commit) as pending_list:
+            idx = _position_in(pending_list, req_id, resolved[1])
+            if idx is not None:
+                popped_item = pending_list.pop(idx)
+                edit.removed(idx)
 
     if popped_item is None:
         return redirect(url_for('admin'))
@@ -3637,13 +3668,11 @@ def approve_professional(index):
             item['description'] = ai_bio_full
 
         # --- נעילת וריאנט לעובד המאושר (כדי לא לשכפל וריאנטים) ---
-    new_worker_id = None
-    with atomic_write_json(Path(APPROVED_FILE), default_factory=list) as approved_list:
-        existing_ids = [int(w.get('worker_id', 0)) for w in approved_list if str(w.get('worker_id', '')).isdigit()]
-        max_id = max(existing_ids) if existing_ids else 0
-        new_worker_id = str(max_id + 1)
-        item['worker_id'] = new_worker_id
-        approved_list.append(item)
+    # מזהה עובד חדש = המזהה המספרי הגבוה + 1 (מחושב בתוך אותה כתיבה נעולה)
+    edit = REQUEST_REGISTRY.edit('approved')
+    edit.inserted(item)
+    STORAGE.insert('workers', item, assign_id='worker_id', on_commit=edit.on_commit)
+    new_worker_id = item['worker_id']
 
     # --- נעילת וריאנט לעובד המאושר (כדי לא לשכפל וריאנטים) ---
     try:
@@ -3664,32 +3693,68 @@ def approve_professional(index):
 
 
 
-@app.route('/delete_pending/<int:index>', methods=['POST'])
-def delete_pending(index):
-    with atomic_write_json(Path(PENDING_FILE), default_factory=list) as pending_list:
-        if 0 <= index < len(pending_list):
-            pending_list.pop(index)
+@app.route('/admin/requests/<req_id>/delete', methods=['POST'])
+def delete_pending(req_id):
+    resolved = _resolve_request_record(req_id)
+    if resolved and resolved[0] == 'pending':
+        edit = REQUEST_REGISTRY.edit('pending')
+        with STORAGE.mutate('pending', on_commit=edit.on_commit) as pending_list:
+            idx = _position_in(pending_list, req_id, resolved[1])
+            if idx is not None:
+                pending_list.pop(idx)
+                edit.removed(idx)
     return redirect(url_for('admin'))
 
 
 # ====== Analytics: API + helpers + admin pages (monthly + all-time with search) ======
 
-# --- api_track: מקבל גם path מתוך ה-payload/Referer ---
+TRACK_EVENTS = ('view', 'click_call', 'click_whatsapp')
+TRACK_MAX_BATCH = 50
+
+
+def _normalize_track_events(payload, default_path):
+    """ מנרמל גוף בקשה של /api/track לרשימת (event, worker_id, path).
+    מקבל אירוע בודד {event, worker_id, path?}, מערך אירועים, או {path?, events: [...]}.
+    מחזיר (events, rejected) – אירועים לא תקינים נספרים ולא מפילים את כל המנה.
+    """
+    if isinstance(payload, dict) and isinstance(payload.get('events'), list):
+        default_path = str(payload.get('path') or '').strip() or default_path
+        items = payload['events']
+    elif isinstance(payload, list):
+        items = payload
+    else:
+        items = [payload]
+
+    events, rejected = [], 0
+    for item in items[:TRACK_MAX_BATCH]:
+        if not isinstance(item, dict):
+            rejected += 1
+            continue
+        event = str(item.get('event') or '').strip()
+        worker_id = str(item.get('worker_id') or '').strip()
+        if event not in TRACK_EVENTS or not worker_id:
+            rejected += 1
+            continue
+        path = str(item.get('path') or '').strip() or default_path
+        events.append((event, worker_id, path))
+    rejected += max(0, len(items) - TRACK_MAX_BATCH)
+    return events, rejected
+
+
+# --- api_track: נקודת קליטה יחידה לאירועי מעקב (בודד או מנה, כולל sendBeacon) ---
 @csrf.exempt
 @app.post('/api/track')
 def api_track():
-    data = request.get_json(silent=True) or {}
-    event = (data.get('event') or '').strip()
-    worker_id = str(data.get('worker_id') or '').strip()
-    if event not in ('view', 'click_call', 'click_whatsapp') or not worker_id:
-        return jsonify({"ok": False, "error": "bad_request"}), 400
-
-    page_path = (data.get('path') or '').strip()
-    if not page_path:
-        page_path = _extract_path_from_referer(request.headers.get('Referer', '')) or '/'
+    # sendBeacon עשוי לשלוח text/plain – מפענחים את הגוף בכל מקרה
+    payload = request.get_json(force=True, silent=True)
+    default_path = _extract_path_from_referer(request.headers.get('Referer', '')) or '/'
+    events, rejected = _normalize_track_events(payload, default_path)
+    if not events:
+        return jsonify({"ok": False, "error": "bad_request", "rejected": rejected}), 400
 
-    logged = log_analytics_event(event, worker_id, page_path=page_path)
-    return jsonify({"ok": True, "logged": bool(logged)})
+    logged = sum(1 for event, worker_id, path in events
+                 if log_analytics_event(event, worker_id, page_path=path))
+    return jsonify({"ok": True, "accepted": len(events), "logged": logged, "rejected": rejected})
 
 # --- נתיב מתוך Referer (למקרה שאין path ב-payload) ---
 def _extract_path_from_referer(ref: str) -> str:
@@ -3704,102 +3769,9 @@ def _extract_path_from_referer(ref: str) -> str:
     except Exception:
         return ''
 
-# --- איטרציה על אירועים (יום/חודש/כלל הקבצים) ---
-def _iter_day_events(day_str):
-    """כל האירועים של יום מסוים (YYYY-MM-DD)."""
-    if not day_str or not os.path.isdir(ANALYTICS_DIR):
-        return
-    file_name = f"{day_str}.jsonl"
-    path = os.path.join(ANALYTICS_DIR, file_name)
-    if not os.path.isfile(path):
-        return
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    yield json.loads(line)
-                except Exception:
-                    continue
-    except Exception:
-        return
-
-
-def _iter_month_events(month_str):
-    """כל האירועים של חודש מסוים (YYYY-MM)."""
-    if not month_str or not os.path.isdir(ANALYTICS_DIR):
-        return
-    prefix = month_str + '-'
-    for name in os.listdir(ANALYTICS_DIR):
-        if name.startswith(prefix) and name.endswith('.jsonl'):
-            path = os.path.join(ANALYTICS_DIR, name)
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            yield json.loads(line)
-                        except Exception:
-                            continue
-            except Exception:
-                continue
-
-
-def _iter_all_events():
-    """כל האירועים מכל הקבצים בתיקיית האנליטיקס."""
-    if not os.path.isdir(ANALYTICS_DIR):
-        return
-    for name in os.listdir(ANALYTICS_DIR):
-        if not name.endswith('.jsonl'):
-            continue
-        path = os.path.join(ANALYTICS_DIR, name)
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        yield json.loads(line)
-                    except Exception:
-                        continue
-        except Exception:
-            continue
-
-# --- אגרגציה בסיסית לאירועים לפי עובד ---
-def _aggregate_events(events_iterable):
-    """מקבץ לפי worker_id: views / calls / wa."""
-    per_worker = defaultdict(lambda: {'views': 0, 'calls': 0, 'wa': 0})
-    for e in events_iterable or []:
-        wid = str(e.get('worker_id') or '').strip()
-        ev = str(e.get('event') or '').strip().lower()
-        if not wid:
-            continue
-        if ev == 'view':
-            per_worker[wid]['views'] += 1
-        elif ev in ('click_call', 'call'):
-            per_worker[wid]['calls'] += 1
-        elif ev in ('click_whatsapp', 'wa'):
-            per_worker[wid]['wa'] += 1
-    return per_worker
-
-
 def _analytics_available_months():
     """רשימת חודשים (YYYY-MM) שקיימים להם קבצי אנליטיקס."""
-    months = set()
-    if not os.path.isdir(ANALYTICS_DIR):
-        return []
-    for name in os.listdir(ANALYTICS_DIR):
-        # קבצים בפורמט YYYY-MM-DD.jsonl
-        if len(name) >= 17 and name.endswith('.jsonl'):
-            m = name[:7]
-            if re.match(r'^\d{4}-\d{2}$', m):
-                months.add(m)
-    return sorted(months, reverse=True)
+    return ANALYTICS_ROLLUPS.months()
 
 
 # --- ניקוד חיפוש: שם/מקצוע/עיר (HE/EN/RU שכבר שמורים באובייקט העובד) ---
@@ -3826,14 +3798,17 @@ def _search_score(worker, q: str) -> int:
     return score
 
 
-def _rows_for_all_workers(per_stats: dict, q: str):
+def _rows_for_all_workers(per_stats: dict, q: str, uniques: dict = None):
     """ יוצר רשומות טבלה לכל העובדים המאושרים (גם בלי אירועים).
-        per_stats = dict של {worker_id: {views, calls, wa}} """
-    approved = read_json_file(APPROVED_FILE)
+        per_stats = dict של {worker_id: {views, calls, wa}}
+        uniques = dict של {worker_id: {visitors, clickers}} (הערכת HyperLogLog) """
+    approved = WORKER_CATALOG.all()
+    uniques = uniques or {}
     rows = []
     for w in approved:
         wid = str(w.get('worker_id') or '')
         stats = per_stats.get(wid, {'views': 0, 'calls': 0, 'wa': 0})
+        reach = uniques.get(wid, {})
         v = int(stats.get('views', 0))
         c = int(stats.get('calls', 0))
         wa = int(stats.get('wa', 0))
@@ -3848,6 +3823,8 @@ def _rows_for_all_workers(per_stats: dict, q: str):
             'views': v,
             'calls': c,
             'wa': wa,
+            'visitors': int(reach.get('visitors', 0)),
+            'clickers': int(reach.get('clickers', 0)),
             'ctr_call': ctr_call,
             'ctr_wa': ctr_wa,
             'total_clicks': total_clicks,
@@ -3862,11 +3839,7 @@ def _rows_for_all_workers(per_stats: dict, q: str):
 
 
 def _monthly_totals(month_str):
-    agg = _aggregate_events(_iter_month_events(month_str))
-    total_views = sum(v['views'] for v in agg.values())
-    total_calls = sum(v['calls'] for v in agg.values())
-    total_wa = sum(v['wa'] for v in agg.values())
-    return {'views': total_views, 'calls': total_calls, 'wa': total_wa}
+    return analytics_rollup.totals(ANALYTICS_ROLLUPS.month(month_str))
 
 
 # --- ניהול אנליטיקס: אינדקס / חודשי / כל הזמנים ---
@@ -3881,12 +3854,9 @@ def analysis_index():
         month_cards.append({'month': m, **t})
 
     # סכום all-time
-    agg_all = _aggregate_events(_iter_all_events())
-    all_totals = {
-        'views': sum(v['views'] for v in agg_all.values()),
-        'calls': sum(v['calls'] for v in agg_all.values()),
-        'wa': sum(v['wa'] for v in agg_all.values()),
-    }
+    all_time = ANALYTICS_ROLLUPS.all_time()
+    all_totals = analytics_rollup.totals(all_time)
+    all_totals['bots'] = analytics_rollup.bot_hits(all_time)
     return render_template('analysis/index.html', months=months, month_cards=month_cards, all_totals=all_totals)
 
 
@@ -3900,25 +3870,40 @@ def analysis_monthly():
     if not month:
         month = months[0] if months else datetime.utcnow().strftime('%Y-%m')
 
-    per_worker = _aggregate_events(_iter_month_events(month))
-    rows = _rows_for_all_workers(per_worker, q)
-    totals = _monthly_totals(month)
+    summary = ANALYTICS_ROLLUPS.month(month)
+    rows = _rows_for_all_workers(summary['workers'], q, analytics_rollup.worker_uniques(summary))
+    totals = analytics_rollup.totals(summary)
+
+    # ייצוא בזרימה של כל ימי החודש (שורה לעובד לכל יום)
+    try:
+        first = date.fromisoformat(month + '-01')
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        export_url = url_for('analysis_export', kind='workers', format='csv', **{'from': first.isoformat(), 'to': last.isoformat()})
+    except ValueError:
+        export_url = None
 
-    return render_template('analysis/monthly.html', month=month, months=months, rows=rows, totals=totals, q=q)
+    return render_template('analysis/monthly.html', month=month, months=months, rows=rows, totals=totals, q=q,
+                           export_url=export_url)
 
 
 # נשמר את ה-route הישן 'all' כדי שלא ישברו קישורים קיימים
 @app.route('/admin/analysis/all')
 def admin_analysis_all():
     q = (request.args.get('q') or '').strip()
-    per_worker = _aggregate_events(_iter_all_events())
-    rows = _rows_for_all_workers(per_worker, q)
+    summary = ANALYTICS_ROLLUPS.all_time()
+    rows = _rows_for_all_workers(summary['workers'], q, analytics_rollup.worker_uniques(summary))
+    site = analytics_rollup.totals(summary)
     totals = {
         'views': sum(r['views'] for r in rows),
         'calls': sum(r['calls'] for r in rows),
         'wa': sum(r['wa'] for r in rows),
+        'visitors': site['visitors'],
+        'clickers': site['clickers'],
     }
-    return render_template('analysis/all_time.html', rows=rows, totals=totals, q=q)
+    days = ANALYTICS_ROLLUPS.days()
+    export_url = url_for('analysis_export', kind='workers', format='csv',
+                         **{'from': days[0], 'to': days[-1]}) if days else None
+    return render_template('analysis/all_time.html', rows=rows, totals=totals, q=q, export_url=export_url)
 
 
 @app.route('/admin/analysis/all-time')
@@ -3926,6 +3911,86 @@ def analysis_all_time():
     return admin_analysis_all()  # קורא את הפונקציה השנייה ומחזיר את אותו הדף ללא redirect
 
 
+def _analysis_worker_args():
+    # ?worker=12&worker=34 או worker=12,34
+    return [w.strip() for raw in request.args.getlist('worker') for w in raw.split(',') if w.strip()]
+
+
+def _analysis_range_args():
+    """ from/to בפורמט YYYY-MM-DD (כולל); ברירת מחדל: 30 הימים האחרונים. ValueError על תאריך שגוי """
+    end = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+    start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+    return start, end
+
+
+@app.get('/admin/analysis/timeseries')
+def analysis_timeseries():
+    """ סדרת זמן של צפיות/שיחות/וואטסאפ/CTR לבעל מקצוע אחד או כמה.
+        ?worker=12&worker=34 (או worker=12,34) &from=YYYY-MM-DD &to=YYYY-MM-DD &bucket=day|week|month
+        ברירת מחדל: 30 הימים האחרונים, לפי יום """
+    wids = _analysis_worker_args()
+    bucket = (request.args.get('bucket') or 'day').strip().lower()
+    try:
+        start, end = _analysis_range_args()
+    except ValueError:
+        return jsonify({"ok": False, "error": "bad_date"}), 400
+    if not wids:
+        return jsonify({"ok": False, "error": "missing_worker"}), 400
+    if len(wids) > SERIES_MAX_WORKERS:
+        return jsonify({"ok": False, "error": "too_many_workers", "max": SERIES_MAX_WORKERS}), 400
+    if bucket not in SERIES_BUCKETS:
+        return jsonify({"ok": False, "error": "bad_bucket", "allowed": list(SERIES_BUCKETS)}), 400
+    if end < start or (end - start).days >= SERIES_MAX_DAYS:
+        return jsonify({"ok": False, "error": "bad_range", "max_days": SERIES_MAX_DAYS}), 400
+
+    data = ANALYTICS_SERIES.query(wids, start, end, bucket)
+    return jsonify({"ok": True, **data})
+
+
+@app.get('/admin/analysis/export')
+def analysis_export():
+    """ ייצוא בזרימה (streaming) של טווח תאריכים – זיכרון קבוע בלי קשר לגודל הטווח.
+        ?kind=workers|events &format=csv|ndjson &from=YYYY-MM-DD &to=YYYY-MM-DD [&worker=12,34]
+        workers = שורה לכל בעל מקצוע לכל יום (מהסיכומים היומיים); events = האירועים הגולמיים (בלי sid) """
+    kind = (request.args.get('kind') or 'workers').strip().lower()
+    fmt = (request.args.get('format') or 'csv').strip().lower()
+    try:
+        start, end = _analysis_range_args()
+    except ValueError:
+        return jsonify({"ok": False, "error": "bad_date"}), 400
+    if kind not in analytics_export.KINDS:
+        return jsonify({"ok": False, "error": "bad_kind", "allowed": list(analytics_export.KINDS)}), 400
+    if fmt not in analytics_export.FORMATS:
+        return jsonify({"ok": False, "error": "bad_format", "allowed": list(analytics_export.FORMATS)}), 400
+    if end < start:
+        return jsonify({"ok": False, "error": "bad_range"}), 400
+
+    wids = _analysis_worker_args() or None
+    if kind == 'workers':
+        names = {str(w.get('worker_id')): (w.get('company_name') or w.get('name') or '') for w in WORKER_CATALOG.all()}
+        rows = analytics_export.worker_rows(ANALYTICS_ROLLUPS, start, end, names=names, worker_ids=wids)
+        fields = analytics_export.WORKER_FIELDS
+    else:
+        rows = analytics_export.event_rows(ANALYTICS_ROLLUPS, start, end, worker_ids=wids)
+        fields = analytics_export.EVENT_FIELDS
+
+    filename = f"analytics-{kind}-{start.isoformat()}-{end.isoformat()}.{fmt}"
+    resp = Response(
+        stream_with_context(analytics_export.encode(rows, fmt, fields)),
+        mimetype=analytics_export.FORMATS[fmt],
+    )
+    resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    resp.headers['Cache-Control'] = 'no-store'
+    resp.headers['X-Accel-Buffering'] = 'no'  # שלא ייאגר ב-nginx
+    return resp
+
+
+@app.get('/admin/analysis/writer-stats')
+def analysis_writer_stats():
+    # מוני תור הכתיבה של התהליך הנוכחי (כולל אירועים שנזרקו כשהתור היה מלא)
+    return jsonify({"ok": True, "pid": os.getpid(), **ANALYTICS_WRITER.stats()})
+
+
 @app.route('/admin/analysis/login', methods=['GET', 'POST'], endpoint='admin_login')
 def admin_login():
     next_url = request.args.get('next') or url_for('analysis_index')
@@ -3955,24 +4020,24 @@ def admin_login():
 
 
 
-@app.route('/admin/pending/<int:index>/ai-generate', methods=['POST'])
-def admin_ai_generate(index):
+@app.route('/admin/requests/<req_id>/ai-generate', methods=['POST'])
+def admin_ai_generate(req_id):
     """
     כל לחיצה מדפדפת לוריאנט הבא ושומרת את הטיוטה בפנדינג.
     ניתן לאפס קורסור עם פרמטר ?reset=1 אם צריך.
     """
-    pending_list = read_json_file(PENDING_FILE)
-    if not isinstance(pending_list, list) or not (0 <= index < len(pending_list)):
+    resolved = _resolve_request_record(req_id)
+    if not resolved or resolved[0] != 'pending':
         flash("פריט לא קיים", "error")
         return redirect(url_for('admin'))
 
-    item = pending_list[index]
-    req_id = _request_id_for_item(item)
+    _, hint, item = resolved
+    item["request_id"] = _request_id_for_item(item)  # נשמר עם הרשומה (כמו קודם)
 
     # מזהה יציב לפנדינג (כי עדיין אין worker_id)
     pre_id = _pre_worker_id(item)
 
-    # איפוס קורסור (אופציונלי): /admin/pending/<i>/ai-generate?reset=1
+    # איפוס קורסור (אופציונלי): /admin/requests/<req_id>/ai-generate?reset=1
     if request.args.get("reset") in ("1", "true", "yes"):
         cur = session.get("ai_vcur", {})
         if pre_id in cur:
@@ -4016,11 +4081,12 @@ def admin_ai_generate(index):
         item.update(draft)
 
         # נשמור חזרה
-        with atomic_write_json(Path(PENDING_FILE), default_factory=list) as records:
-            for idx, record in enumerate(records):
-                if _request_id_for_item(record) == req_id:
-                    records[idx] = item
-                    break
+        edit = REQUEST_REGISTRY.edit('pending')
+        with STORAGE.mutate('pending', on_commit=edit.on_commit) as records:
+            idx = _position_in(records, req_id, hint)
+            if idx is not None:
+                records[idx] = item
+                edit.updated(idx, item)
 
         # דגל הצלחה: מציגים גם מזהה וריאנט, ואם ניתן – label
         used_id = (draft.get("ai_variant_used") or "").strip()
@@ -4036,11 +4102,12 @@ def admin_ai_generate(index):
     except Exception as e:
         # לא מפילים—נרשום שגיאה ונמשיך
         item["ai_status"] = "error"
-        with atomic_write_json(Path(PENDING_FILE), default_factory=list) as records:
-            for idx, record in enumerate(records):
-                if _request_id_for_item(record) == req_id:
-                    records[idx] = item
-                    break
+        edit = REQUEST_REGISTRY.edit('pending')
+        with STORAGE.mutate('pending', on_commit=edit.on_commit) as records:
+            idx = _position_in(records, req_id, hint)
+            if idx is not None:
+                records[idx] = item
+                edit.updated(idx, item)
         flash("אירעה שגיאה ביצירת הטיוטה.", "error")
 
     return redirect(url_for('admin'))
@@ -4116,39 +4183,21 @@ def sitemap_xml():
     ועמודי פרופיל/ביקורות — בכל השפות.
     """
     # --- נתונים מהדיסק ---
-    try:
-        approved = read_json_file(APPROVED_FILE)  # רשימת עובדים מאושרים
-    except Exception:
-        approved = []
-
-    reviews_path = os.path.join(DATA_FOLDER, 'worker_reviews.json')
-    try:
-        all_reviews = read_json_file(reviews_path)
-    except Exception:
-        all_reviews = []
+    approved = WORKER_CATALOG.all()  # רשימת עובדים מאושרים (מהקטלוג בזיכרון)
 
-    # worker_id -> תאריך ביקורת אחרון (ל-lastmod)
-    latest_review_by_worker: dict[str, datetime] = {}
-    for r in all_reviews:
-        wid = str(r.get("worker_id") or "")
-        if not wid:
-            continue
-        try:
-            dt = datetime.fromisoformat((r.get("date") or "").replace("Z", ""))
-        except Exception:
-            dt = None
-        if dt and (wid not in latest_review_by_worker or dt > latest_review_by_worker[wid]):
-            latest_review_by_worker[wid] = dt
+    # worker_id -> תאריך ביקורת אחרון (ל-lastmod), מתוך אינדקס הביקורות
+    latest_review_by_worker: dict[str, datetime] = REVIEW_INDEX.latest_dates()
 
-    # mtime של קבצים מרכזיים
-    def _file_mtime(path):
+    # זמן שינוי אחרון של העובדים/הביקורות (mtime של קובץ או חותמת מה-DB)
+    def _last_modified(collection):
         try:
-            return datetime.fromtimestamp(os.path.getmtime(path))
+            ts = STORAGE.last_modified(collection)
+            return datetime.fromtimestamp(ts) if ts else None
         except Exception:
             return None
 
     site_last_any = max(
-        filter(None, (_file_mtime(APPROVED_FILE), _file_mtime(reviews_path))),
+        filter(None, (_last_modified('workers'), _last_modified('reviews'))),
         default=None
     )
     today = date.today()
@@ -4215,32 +4264,9 @@ def sitemap_xml():
     existing_fields_he: set[str] = set()
     existing_pairs_he: set[tuple[str, str]] = set()
 
-    for w in approved:
-        he_field = _canon_he_field(w.get("field") or w.get("field_he") or "")
-        if not he_field:
-            continue
-        existing_fields_he.add(he_field)
-
-        city_candidates = set()
-        base_city = (w.get("base_city") or "").strip()
-        if base_city:
-            city_candidates.add(base_city)
-
-        for c in (w.get("active_cities") or []):
-            if c:
-                city_candidates.add(c)
-
-        # אם הוגדר רדיוס — הוסף את כל הערים בטווח
-        try:
-            r = int(w.get("work_radius") or 0)
-        except Exception:
-            r = 0
-        if r > 0 and base_city in cities_coords:
-            for c in get_cities_in_radius(base_city, r):
-                city_candidates.add(c)
-
-        for c in city_candidates:
-            existing_pairs_he.add((he_field, c))
+    # (מגיע מוכן מאינדקס הרשימות של הקטלוג – אותו מקור שמשמש את show_workers)
+    existing_fields_he.update(WORKER_CATALOG.listing_fields())
+    existing_pairs_he.update(WORKER_CATALOG.listing_pairs())
 
     # lastmod לרשימות = שינוי ב־approved/reviews
     lists_lastmod = site_last_any or today
@@ -4303,32 +4329,6 @@ def sitemap_xml():
 
 
 
-# ===== Lightweight tracking endpoint =====
-@app.route('/api/track', methods=['POST'])
-def api_track_events():
-    """Collects lightweight UI telemetry without failing the client."""
-    try:
-        payload = request.get_json(silent=True) or {}
-    except Exception:
-        payload = {}
-    try:
-        event = {
-            "ts": datetime.now(timezone.utc).isoformat(),
-            "ip": request.headers.get('X-Forwarded-For', request.remote_addr),
-            "ua": request.headers.get('User-Agent', ''),
-        }
-        if isinstance(payload, dict):
-            event.update({k: payload[k] for k in payload.keys() if not str(k).startswith('_')})
-        log_path = os.path.join(DATA_FOLDER, 'events.log')
-        os.makedirs(DATA_FOLDER, exist_ok=True)
-        with open(log_path, 'a', encoding='utf-8') as fh:
-            fh.write(json.dumps(event, ensure_ascii=False) + "\n")
-        return jsonify({"ok": True})
-    except Exception as exc:
-        logging.warning("api_track failed: %s", exc)
-        return jsonify({"ok": False})
-
-
 # ===== Autocomplete: API בסיסי לבדיקה =====
 # ===== Autocomplete: API בסיסי לבדיקה =====
 @app.route('/api/suggest', methods=['GET'])
@@ -4576,7 +4576,7 @@ def load_estimate_i18n(lang: str):
     path = os.path.join(app.root_path, "translations", lang, "estimate.json")
     try:
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            return json_codec.load(f)
     except Exception:
         return {}
 
@@ -4603,6 +4603,25 @@ def works_to_workers(lang, field, area):
 
 
 
+@app.template_global()
+def img_srcset(filename, sizes="100vw", max_w=None, ratio=None, fit="cover", q=80):
+    """ מאפייני src/srcset/sizes ל-<img> דרך /img, לפי רוחבי IMG_WIDTHS (עם ?v= כמו static_url).
+        ratio = גובה/רוחב לחיתוך קבוע (למשל 0.75, מוצמד ל-image_variants.ASPECT_RATIOS); max_w = הרוחב הגדול ביותר שיוצע.
+        שימוש: <img {{ img_srcset('photo1.jpg', sizes='(max-width: 600px) 100vw, 600px', max_w=1200) }} alt=""> """
+    widths = [x for x in IMG_WIDTHS if not max_w or x <= max_w] or [IMG_WIDTHS[0]]
+
+    def one(width):
+        params = {"w": width, "fit": fit, "q": q, "format": "auto", "v": ASSETS_V}
+        if ratio:
+            # אותו גובה ש-/img יצמיד אליו – ה-URL בסרסט הוא בדיוק הווריאנט שיוגש
+            params["h"] = image_variants.snap_size(width, max(1, round(width * ratio)), IMG_WIDTHS)[1]
+        return url_for("img_proxy", filename=str(filename).lstrip("/"), **params)
+
+    srcset = ", ".join(f"{one(x)} {x}w" for x in widths)
+    fallback = one(widths[len(widths) // 2])
+    return Markup(f'src="{escape(fallback)}" srcset="{escape(srcset)}" sizes="{escape(sizes)}"')
+
+
 @app.template_global()
 def url_for_lang(endpoint=None, lang=None, **kwargs):
     """
@@ -4682,7 +4701,7 @@ def api_estimate():
                 return jsonify({"error": f"Unknown category: {category} (lang={lang})"}), 400
 
         with open(file_path, "r", encoding="utf-8") as f:
-            catalog = json.load(f)
+            catalog = json_codec.load(f)
 
         def t(val, lng=lang):
             """בחר טקסט לפי שפה; נופל לעברית ואז לכל ערך קיים."""
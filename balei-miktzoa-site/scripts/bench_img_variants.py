@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Time /img variant rendering with and without the JPEG fast path.
+
+Renders each width (cover crop, 4:3) of a source image both ways –
+full-resolution decode + LANCZOS (``fast=False``, the old path) and
+``draft`` + ``reducing_gap`` (the default) – and prints the best time per
+variant, the speed-up and how far the two outputs differ.
+
+    python scripts/bench_img_variants.py
+    python scripts/bench_img_variants.py --src static/photo2.jpg --widths 160,320,640 --format WEBP
+"""
+
+import argparse
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from PIL import Image, ImageChops, ImageStat  # noqa: E402
+
+from services.image_variants import render_variant  # noqa: E402
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def _mean_abs_diff(a: bytes, b: bytes) -> float:
+    with Image.open(BytesIO(a)) as ia, Image.open(BytesIO(b)) as ib:
+        diff = ImageChops.difference(ia.convert("RGB"), ib.convert("RGB"))
+        return sum(ImageStat.Stat(diff).mean) / 3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the JPEG draft/reducing_gap fast path.")
+    parser.add_argument("--src", type=Path, default=BASE_DIR / "static" / "photo1.jpg",
+                        help="Source image (default: static/photo1.jpg)")
+    parser.add_argument("--widths", default="160,320,640,1200", help="Comma-separated output widths")
+    parser.add_argument("--fit", default="cover", choices=("cover", "contain"))
+    parser.add_argument("--format", default="JPEG", choices=("JPEG", "WEBP", "PNG"))
+    parser.add_argument("--q", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5, help="Best-of repetitions (default: 5)")
+    args = parser.parse_args()
+
+    with Image.open(args.src) as im:
+        print(f"{args.src.name}: {im.format} {im.width}x{im.height}, "
+              f"{args.src.stat().st_size / 1024:.0f} KiB -> {args.format} q={args.q} fit={args.fit}\n")
+
+    print(f"{'variant':<12}{'old ms':>10}{'fast ms':>10}{'speed-up':>10}{'mean |diff|':>13}")
+    for width in (int(x) for x in args.widths.split(",") if x.strip()):
+        height = round(width * 0.75)
+
+        def render(fast):
+            return render_variant(args.src, width, height, args.fit, args.q, args.format, fast=fast)
+
+        old = _best_of(lambda: render(False), args.repeat)
+        fast = _best_of(lambda: render(True), args.repeat)
+        diff = _mean_abs_diff(render(False), render(True))
+        print(f"{f'{width}x{height}':<12}{old * 1000:>10.1f}{fast * 1000:>10.1f}{old / fast:>9.1f}x{diff:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
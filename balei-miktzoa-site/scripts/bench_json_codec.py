@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Compare the old data-file encoding with services.json_codec.
+
+Builds a synthetic collection by repeating the records of a data file
+(default: data/approved.json) and times encode/decode for:
+
+* stdlib ``json`` with ``indent=2`` – what atomic_write_json used to write
+* json_codec, pretty mode
+* json_codec, compact mode (the default on-disk format)
+
+    python scripts/bench_json_codec.py
+    python scripts/bench_json_codec.py --file data/worker_reviews.json --records 20000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from services import json_codec  # noqa: E402
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _synthetic(path: Path, count: int) -> list:
+    seed = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(seed, list) or not seed:
+        raise SystemExit(f"{path} must hold a non-empty JSON list")
+    out = []
+    for i in range(count):
+        rec = dict(seed[i % len(seed)])
+        rec["worker_id"] = str(i + 1)
+        out.append(rec)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON encode/decode for data files.")
+    parser.add_argument("--file", type=Path, default=DATA_DIR / "approved.json",
+                        help="Seed records (default: data/approved.json)")
+    parser.add_argument("--records", type=int, default=5000, help="Synthetic collection size (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Best-of repetitions (default: 5)")
+    args = parser.parse_args()
+
+    records = _synthetic(args.file, args.records)
+    print(f"codec backend: {json_codec.BACKEND} | {len(records)} records seeded from {args.file.name}\n")
+
+    variants = [
+        ("stdlib indent=2 (old)",
+         lambda: json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8"),
+         lambda b: json.loads(b.decode("utf-8"))),
+        ("json_codec pretty",
+         lambda: json_codec.dumps_bytes(records, pretty=True), json_codec.loads),
+        ("json_codec compact",
+         lambda: json_codec.dumps_bytes(records, pretty=False), json_codec.loads),
+    ]
+
+    print(f"{'variant':<24}{'size KiB':>10}{'encode ms':>12}{'decode ms':>12}")
+    baseline = None
+    for label, encode, decode in variants:
+        blob = encode()
+        enc = _best_of(encode, args.repeat)
+        dec = _best_of(lambda: decode(blob), args.repeat)
+        if baseline is None:
+            baseline = (len(blob), enc, dec)
+        print(f"{label:<24}{len(blob) / 1024:>10.1f}{enc * 1000:>12.2f}{dec * 1000:>12.2f}"
+              f"   (x{baseline[1] / enc:.1f} enc, x{baseline[2] / dec:.1f} dec,"
+              f" {100 * len(blob) / baseline[0]:.0f}% size)")
+
+
+if __name__ == "__main__":
+    main()
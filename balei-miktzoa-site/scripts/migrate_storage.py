@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Move workers / pending requests / reviews between JSON files and SQLite.
+
+    python scripts/migrate_storage.py import            # dry-run: counts only
+    python scripts/migrate_storage.py import --apply    # data/*.json -> data/site.sqlite3
+    python scripts/migrate_storage.py export --apply --out backup/
+    python scripts/migrate_storage.py compact --apply   # fold the review journal now
+
+``import`` replaces the SQLite collections with the contents of the JSON
+files (one-shot migration; set STORAGE_BACKEND=sqlite afterwards).
+``export`` writes the SQLite collections back out as JSON files in the
+original layout (approved.json, pending.json, worker_reviews.json), for
+backups or for switching back to the JSON backend.
+``compact`` folds ``worker_reviews.journal.jsonl`` into worker_reviews.json
+(the app also does this periodically).
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+DEFAULT_DB = DATA_DIR / "site.sqlite3"
+
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from services.json_store import iter_jsonl  # noqa: E402
+from services.storage import DEFAULT_FILES, JsonRepository, SqliteRepository, copy_collections  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate site data between JSON files and SQLite.")
+    parser.add_argument("direction", choices=("import", "export", "compact"),
+                        help="import: JSON -> SQLite, export: SQLite -> JSON, compact: fold JSON journals")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help=f"SQLite database (default: {DEFAULT_DB})")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR,
+                        help="Directory of the JSON files to import from (default: data/)")
+    parser.add_argument("--out", type=Path, default=None,
+                        help="Export target directory (default: the --data-dir)")
+    parser.add_argument("--apply", action="store_true", help="Write changes (default is a dry-run).")
+    args = parser.parse_args()
+
+    if args.direction == "compact":
+        repo = JsonRepository(args.data_dir)
+        for name in repo.journal_keys:
+            journal = repo.journal_for(name)
+            pending = sum(1 for _ in iter_jsonl(journal)) if journal.exists() else 0
+            if not args.apply:
+                print(f"• {journal.name}: {pending} entries (run with --apply to fold them)")
+                continue
+            print(f"✔ {repo.file_for(name).name}: folded {repo.compact(name)} journal entries")
+        return
+
+    if args.direction == "import":
+        source = JsonRepository(args.data_dir)
+        for name, filename in DEFAULT_FILES.items():
+            print(f"• {filename}: {len(source.load(name))} records")
+        if not args.apply:
+            print(f"(dry-run) would replace the collections in {args.db}; run with --apply to write")
+            return
+        counts = copy_collections(source, SqliteRepository(args.db))
+        print(f"✔ imported into {args.db}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+        return
+
+    if not args.db.exists():
+        parser.error(f"database not found: {args.db}")
+    source = SqliteRepository(args.db)
+    out_dir = args.out or args.data_dir
+    for name, filename in DEFAULT_FILES.items():
+        print(f"• {name}: {len(source.load(name))} records -> {out_dir / filename}")
+    if not args.apply:
+        print("(dry-run) run with --apply to write the JSON files")
+        return
+    counts = copy_collections(source, JsonRepository(out_dir))
+    print(f"✔ exported to {out_dir}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
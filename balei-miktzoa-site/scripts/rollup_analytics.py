@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Build the per-day analytics rollups ahead of time.
+
+The admin pages roll up a closed day the first time they read it; run this
+from cron (e.g. shortly after midnight UTC) so no page view pays for that:
+
+    python scripts/rollup_analytics.py            # rollups for closed days that lack one
+    python scripts/rollup_analytics.py --force    # rebuild every closed day
+    python scripts/rollup_analytics.py --force --workers 4
+
+Days are scanned in parallel, one process per CPU by default.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from services.analytics_rollup import AnalyticsRollups  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Materialize daily analytics rollups.")
+    parser.add_argument("--analytics-dir", type=Path, default=DATA_DIR / "analytics",
+                        help="Directory of the YYYY-MM-DD.jsonl logs (default: data/analytics/)")
+    parser.add_argument("--force", action="store_true", help="Rebuild rollups that are already up to date.")
+    parser.add_argument("--workers", type=int, default=0, help="Scanner processes (default: one per CPU, 1 = serial)")
+    args = parser.parse_args()
+
+    rollups = AnalyticsRollups(args.analytics_dir, workers=args.workers, parallel_min_days=2)
+    days = rollups.days()
+    written = rollups.build(force=args.force)
+    print(f"✔ {written} rollups written ({len(days)} days of logs in {args.analytics_dir})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Compress closed analytics days, roll events.log and apply retention.
+
+The app runs the same pass every LOG_MAINTENANCE_SECONDS; this is for cron
+or for a one-off cleanup:
+
+    python scripts/rotate_logs.py                          # gzip closed days, roll events.log
+    python scripts/rotate_logs.py --codec zstd --analytics-retain-days 365
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from services.log_rotation import LogMaintenance  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rotate, compress and expire data/ logs.")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="Data directory (default: data/)")
+    parser.add_argument("--codec", default="gzip", choices=("gzip", "zstd", "none"),
+                        help="Compression for closed days and rolled logs (default: gzip)")
+    parser.add_argument("--analytics-retain-days", type=int, default=0,
+                        help="Delete raw analytics logs older than this (default: 0 = keep)")
+    parser.add_argument("--rollup-retain-days", type=int, default=0,
+                        help="Delete daily rollups older than this (default: 0 = keep)")
+    parser.add_argument("--events-retain-days", type=int, default=0,
+                        help="Delete rolled events.log files older than this (default: 0 = keep)")
+    parser.add_argument("--events-max-mb", type=float, default=50, help="Roll events.log above this size (default: 50)")
+    args = parser.parse_args()
+
+    analytics_dir = args.data_dir / "analytics"
+    report = LogMaintenance(
+        analytics_dir,
+        rollup_dir=analytics_dir / "rollups",
+        rolling_logs=(args.data_dir / "events.log",),
+        codec=args.codec,
+        analytics_retain_days=args.analytics_retain_days,
+        rollup_retain_days=args.rollup_retain_days,
+        rolling_retain_days=args.events_retain_days,
+        rolling_max_bytes=int(args.events_max_mb * 1024 * 1024),
+    ).run()
+    for kind, paths in report.items():
+        print(f"• {kind}: {len(paths)}")
+        for path in paths:
+            print(f"    {path.name}")
+
+
+if __name__ == "__main__":
+    main()
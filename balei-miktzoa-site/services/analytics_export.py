@@ -0,0 +1,127 @@
+"""Streaming CSV / NDJSON exports of analytics date ranges.
+
+Rows are produced lazily one day at a time – per-worker rows from the day
+summaries of :class:`AnalyticsRollups` (read without memoizing them), raw
+rows straight from the day log files – and encoded into text chunks of
+about ``chunk_rows`` rows, so an export holds at most one day summary and
+one chunk in memory whatever the range. Feed the chunks to a streaming
+response.
+
+CSV cells that a spreadsheet would read as a formula (worker names come
+from the public join form) are prefixed with ``'``.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+from . import json_codec
+from .analytics_rollup import METRICS, AnalyticsRollups
+from .user_agent import classify
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson; charset=utf-8"}
+KINDS = ("workers", "events")
+
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+WORKER_FIELDS = ("day", "worker_id", "name", "views", "calls", "wa", "ctr_call", "ctr_wa")
+EVENT_FIELDS = ("ts", "event", "worker_id", "path", "uc")
+
+
+def _days(rollups: AnalyticsRollups, start: date, end: date) -> Iterator[str]:
+    lo, hi = start.isoformat(), end.isoformat()
+    return (d for d in rollups.days() if lo <= d <= hi)
+
+
+def _ctr(clicks: int, views: int) -> float:
+    return round(clicks / views * 100, 1) if views else 0.0
+
+
+def worker_rows(
+    rollups: AnalyticsRollups,
+    start: date,
+    end: date,
+    names: Optional[Mapping[str, str]] = None,
+    worker_ids: Optional[Iterable[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """One row per worker per day with activity, oldest day first."""
+
+    names = names or {}
+    wanted = {str(w) for w in worker_ids} if worker_ids else None
+    for day in _days(rollups, start, end):
+        workers = rollups.day(day, remember=False)["workers"]
+        for wid in sorted(workers, key=lambda w: (len(w), w)):
+            if wanted is not None and wid not in wanted:
+                continue
+            counts = workers[wid]
+            row: Dict[str, Any] = {"day": day, "worker_id": wid, "name": names.get(wid, "")}
+            row.update((m, int(counts.get(m, 0))) for m in METRICS)
+            row["ctr_call"] = _ctr(row["calls"], row["views"])
+            row["ctr_wa"] = _ctr(row["wa"], row["views"])
+            yield row
+        del workers  # the day's summary (and its sketches) is not kept past its rows
+
+
+def event_rows(
+    rollups: AnalyticsRollups,
+    start: date,
+    end: date,
+    worker_ids: Optional[Iterable[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Raw events of the range (without session ids), in log order."""
+
+    wanted = {str(w) for w in worker_ids} if worker_ids else None
+    for day in _days(rollups, start, end):
+        for e in rollups.events(day):
+            wid = str(e.get("worker_id") or "")
+            if wanted is not None and wid not in wanted:
+                continue
+            row = {f: e.get(f, "") for f in EVENT_FIELDS}
+            row["worker_id"] = wid
+            if not row["uc"] and "ua" in e:
+                row["uc"] = classify(str(e["ua"]))  # logged before ingest-time classification
+            yield row
+
+
+def csv_safe(value: Any) -> Any:
+    """Neutralize strings that Excel / Sheets would evaluate as a formula."""
+
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encode(rows: Iterable[Dict[str, Any]], fmt: str, fields: Sequence[str], chunk_rows: int = 500) -> Iterator[str]:
+    """Encode *rows* as CSV (with header and BOM, for Excel) or NDJSON chunks."""
+
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=list(fields), extrasaction="ignore", lineterminator="\r\n")
+        buf.write("\ufeff")
+        writer.writeheader()
+
+        def write(row: Dict[str, Any]) -> None:
+            writer.writerow({k: csv_safe(v) for k, v in row.items()})
+    else:
+        def write(row: Dict[str, Any]) -> None:
+            buf.write(json_codec.dumps(row, pretty=False))
+            buf.write("\n")
+
+    pending = 0
+    for row in rows:
+        write(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
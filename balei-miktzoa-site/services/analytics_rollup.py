@@ -0,0 +1,470 @@
+"""Per-day summaries of the analytics event log.
+
+Events are appended to ``data/analytics/YYYY-MM-DD.jsonl`` (UTC days). The
+admin analytics pages only need counts, so each day is reduced once to a
+small summary – per worker and per page path: views, calls and WhatsApp
+clicks, plus HyperLogLog sketches of the distinct sessions (``sid``) that
+viewed / clicked each worker and the site – stored as
+``rollups/YYYY-MM-DD.json`` next to the logs:
+
+* a closed day (before today, UTC) is rolled up the first time it is read,
+  or ahead of time by ``scripts/rollup_analytics.py``;
+* each rollup records the signature of the log files it was built from, so
+  a late append (or compression) of an old log simply rebuilds that one day;
+* once retention has deleted a day's logs its rollup still counts;
+* today's live log is scanned on every read (and memoized per signature).
+
+Hits from crawlers and link-preview fetchers (user-agent code ``"b"``, see
+``services.user_agent`` – stored as ``"uc"`` at ingest, or derived from
+``"ua"`` for older records) are kept out of the worker / path counts and
+the sketches, and only tallied site-wide under ``"bots"``.
+
+Month and all-time totals merge the day summaries – unique counts come from
+sketch unions, never from sets of session ids – and month merges are
+memoized until one of their logs changes, as is the all-time merge of the
+months before the current one, so a read after today's log grew only merges
+the current month again; the cost grows with the number of days at most,
+never with the number of events. Returned
+summaries are shared – callers must not mutate them.
+
+Closed days may be compressed by ``services.log_rotation``
+(``YYYY-MM-DD.jsonl.gz``/``.zst``); such files are streamed transparently,
+together with any plain ``.jsonl`` written to the same day afterwards.
+Plain logs are read through ``mmap`` and parsed straight from the mapped
+bytes (no per-line ``str``). A backfill (:meth:`AnalyticsRollups.build`, run
+by ``scripts/rollup_analytics.py``) summarizes many days in parallel with a
+process pool and merges the partial summaries afterwards. Reads on the
+request path always scan serially: a ``spawn`` child re-imports
+``__main__``, which under ``python app.clean.py`` is the whole web app.
+"""
+
+from __future__ import annotations
+
+import itertools
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from . import json_codec
+from .hll import HyperLogLog
+from .json_store import file_signature
+from .log_rotation import COMPRESSED, open_log
+from .user_agent import BOT, classify
+
+Counts = Dict[str, int]
+Summary = Dict[str, Dict[str, Any]]
+
+ROLLUP_VERSION = 3
+METRICS = ("views", "calls", "wa")
+# distinct sessions: "visitors" viewed, "clickers" called or opened WhatsApp
+UNIQUES = ("visitors", "clickers")
+
+_DAY_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.jsonl(?:\.gz|\.zst)?$")
+_ROLLUP_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.json$")
+
+# event name -> metric (older logs used the short names)
+_EVENT_METRIC = {
+    "view": "views",
+    "click_call": "calls",
+    "call": "calls",
+    "click_whatsapp": "wa",
+    "wa": "wa",
+}
+
+
+def empty_summary() -> Summary:
+    """``workers``/``paths``: counts; ``uniques``: serialized sketches.
+
+    ``uniques`` is ``{"site": {"visitors": str, "clickers": str},
+    "workers": {worker_id: {...}}}`` (see :meth:`HyperLogLog.to_str`);
+    ``bots`` holds the excluded bot hits, ``{metric: n}``.
+    """
+
+    return {"workers": {}, "paths": {}, "uniques": {"site": {}, "workers": {}}, "bots": {}}
+
+
+def _bump(bucket: Dict[str, Counts], key: str, metric: str, n: int = 1) -> None:
+    counts = bucket.get(key)
+    if counts is None:
+        counts = bucket[key] = dict.fromkeys(METRICS, 0)
+    counts[metric] = counts.get(metric, 0) + n
+
+
+def summarize(events: Iterable[Dict[str, Any]]) -> Summary:
+    """Reduce raw events to ``{"workers": {...}, "paths": {...}}`` counts."""
+
+    summary = empty_summary()
+    workers, paths, bots = summary["workers"], summary["paths"], summary["bots"]
+    site_sketches: Dict[str, HyperLogLog] = {}
+    worker_sketches: Dict[str, Dict[str, HyperLogLog]] = {}
+    for e in events:
+        wid = str(e.get("worker_id") or "").strip()
+        metric = _EVENT_METRIC.get(str(e.get("event") or "").strip().lower())
+        if not wid or metric is None:
+            continue
+        uc = e.get("uc") or (classify(str(e["ua"])) if "ua" in e else None)
+        if uc == BOT:
+            bots[metric] = bots.get(metric, 0) + 1
+            continue
+        _bump(workers, wid, metric)
+        _bump(paths, str(e.get("path") or "/"), metric)
+        sid = e.get("sid")
+        if sid:
+            kind = "visitors" if metric == "views" else "clickers"
+            for sketches in (site_sketches, worker_sketches.setdefault(wid, {})):
+                sketch = sketches.get(kind)
+                if sketch is None:
+                    sketch = sketches[kind] = HyperLogLog()
+                sketch.add(sid)
+    uniques = summary["uniques"]
+    uniques["site"] = {k: v.to_str() for k, v in site_sketches.items()}
+    uniques["workers"] = {wid: {k: v.to_str() for k, v in sk.items()} for wid, sk in worker_sketches.items()}
+    return summary
+
+
+def _union(into: Dict[str, HyperLogLog], sketches: Dict[str, str]) -> None:
+    for kind, text in sketches.items():
+        sketch = HyperLogLog.from_str(text)
+        if kind in into:
+            into[kind].merge(sketch)
+        else:
+            into[kind] = sketch
+
+
+def merge(summaries: Iterable[Summary]) -> Summary:
+    """Sum several summaries into a new one."""
+
+    out = empty_summary()
+    site: Dict[str, HyperLogLog] = {}
+    per_worker: Dict[str, Dict[str, HyperLogLog]] = {}
+    for summary in summaries:
+        for section in ("workers", "paths"):
+            bucket = out[section]
+            for key, counts in (summary.get(section) or {}).items():
+                for metric, n in counts.items():
+                    if n:
+                        _bump(bucket, key, metric, n)
+        for metric, n in (summary.get("bots") or {}).items():
+            out["bots"][metric] = out["bots"].get(metric, 0) + n
+        uniques = summary.get("uniques") or {}
+        _union(site, uniques.get("site") or {})
+        for wid, sketches in (uniques.get("workers") or {}).items():
+            _union(per_worker.setdefault(wid, {}), sketches)
+    out["uniques"]["site"] = {k: v.to_str() for k, v in site.items()}
+    out["uniques"]["workers"] = {wid: {k: v.to_str() for k, v in sk.items()} for wid, sk in per_worker.items()}
+    return out
+
+
+def _estimate(sketches: Dict[str, str]) -> Counts:
+    return {kind: HyperLogLog.from_str(sketches[kind]).count() if kind in sketches else 0 for kind in UNIQUES}
+
+
+def totals(summary: Summary) -> Counts:
+    """Site-wide ``{"views", "calls", "wa", "visitors", "clickers"}`` of a summary."""
+
+    out = dict.fromkeys(METRICS, 0)
+    for counts in (summary.get("workers") or {}).values():
+        for metric in METRICS:
+            out[metric] += int(counts.get(metric, 0))
+    out.update(_estimate((summary.get("uniques") or {}).get("site") or {}))
+    return out
+
+
+def bot_hits(summary: Summary) -> int:
+    """How many events of *summary* were left out as bot traffic."""
+
+    return sum(int(n) for n in (summary.get("bots") or {}).values())
+
+
+def worker_uniques(summary: Summary) -> Dict[str, Counts]:
+    """Approximate ``{"visitors", "clickers"}`` per worker id."""
+
+    workers = (summary.get("uniques") or {}).get("workers") or {}
+    return {wid: _estimate(sketches) for wid, sketches in workers.items()}
+
+
+def _iter_lines(path) -> Iterator[bytes]:
+    """Yield the lines of *path* (with their newline); mmap for plain files."""
+
+    if str(path).endswith(COMPRESSED):
+        try:
+            f = open_log(path)
+        except (OSError, RuntimeError):
+            return
+        with f:
+            try:
+                yield from f
+            except (OSError, EOFError):  # truncated archive: keep what was readable
+                return
+        return
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):  # empty file / not mappable
+            return
+        with mm:
+            # mmap.readline splits in C; no text decoding, one bytes object per line
+            yield from iter(mm.readline, b"")
+
+
+def iter_events(path) -> Iterator[Dict[str, Any]]:
+    """Parsed events of one log file; torn or invalid lines are skipped."""
+
+    for line in _iter_lines(path):
+        if len(line) <= 2 and not line.strip():
+            continue
+        try:
+            event = json_codec.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict):
+            yield event
+
+
+def summarize_file(paths) -> Summary:
+    """Summary of one log file, or of the files of one day given as a list.
+
+    Module-level so a process pool can run it.
+    """
+
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    return summarize(itertools.chain.from_iterable(iter_events(p) for p in paths))
+
+
+def scan(items: Sequence, workers: int = 0) -> List[Summary]:
+    """Summarize *items* (paths or lists of paths, in order), in parallel when *workers* != 1.
+
+    *workers* ``0`` means one process per CPU. Falls back to scanning in this
+    process if a pool cannot be started.
+    """
+
+    items = [str(p) if isinstance(p, (str, os.PathLike)) else [str(x) for x in p] for p in items]
+    workers = min(workers or os.cpu_count() or 1, len(items))
+    if workers > 1:
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                return list(pool.map(summarize_file, items, chunksize=max(1, len(items) // (workers * 4))))
+        except (OSError, RuntimeError, ImportError):
+            pass
+    return [summarize_file(p) for p in items]
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class AnalyticsRollups:
+    """Day summaries for one analytics directory; safe to share across threads.
+
+    *workers* is the process count for :meth:`build` (``0``: one per CPU,
+    ``1``: never start a pool); a pool is only used when at least
+    *parallel_min_days* days have to be scanned together. Summaries read
+    through :meth:`day`, :meth:`month` and :meth:`all_time` never use one.
+    """
+
+    def __init__(self, analytics_dir, rollup_dir=None, workers: int = 1, parallel_min_days: int = 8) -> None:
+        self.analytics_dir = Path(analytics_dir)
+        self.rollup_dir = Path(rollup_dir) if rollup_dir else self.analytics_dir / "rollups"
+        self.workers = workers
+        self.parallel_min_days = max(2, parallel_min_days)
+        self._lock = threading.Lock()
+        self._memo: Dict[str, tuple] = {}  # day -> (source signature, summary)
+        self._month_memo: Dict[str, tuple] = {}  # month -> (day signatures, summary)
+        self._closed_memo: Optional[tuple] = None  # (month keys, summary) of the months before this one
+        self._all_time_memo: Optional[tuple] = None  # (month keys, summary)
+
+    # ---- layout ----
+    def log_path(self, day: str) -> Path:
+        """The plain log events of *day* are appended to."""
+
+        return self.analytics_dir / f"{day}.jsonl"
+
+    def sources(self, day: str) -> List[Path]:
+        """Existing log files of *day*: compressed archives first, then the plain log."""
+
+        plain = self.log_path(day)
+        candidates = [plain.with_name(plain.name + suffix) for suffix in COMPRESSED] + [plain]
+        return [p for p in candidates if p.is_file()]
+
+    def signature(self, day: str) -> Optional[list]:
+        sigs = []
+        for path in self.sources(day):
+            sig = file_signature(path)
+            if sig is not None:
+                sigs.append([path.name, *sig])
+        return sigs or None
+
+    def events(self, day: str) -> Iterator[Dict[str, Any]]:
+        """Raw events of *day*, from all of its log files."""
+
+        return itertools.chain.from_iterable(iter_events(p) for p in self.sources(day))
+
+    def rollup_path(self, day: str) -> Path:
+        return self.rollup_dir / f"{day}.json"
+
+    def days(self) -> List[str]:
+        """Days (``YYYY-MM-DD``) that have a log file or a rollup, oldest first."""
+
+        found = set()
+        for directory, pattern in ((self.analytics_dir, _DAY_FILE), (self.rollup_dir, _ROLLUP_FILE)):
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            found.update(m.group(1) for m in map(pattern.match, names) if m)
+        return sorted(found)
+
+    def months(self) -> List[str]:
+        """Months (``YYYY-MM``) that have logs, newest first."""
+
+        return sorted({d[:7] for d in self.days()}, reverse=True)
+
+    # ---- summaries ----
+    def day(self, day: str, remember: bool = True) -> Summary:
+        """Summary of *day*; ``remember=False`` neither fills nor grows the in-memory memo."""
+
+        signature = self.signature(day)
+        if signature is None:
+            # logs removed by retention: the rollup is all there is
+            return self._read_rollup(day, None) or empty_summary()
+
+        memo = self._memo.get(day)
+        if memo is not None and memo[0] == signature:
+            return memo[1]
+
+        closed = day < _today()
+        summary = self._read_rollup(day, signature) if closed else None
+        if summary is None:
+            summary = summarize_file(self.sources(day))
+            if closed:
+                self._write_rollup(day, signature, summary)
+        if remember:
+            self._remember(day, signature, summary)
+        return summary
+
+    def _remember(self, day: str, signature: list, summary: Summary) -> None:
+        with self._lock:
+            self._memo[day] = (signature, summary)
+
+    def _prefetch(self, days: Iterable[str]) -> None:
+        """Load the stored rollups of *days* in one pass; days without one are left to :meth:`day`."""
+
+        today = _today()
+        for day in days:
+            signature = self.signature(day)
+            if signature is None:
+                continue
+            memo = self._memo.get(day)
+            if memo is not None and memo[0] == signature:
+                continue
+            summary = self._read_rollup(day, signature) if day < today else None
+            if summary is not None:
+                self._remember(day, signature, summary)
+
+    def month(self, month: str) -> Summary:
+        prefix = month + "-"
+        days = [d for d in self.days() if d.startswith(prefix)]
+        return self._month(month, days, tuple((d, self.signature(d)) for d in days))
+
+    def _month(self, month: str, days: List[str], key: tuple) -> Summary:
+        memo = self._month_memo.get(month)
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        self._prefetch(days)
+        summary = merge(self.day(d) for d in days)
+        with self._lock:
+            self._month_memo[month] = (key, summary)
+        return summary
+
+    def all_time(self) -> Summary:
+        """Every month merged; months before the current one are merged once per version."""
+
+        by_month: Dict[str, List[str]] = {}
+        for day in self.days():
+            by_month.setdefault(day[:7], []).append(day)
+        keys = {m: tuple((d, self.signature(d)) for d in days) for m, days in by_month.items()}
+        key = tuple(keys.items())
+        memo = self._all_time_memo
+        if memo is not None and memo[0] == key:
+            return memo[1]
+
+        current = _today()[:7]
+        closed_key = tuple((m, k) for m, k in key if m < current)
+        closed = self._closed_memo
+        if closed is None or closed[0] != closed_key:
+            closed = (closed_key, merge(self._month(m, by_month[m], k) for m, k in closed_key))
+        summary = merge([closed[1]] + [self._month(m, by_month[m], k) for m, k in key if m >= current])
+        with self._lock:
+            self._closed_memo = closed
+            self._all_time_memo = (key, summary)
+        return summary
+
+    def build(self, force: bool = False) -> int:
+        """Materialize every closed day; returns how many rollups were written."""
+
+        today = _today()
+        stale = []
+        for day in self.days():
+            if day >= today:
+                continue
+            signature = self.signature(day)
+            if signature is None:
+                continue
+            if force or self._read_rollup(day, signature) is None:
+                stale.append((day, signature))
+        workers = self.workers if len(stale) >= self.parallel_min_days else 1
+        summaries = scan([self.sources(day) for day, _ in stale], workers)
+        for (day, signature), summary in zip(stale, summaries):
+            self._write_rollup(day, signature, summary)
+        written = len(stale)
+        with self._lock:
+            self._memo.clear()
+            self._month_memo.clear()
+            self._closed_memo = self._all_time_memo = None
+        return written
+
+    # ---- rollup files ----
+    def _read_rollup(self, day: str, signature: Optional[list]) -> Optional[Summary]:
+        """The stored summary of *day* if built from *signature* (``None``: any)."""
+
+        try:
+            data = json_codec.load_path(self.rollup_path(day))
+        except (OSError, ValueError):
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != ROLLUP_VERSION
+            or (signature is not None and data.get("source") != signature)
+        ):
+            return None
+        summary = empty_summary()
+        for section in summary:
+            summary[section] = data.get(section) or summary[section]
+        return summary
+
+    def _write_rollup(self, day: str, signature: list, summary: Summary) -> None:
+        # derived data: a failed write only means the day is scanned again next time
+        payload = {"version": ROLLUP_VERSION, "day": day, "source": signature, **summary}
+        tmp_name = None
+        try:
+            self.rollup_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(self.rollup_dir), prefix=day + ".", suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(json_codec.dumps_bytes(payload, pretty=False))
+            os.replace(tmp_name, self.rollup_path(day))
+        except OSError:
+            if tmp_name and os.path.exists(tmp_name):
+                os.remove(tmp_name)
@@ -0,0 +1,142 @@
+"""Per-worker time series (day / week / month buckets) over the daily rollups.
+
+The closed days of ``AnalyticsRollups`` are laid out once into dense
+per-worker arrays indexed by calendar day (``array('L')`` per metric), and
+kept until one of those days changes. A query then only slices and sums
+arrays – it never looks at raw events – and today's live summary is added
+on top. Charting hundreds of workers over years costs a few array passes.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import analytics_rollup
+from .analytics_rollup import METRICS, AnalyticsRollups
+
+BUCKETS = ("day", "week", "month")
+
+
+def bucket_label(day: date, bucket: str) -> str:
+    """``YYYY-MM-DD`` (day), the Monday of its ISO week (week) or ``YYYY-MM`` (month)."""
+
+    if bucket == "week":
+        return (day - timedelta(days=day.weekday())).isoformat()
+    if bucket == "month":
+        return day.strftime("%Y-%m")
+    return day.isoformat()
+
+
+def _ctr(clicks: int, views: int) -> float:
+    return round(clicks / views * 100, 1) if views else 0.0
+
+
+@dataclass(frozen=True)
+class _Timeline:
+    key: tuple
+    first: date
+    length: int = 0
+    series: Dict[str, Dict[str, array]] = field(default_factory=dict)  # worker -> metric -> per-day counts
+
+
+class SeriesIndex:
+    """Bucketed views / calls / WhatsApp / CTR per worker, from precomputed arrays."""
+
+    def __init__(self, rollups: AnalyticsRollups) -> None:
+        self.rollups = rollups
+        self._lock = threading.Lock()
+        self._timeline: Optional[_Timeline] = None
+
+    def _closed_days(self) -> List[str]:
+        today = analytics_rollup._today()
+        return [d for d in self.rollups.days() if d < today]
+
+    def _current(self) -> _Timeline:
+        days = self._closed_days()
+        key = tuple((d, self.rollups.signature(d)) for d in days)
+        timeline = self._timeline
+        if timeline is not None and timeline.key == key:
+            return timeline
+        with self._lock:
+            timeline = self._timeline
+            if timeline is None or timeline.key != key:
+                timeline = self._timeline = self._build(days, key)
+            return timeline
+
+    def _build(self, days: List[str], key: tuple) -> _Timeline:
+        if not days:
+            return _Timeline(key=key, first=date.fromisoformat(analytics_rollup._today()))
+        self.rollups._prefetch(days)
+        first = date.fromisoformat(days[0])
+        length = (date.fromisoformat(days[-1]) - first).days + 1
+        series: Dict[str, Dict[str, array]] = {}
+        for day in days:
+            idx = (date.fromisoformat(day) - first).days
+            for wid, counts in self.rollups.day(day)["workers"].items():
+                arrays = series.get(wid)
+                if arrays is None:
+                    arrays = series[wid] = {m: array("L", [0]) * length for m in METRICS}
+                for metric in METRICS:
+                    arrays[metric][idx] += int(counts.get(metric, 0))
+        return _Timeline(key=key, first=first, length=length, series=series)
+
+    def query(
+        self,
+        worker_ids: Iterable[str],
+        start: date,
+        end: date,
+        bucket: str = "day",
+    ) -> Dict[str, object]:
+        """Series for *worker_ids* over ``[start, end]`` (inclusive)."""
+
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        if end < start:
+            raise ValueError("end is before start")
+
+        timeline = self._current()
+        labels: List[str] = []
+        slots: List[int] = []  # bucket index of every day in the range
+        for offset in range((end - start).days + 1):
+            label = bucket_label(start + timedelta(days=offset), bucket)
+            if not labels or labels[-1] != label:
+                labels.append(label)
+            slots.append(len(labels) - 1)
+
+        today = date.fromisoformat(analytics_rollup._today())
+        live = self.rollups.day(today.isoformat())["workers"] if start <= today <= end else {}
+
+        workers: Dict[str, Dict[str, list]] = {}
+        for wid in dict.fromkeys(str(w) for w in worker_ids):
+            out = {m: [0] * len(labels) for m in METRICS}
+            arrays = timeline.series.get(wid)
+            if arrays is not None:
+                lo, hi = self._overlap(timeline, start, end)
+                base = (timeline.first - start).days
+                for metric in METRICS:
+                    buckets, values = out[metric], arrays[metric]
+                    for i in range(lo, hi):
+                        if values[i]:
+                            buckets[slots[base + i]] += values[i]
+            if wid in live:
+                slot = slots[(today - start).days]
+                for metric in METRICS:
+                    out[metric][slot] += int(live[wid].get(metric, 0))
+            out["ctr_call"] = [_ctr(c, v) for c, v in zip(out["calls"], out["views"])]
+            out["ctr_wa"] = [_ctr(w, v) for w, v in zip(out["wa"], out["views"])]
+            out["totals"] = {m: sum(out[m]) for m in METRICS}
+            workers[wid] = out
+        return {"bucket": bucket, "start": start.isoformat(), "end": end.isoformat(),
+                "buckets": labels, "workers": workers}
+
+    @staticmethod
+    def _overlap(timeline: _Timeline, start: date, end: date) -> Tuple[int, int]:
+        """Timeline index range ``[lo, hi)`` that falls inside ``[start, end]``."""
+
+        lo = max(0, (start - timeline.first).days)
+        hi = min(timeline.length, (end - timeline.first).days + 1)
+        return lo, max(lo, hi)
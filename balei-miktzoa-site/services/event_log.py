@@ -0,0 +1,208 @@
+"""Buffered, asynchronous appends to JSON Lines event logs.
+
+Tracking endpoints used to open the day's log, append one line and close it
+inside the request. ``BufferedEventWriter`` moves that off the request
+path: ``submit(path, record)`` only puts the record on a bounded in-memory
+queue, and a background thread writes whole batches – one ``write()`` per
+target file – when
+
+* ``batch_size`` records are waiting,
+* the oldest waiting record is ``flush_interval`` seconds old,
+* ``flush()`` is called, or the process exits (``close()`` runs ``atexit``).
+
+When the queue is full the ``policy`` decides what happens:
+
+* ``drop_new`` (default) – the incoming record is discarded;
+* ``drop_oldest`` – the oldest queued record makes room for it;
+* ``block`` – the caller waits up to ``block_timeout`` seconds for room,
+  then the record is discarded.
+
+Every discarded record is counted in ``stats()["dropped"]``. Analytics are
+best-effort by design: records still queued when the process is killed
+(SIGKILL) are lost.
+
+The background thread is started lazily and restarted after ``fork()``, so a
+writer created before gunicorn forks its workers behaves correctly in each
+of them.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import json_codec
+
+POLICIES = ("drop_new", "drop_oldest", "block")
+
+
+class BufferedEventWriter:
+    """Process-wide queue of ``(path, record)`` appends drained by one thread."""
+
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        policy: str = "drop_new",
+        block_timeout: float = 0.05,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"unknown drop policy {policy!r} (expected one of {', '.join(POLICIES)})")
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, min(int(batch_size), self.max_queue))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._queue: deque = deque()  # (path, record, enqueued_at)
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._flush_requested = False
+        self._submitted = 0  # sequence numbers, for flush()
+        self._done = 0
+        self._counters = {"submitted": 0, "written": 0, "dropped": 0, "write_errors": 0}
+
+    # ---- producer side ----
+    def submit(self, path, record: Dict[str, Any]) -> bool:
+        """Queue *record* for appending to *path*; ``False`` if it was dropped."""
+
+        if self._pid != os.getpid():
+            self._reset()  # forked child: the parent's thread and queue are not ours
+        item = (Path(path), record, time.monotonic())
+        with self._cond:
+            if self._closing:
+                self._counters["dropped"] += 1
+                return False
+            self._ensure_thread()
+            if len(self._queue) >= self.max_queue:
+                if self.policy == "drop_oldest":
+                    self._queue.popleft()
+                    self._done += 1
+                    self._counters["dropped"] += 1
+                elif self.policy == "block":
+                    self._cond.notify_all()
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._cond.wait(remaining):
+                            break
+                if len(self._queue) >= self.max_queue:
+                    self._counters["dropped"] += 1
+                    return False
+            self._queue.append(item)
+            self._submitted += 1
+            self._counters["submitted"] += 1
+            if len(self._queue) >= self.batch_size or len(self._queue) == 1:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Write everything queued so far; ``True`` once it is on disk."""
+
+        if self._pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted
+            if self._done >= target:
+                return True
+            self._ensure_thread()
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._done < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush and stop the background thread; later submits are dropped."""
+
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._counters, queued=len(self._queue))
+
+    # ---- consumer side ----
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+            self._thread.start()
+
+    def _take_batch(self) -> list:
+        """Wait for a batch to become due and pop it (lock held by caller)."""
+
+        while True:
+            if not self._queue:
+                if self._closing:
+                    return []
+                self._flush_requested = False
+                self._cond.wait()
+                continue
+            due = self._queue[0][2] + self.flush_interval
+            now = time.monotonic()
+            if (
+                len(self._queue) >= self.batch_size
+                or self._flush_requested
+                or self._closing
+                or now >= due
+            ):
+                break
+            self._cond.wait(due - now)
+        count = min(len(self._queue), self.batch_size)
+        return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+                if not batch:
+                    return
+                self._cond.notify_all()  # room for blocked producers
+            written, failed = self._write(batch)
+            with self._cond:
+                self._done += len(batch)
+                self._counters["written"] += written
+                self._counters["write_errors"] += failed
+                self._cond.notify_all()
+
+    @staticmethod
+    def _write(batch: list) -> tuple:
+        by_path: Dict[Path, list] = {}
+        for path, record, _ in batch:
+            try:
+                line = json_codec.dumps_bytes(record, pretty=False, default=str) + b"\n"
+            except Exception:
+                continue
+            by_path.setdefault(path, []).append(line)
+        written = failed = 0
+        for path, lines in by_path.items():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "ab") as f:
+                    f.write(b"".join(lines))
+                written += len(lines)
+            except OSError:
+                failed += len(lines)
+        failed += len(batch) - written - failed
+        return written, failed
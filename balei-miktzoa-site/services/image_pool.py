@@ -0,0 +1,94 @@
+"""A small, bounded worker pool for Pillow work (decode / resize / encode).
+
+Image work used to run on the request threads with no limit, so a burst of
+cold ``/img`` requests could take every thread of a process and stall the
+HTML pages behind it. ``ImagePool`` runs it on ``workers`` dedicated
+threads instead (Pillow releases the GIL while resampling and encoding):
+
+* **single-flight** – jobs are submitted under a key (the variant cache key);
+  while a job is queued or running, submitting the same key returns the same
+  future instead of rendering the variant again;
+* **backpressure** – at most ``max_pending`` distinct jobs may be queued or
+  running; beyond that :meth:`submit` raises :class:`PoolBusy` at once, and
+  :meth:`run` also raises it when the result is not ready within ``wait``
+  seconds (the job keeps running and still fills the cache), so callers
+  can answer ``503`` with ``Retry-After`` instead of queueing without bound.
+
+Like ``BufferedEventWriter``, the threads are started lazily and recreated
+after ``fork()``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolBusy(RuntimeError):
+    """The pool is full (or the job did not finish in time); retry later."""
+
+
+class ImagePool:
+    def __init__(self, workers: int = 2, max_pending: int = 16, wait: float = 10.0) -> None:
+        self.workers = max(1, int(workers))
+        self.max_pending = max(self.workers, int(max_pending))
+        self.wait = wait
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[Any, Future] = {}
+        self._counters = {"submitted": 0, "deduped": 0, "rejected": 0, "timeouts": 0, "failed": 0}
+
+    def submit(self, key, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedule ``fn(*args, **kwargs)`` under *key*; joins a job already in flight."""
+
+        if self._pid != os.getpid():
+            self._reset()  # forked child: the parent's threads are not ours
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None and not future.done():
+                self._counters["deduped"] += 1
+                return future
+            if len(self._inflight) >= self.max_pending:
+                # finished jobs whose done-callback has not run yet do not count
+                for done_key in [k for k, f in self._inflight.items() if f.done()]:
+                    del self._inflight[done_key]
+            if len(self._inflight) >= self.max_pending:
+                self._counters["rejected"] += 1
+                raise PoolBusy(f"{len(self._inflight)} image jobs pending")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-pool")
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._inflight[key] = future
+            self._counters["submitted"] += 1
+        future.add_done_callback(lambda f, key=key: self._done(key, f))
+        return future
+
+    def _done(self, key, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if not future.cancelled() and future.exception() is not None:
+                self._counters["failed"] += 1
+
+    def run(self, key, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """:meth:`submit` and wait up to ``wait`` seconds for the result (job errors propagate)."""
+
+        future = self.submit(key, fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.wait)
+        except FutureTimeout:
+            with self._lock:
+                self._counters["timeouts"] += 1
+            raise PoolBusy("image job did not finish in time") from None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters, pending=len(self._inflight), workers=self.workers,
+                        max_pending=self.max_pending)
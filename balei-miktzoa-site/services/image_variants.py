@@ -0,0 +1,300 @@
+"""Resized image variants for the ``/img`` proxy, with an on-disk cache.
+
+:func:`render_variant` is the resize / re-encode step. :class:`VariantCache`
+keeps its output on disk, content-addressed by the source file (path,
+mtime, size) and every output parameter (``w``, ``h``, ``fit``, ``q``,
+format), so a repeated request costs one file read and replacing a source
+image simply produces new keys.
+
+* entries are written to a temp file and ``os.replace``-d into place, so
+  readers never see a partial file and concurrent renders of the same
+  variant are harmless (last one wins, same bytes);
+* hits refresh the entry's mtime (at most once a minute), which makes mtime
+  the LRU clock;
+* when the cache grows past ``max_bytes`` the least recently used entries
+  are deleted down to ``low_water`` of it, under a file lock shared by all
+  app processes.
+
+Requested widths, aspect ratios and qualities are snapped to small fixed
+sets (:func:`snap_size`, :func:`snap`) and heights clamped before keying,
+so the number of variants per source stays bounded whatever clients ask
+for.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+from .json_store import exclusive_lock
+
+CONTENT_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+FITS = ("cover", "contain")
+
+DEFAULT_WIDTHS = (160, 240, 320, 480, 640, 800, 960, 1200, 1600, 2000)
+DEFAULT_QUALITIES = (50, 60, 70, 75, 80, 85, 90)
+# height / width of a cropped variant: landscape banners to tall portraits
+ASPECT_RATIOS = (0.25, 1 / 3, 0.4, 0.5, 9 / 16, 0.6, 2 / 3, 0.75, 0.8, 1.0, 1.25, 4 / 3, 1.5, 16 / 9, 2.0, 2.5, 3.0)
+
+
+def parse_steps(text: Optional[str], default: Iterable[int]) -> Tuple[int, ...]:
+    """``"320, 640,1200"`` -> ``(320, 640, 1200)``; *default* if empty or invalid."""
+
+    try:
+        steps = sorted({int(x) for x in (text or "").replace(";", ",").split(",") if x.strip()})
+    except ValueError:
+        steps = []
+    steps = [x for x in steps if x > 0]
+    return tuple(steps) if steps else tuple(sorted(default))
+
+
+def snap(value: int, steps: Sequence[int], up: bool = True) -> int:
+    """The smallest step ``>= value`` (*up*) or the nearest step; clamped to the range."""
+
+    if up:
+        for step in steps:
+            if step >= value:
+                return step
+        return steps[-1]
+    return min(steps, key=lambda step: (abs(step - value), step))
+
+
+def snap_ratio(ratio: float, ratios: Sequence[float] = ASPECT_RATIOS) -> float:
+    """The entry of *ratios* closest to *ratio* (height / width), on a log scale."""
+
+    return min(ratios, key=lambda r: abs(math.log(r / ratio)))
+
+
+def snap_size(
+    w: Optional[int],
+    h: Optional[int],
+    steps: Sequence[int],
+    ratios: Sequence[float] = ASPECT_RATIOS,
+) -> Tuple[Optional[int], Optional[int]]:
+    """Snap the width (or a lone height) up to a step, and the aspect ratio to one of *ratios*.
+
+    The height is clamped to the largest step, so a ``w``/``h`` pair always
+    maps to one of ``len(steps) * len(ratios)`` sizes.
+    """
+
+    w = w if w and w > 0 else None
+    h = h if h and h > 0 else None
+    if w:
+        snapped = snap(w, steps)
+        if h:
+            h = min(steps[-1], max(1, round(snapped * snap_ratio(h / w, ratios))))
+        return snapped, h
+    if h:
+        return None, snap(h, steps)
+    return None, None
+
+
+# JPEG fast path: decode at 1/2, 1/4 or 1/8 scale (``draft``) and resample with
+# ``reducing_gap`` when the output is at most FAST_MAX_SCALE of the source
+FAST_MAX_SCALE = 0.5
+REDUCING_GAP = 2.0
+# part of every cache key / ETag: bump when the rendering output changes
+RENDER_VERSION = 2
+
+
+def _target_size(src: Tuple[int, int], w: Optional[int], h: Optional[int]) -> Optional[Tuple[int, int]]:
+    if not (w or h):
+        return None
+    if not w:
+        w = int(h * (src[0] / src[1]))
+    if not h:
+        h = int(w / (src[0] / src[1]))
+    return w, h
+
+
+def _scale(src: Tuple[int, int], size: Tuple[int, int], fit: str) -> float:
+    """How much of the source resolution the output needs (``cover`` fills, ``contain`` fits)."""
+
+    sx, sy = size[0] / src[0], size[1] / src[1]
+    return min(sx, sy) if fit == "contain" else max(sx, sy)
+
+
+def _fast_resize(im: Image.Image, size: Tuple[int, int], fit: str) -> Image.Image:
+    """``ImageOps.fit``/``contain`` (centered) with ``reducing_gap`` resampling."""
+
+    if fit == "contain":
+        im_ratio, dest_ratio = im.width / im.height, size[0] / size[1]
+        if im_ratio > dest_ratio:
+            size = (size[0], max(1, round(im.height / im.width * size[0])))
+        elif im_ratio < dest_ratio:
+            size = (max(1, round(im.width / im.height * size[1])), size[1])
+        return im.resize(size, Image.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    out_ratio = size[0] / size[1]
+    if im.width / im.height >= out_ratio:
+        crop_w, crop_h = out_ratio * im.height, im.height
+    else:
+        crop_w, crop_h = im.width, im.width / out_ratio
+    left, top = (im.width - crop_w) / 2, (im.height - crop_h) / 2
+    return im.resize(size, Image.LANCZOS, box=(left, top, left + crop_w, top + crop_h),
+                     reducing_gap=REDUCING_GAP)
+
+
+def render_variant(
+    src_path,
+    w: Optional[int],
+    h: Optional[int],
+    fit: str,
+    q: int,
+    fmt_out: str,
+    webp_method: int = 4,
+    fast: bool = True,
+) -> bytes:
+    """Resize *src_path* to ``w``×``h`` (``cover`` crops, ``contain`` fits) and encode as *fmt_out*.
+
+    Large downscales of JPEG sources take the ``draft`` + ``reducing_gap``
+    fast path unless *fast* is false.
+    """
+
+    with Image.open(src_path) as im:
+        size = _target_size(im.size, w, h)
+        use_fast = (
+            fast and size is not None and im.format == "JPEG"
+            and _scale(im.size, size, fit) <= FAST_MAX_SCALE
+        )
+        if use_fast:
+            # the decoder picks the smallest 1/2^n scale still >= the requested size
+            need = _scale(im.size, size, fit) * REDUCING_GAP
+            im.draft(im.mode, (max(1, int(im.width * need)), max(1, int(im.height * need))))
+
+        if fmt_out == "JPEG":
+            if im.mode in ("RGBA", "LA"):
+                bg = Image.new("RGB", im.size, (255, 255, 255))
+                bg.paste(im, mask=im.split()[-1])
+                im = bg
+            else:
+                im = im.convert("RGB")
+        else:
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+
+        if size is None:
+            out = im
+        elif use_fast:
+            out = _fast_resize(im, size, fit)
+        else:
+            out = ImageOps.contain(im, size, Image.LANCZOS) if fit == "contain" \
+                else ImageOps.fit(im, size, Image.LANCZOS, centering=(0.5, 0.5))
+
+        buf = BytesIO()
+        save_kwargs = {}
+        if fmt_out == "JPEG":
+            save_kwargs.update(quality=q, optimize=True, progressive=False)
+        elif fmt_out == "WEBP":
+            save_kwargs.update(quality=q, method=webp_method)
+        elif fmt_out == "PNG":
+            save_kwargs.update(optimize=True)
+        out.save(buf, fmt_out, **save_kwargs)
+        return buf.getvalue()
+
+
+class VariantCache:
+    def __init__(self, cache_dir, max_bytes: int = 512 * 1024 * 1024, low_water: float = 0.8) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max(0, int(max_bytes))
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # this process's running estimate, corrected on each eviction scan
+
+    @staticmethod
+    def key(src_path, st: os.stat_result, w, h, fit: str, q: int, fmt_out: str, extra: str = "") -> str:
+        raw = "\0".join(map(str, (RENDER_VERSION, os.path.abspath(src_path), st.st_mtime_ns, st.st_size,
+                                   w, h, fit, q, fmt_out, extra)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, key: str, fmt_out: str) -> Path:
+        return self.cache_dir / key[:2] / (key + EXTENSIONS[fmt_out])
+
+    def get(self, key: str, fmt_out: str) -> Optional[Path]:
+        """The cached file of *key*, or ``None``; a hit counts as a use for LRU."""
+
+        path = self.path(key, fmt_out)
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        now = time.time()
+        if now - st.st_mtime > 60:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return path
+
+    def put(self, key: str, fmt_out: str, data: bytes) -> Optional[Path]:
+        """Store *data* atomically; ``None`` if the cache is disabled or not writable."""
+
+        if not self.max_bytes or len(data) > self.max_bytes:
+            return None
+        path = self.path(key, fmt_out)
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=".", suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except OSError:
+            if tmp_name and os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            return None
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += len(data)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    def _scan(self) -> Tuple[list, int]:
+        entries, total = [], 0
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.startswith(".") or name.endswith(".lock"):
+                    continue  # in-flight temp file / the eviction lock
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        return entries, total
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache is under ``low_water``; returns bytes freed."""
+
+        freed = 0
+        with exclusive_lock(self.cache_dir / "evict"):
+            entries, total = self._scan()
+            if total > self.max_bytes:
+                target = int(self.max_bytes * self.low_water)
+                for _mtime, size, path in sorted(entries):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    freed += size
+        with self._lock:
+            self._size = total
+        return freed
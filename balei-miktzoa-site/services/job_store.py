@@ -0,0 +1,196 @@
+"""Background job bookkeeping shared by every app process.
+
+Admin "generate description" jobs are started in whichever gunicorn worker
+received the click, but their status is polled from any worker. The jobs
+live in a small SQLite database (WAL mode) next to the data files:
+
+* :meth:`JobStore.start` creates a job for a request, or hands back the one
+  already queued/running for it (per-request dedup), in one transaction.
+* :meth:`JobStore.transition` moves a job between states only if it is in
+  one of the expected states, so a late ``done`` cannot be overwritten by a
+  stale ``running`` and vice versa.
+* Finished jobs expire after ``ttl`` seconds (:meth:`JobStore.prune`), and a
+  queued/running job that has not been touched for ``stale_after`` seconds
+  (its process died) no longer blocks a new one. A worker keeps its job
+  fresh with :meth:`JobStore.heartbeat` – :meth:`JobStore.keepalive` does it
+  from a timer thread around a long call – so ``stale_after`` only has to
+  outlast a missed beat, not the longest job.
+"""
+
+from __future__ import annotations
+
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from . import json_codec
+
+Job = Dict[str, Any]
+
+ACTIVE = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       TEXT PRIMARY KEY,
+    req_id       TEXT NOT NULL,
+    kind         TEXT NOT NULL DEFAULT '',
+    status       TEXT NOT NULL,
+    record_type  TEXT,
+    result       TEXT,
+    error        TEXT,
+    generated_at TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_req ON jobs(kind, req_id, created_at);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs(updated_at);
+"""
+
+_FIELDS = ("record_type", "result", "error", "generated_at")
+
+
+class JobStore:
+    """SQLite-backed job table; safe across threads and processes."""
+
+    def __init__(self, db_path, ttl: float = 3600, stale_after: float = 900, kind: str = "") -> None:
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.kind = kind
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_job(row: Optional[sqlite3.Row]) -> Optional[Job]:
+        if row is None:
+            return None
+        job = dict(row)
+        if job.get("result") is not None:
+            job["result"] = json_codec.loads(job["result"])
+        return job
+
+    # ---- lifecycle ----
+    def start(self, req_id: str, record_type: Optional[str] = None) -> Tuple[Job, bool]:
+        """Return ``(job, created)``; reuses a live job for the same *req_id*."""
+
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND req_id = ? AND status IN (?, ?) AND updated_at >= ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (self.kind, req_id, *ACTIVE, now - self.stale_after),
+            ).fetchone()
+            if row is None:
+                job_id = secrets.token_hex(12)
+                conn.execute(
+                    "INSERT INTO jobs(job_id, req_id, kind, status, record_type, created_at, updated_at) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                    (job_id, req_id, self.kind, record_type, now, now),
+                )
+                row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                created = True
+            else:
+                created = False
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self._to_job(row), created
+
+    def transition(self, job_id: str, status: str, expected: Iterable[str] = ACTIVE, **fields: Any) -> bool:
+        """Set *status* (and *fields*) only if the job is in an *expected* state."""
+
+        expected = tuple(expected)
+        unknown = set(fields) - set(_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown job fields: {sorted(unknown)}")
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json_codec.dumps(fields["result"], pretty=False, default=str)
+        assignments = ", ".join(["status = ?", "updated_at = ?"] + [f"{k} = ?" for k in fields])
+        cur = self._conn().execute(
+            f"UPDATE jobs SET {assignments} WHERE job_id = ? AND status IN ({', '.join('?' * len(expected))})",
+            (status, time.time(), *fields.values(), job_id, *expected),
+        )
+        return cur.rowcount == 1
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Mark a queued/running job as alive; ``False`` once it has finished (or is gone)."""
+
+        cur = self._conn().execute(
+            "UPDATE jobs SET updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+            (time.time(), job_id, *ACTIVE),
+        )
+        return cur.rowcount == 1
+
+    @contextmanager
+    def keepalive(self, job_id: str, interval: Optional[float] = None) -> Iterator[None]:
+        """Heartbeat *job_id* every *interval* seconds (default: ``stale_after / 3``) inside the block."""
+
+        interval = self.stale_after / 3 if interval is None else interval
+        stop = threading.Event()
+
+        def _beat() -> None:
+            while not stop.wait(interval):
+                try:
+                    if not self.heartbeat(job_id):
+                        return
+                except sqlite3.Error:
+                    pass  # a missed beat is retried on the next tick
+
+        thread = threading.Thread(target=_beat, name=f"job-heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    # ---- reads ----
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_job(row)
+
+    def latest_for(self, req_id: str) -> Optional[Job]:
+        """Most recent job of *req_id* that has not expired."""
+
+        row = self._conn().execute(
+            "SELECT * FROM jobs WHERE kind = ? AND req_id = ? AND updated_at >= ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (self.kind, req_id, time.time() - self.ttl),
+        ).fetchone()
+        return self._to_job(row)
+
+    # ---- maintenance ----
+    def prune(self, max_age: Optional[float] = None) -> int:
+        """Delete finished jobs not updated within *max_age* (default: the TTL).
+
+        A queued/running job is only deleted once it is also past
+        ``stale_after`` (its process died); a live one is never pruned.
+        """
+
+        now = time.time()
+        cutoff = now - (self.ttl if max_age is None else max_age)
+        stale = min(cutoff, now - self.stale_after)
+        cur = self._conn().execute(
+            "DELETE FROM jobs WHERE kind = ? AND ("
+            "(status NOT IN (?, ?) AND updated_at < ?) OR (status IN (?, ?) AND updated_at < ?))",
+            (self.kind, *ACTIVE, cutoff, *ACTIVE, stale),
+        )
+        return cur.rowcount
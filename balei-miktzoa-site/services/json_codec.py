@@ -0,0 +1,102 @@
+"""JSON encoding/decoding for everything under ``data/``.
+
+Uses ``orjson`` when it is installed and falls back to the stdlib ``json``
+module otherwise; callers never need to know which one is active. Output
+matches ``json.dumps(..., ensure_ascii=False)``: UTF-8 text, non-string
+dict keys allowed, and ``default=`` applied to datetimes/dataclasses just
+like the stdlib does.
+
+Data files are written in one of two layouts, chosen with the
+``JSON_DATA_FORMAT`` environment variable:
+
+* ``compact`` (default) – no indentation or spaces; smallest and fastest.
+* ``pretty`` – ``indent=2``, for files people read or edit by hand.
+
+Decode errors are always ``json.JSONDecodeError`` (orjson's error type is a
+subclass), so existing ``except json.JSONDecodeError`` blocks keep working.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import IO, Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+FORMATS = ("compact", "pretty")
+DATA_FORMAT = (os.environ.get("JSON_DATA_FORMAT") or "compact").strip().lower()
+if DATA_FORMAT not in FORMATS:
+    DATA_FORMAT = "compact"
+
+if orjson is not None:
+    _OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    _OPTS_PRETTY = _OPTS | orjson.OPT_INDENT_2
+
+
+def _pretty(pretty: Optional[bool]) -> bool:
+    return DATA_FORMAT == "pretty" if pretty is None else pretty
+
+
+def _stdlib_dumps(obj: Any, pretty: bool, default: Optional[Callable[[Any], Any]]) -> str:
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default)
+
+
+def dumps_bytes(obj: Any, *, pretty: Optional[bool] = None,
+                default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Encode to UTF-8 bytes; *pretty* ``None`` follows ``JSON_DATA_FORMAT``."""
+
+    pretty = _pretty(pretty)
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=_OPTS_PRETTY if pretty else _OPTS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits – let the stdlib handle it
+    return _stdlib_dumps(obj, pretty, default).encode("utf-8")
+
+
+def dumps(obj: Any, *, pretty: Optional[bool] = None,
+          default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Encode to ``str`` (see :func:`dumps_bytes`)."""
+
+    if orjson is not None:
+        return dumps_bytes(obj, pretty=pretty, default=default).decode("utf-8")
+    return _stdlib_dumps(obj, _pretty(pretty), default)
+
+
+def loads(data: Any) -> Any:
+    """Decode ``str``/``bytes``; raises ``json.JSONDecodeError`` on bad input."""
+
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # the stdlib also accepts NaN/Infinity; re-raise its error otherwise
+            pass
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def load(fp: IO) -> Any:
+    """Decode a whole file object (text or binary mode)."""
+
+    return loads(fp.read())
+
+
+def load_path(path) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def to_plain(obj: Any) -> Any:
+    """Deep copy into plain JSON types (non-JSON values become ``str``)."""
+
+    return loads(dumps_bytes(obj, pretty=False, default=str))
@@ -1,20 +1,43 @@
-"""Thread-safe helpers for atomic JSON persistence."""
+"""Thread- and process-safe helpers for atomic JSON persistence.
+
+Writers serialize on two levels: a per-path ``threading.Lock`` inside the
+process and an exclusive ``fcntl.flock`` on a ``<file>.lock`` sidecar across
+processes (gunicorn workers). ``read_json`` takes the same sidecar lock in
+shared mode. On platforms without ``fcntl`` (Windows) only the in-process
+lock applies.
+"""
 
 from __future__ import annotations
 
+import copy
 import json
 import os
 import tempfile
 import threading
+import time
+from concurrent.futures import Future
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Callable, TypeVar
+from typing import Any, Callable, TypeVar
+
+from . import json_codec
+
+try:  # POSIX only; on Windows we fall back to in-process locking
+    import fcntl
+except ImportError:  # pragma: no cover - platform dependent
+    fcntl = None  # type: ignore[assignment]
 
 T = TypeVar("T")
 
 _LOCKS: dict[str, threading.Lock] = {}
 _LOCKS_GUARD = threading.Lock()
 
+# paths whose exclusive file lock is held by the current thread (see read_json)
+_HELD = threading.local()
+
+_COMMIT_HOOKS: dict[str, list[Callable[[Path, Any], None]]] = {}
+_HOOKS_GUARD = threading.Lock()
+
 
 def _get_lock(path: Path) -> threading.Lock:
     with _LOCKS_GUARD:
@@ -33,24 +56,178 @@ def _ensure_parent_dir(path: Path) -> None:
         pass
 
 
+def _lock_path(path: Path) -> Path:
+    return path.with_name(path.name + ".lock")
+
+
+def _held_paths() -> set[str]:
+    held = getattr(_HELD, "paths", None)
+    if held is None:
+        held = _HELD.paths = set()
+    return held
+
+
 @contextmanager
-def atomic_write_json(path: Path, default_factory: Callable[[], T] | None = None):
-    """Read-modify-write JSON atomically with an in-process lock."""
+def _file_lock(path: Path, exclusive: bool):
+    """Advisory ``flock`` on the sidecar lock file of *path*.
+
+    The sidecar is never replaced, so the lock survives the ``os.replace`` of
+    the data file. A thread that already holds the exclusive lock for *path*
+    (i.e. reads from inside an ``atomic_write_json`` block) is let through
+    rather than deadlocking against itself.
+    """
+
+    key = str(path.resolve())
+    if fcntl is None or (not exclusive and key in _held_paths()):
+        yield
+        return
+    _ensure_parent_dir(path)
+    fd = os.open(str(_lock_path(path)), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        if exclusive:
+            _held_paths().add(key)
+        try:
+            yield
+        finally:
+            if exclusive:
+                _held_paths().discard(key)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _load(path: Path) -> Any:
+    return json_codec.load_path(path)
+
+
+def read_json(path: Path, default_factory: Callable[[], T] | None = None) -> Any:
+    """Read *path* under a shared lock; missing or corrupt files give the default."""
 
     if default_factory is None:
         default_factory = dict  # type: ignore[assignment]
+    path = Path(path)
+    if not path.exists():
+        return default_factory()
+    with _file_lock(path, exclusive=False):
+        try:
+            return _load(path)
+        except (json.JSONDecodeError, OSError):
+            return default_factory()
+
+
+@contextmanager
+def exclusive_lock(path: Path):
+    """Hold the same locks ``atomic_write_json`` takes for *path*.
+
+    For side files (journals) that must not interleave with a rewrite of
+    *path*. Not re-entrant: do not call ``atomic_write_json(path)`` inside.
+    """
+
+    path = Path(path)
+    with _get_lock(path), _file_lock(path, exclusive=True):
+        yield
+
+
+@contextmanager
+def shared_lock(path: Path):
+    """Shared sidecar lock on *path* (no-op inside this thread's own write)."""
+
+    with _file_lock(Path(path), exclusive=False):
+        yield
+
+
+def append_jsonl(path: Path, record: Any) -> None:
+    """Append one JSON line and fsync; callers hold the relevant lock."""
 
     path = Path(path)
     _ensure_parent_dir(path)
-    sample = default_factory()
-    lock = _get_lock(path)
-    lock.acquire()
+    line = json_codec.dumps_bytes(record, pretty=False) + b"\n"
+    with path.open("ab") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def iter_jsonl(path: Path):
+    """Yield parsed lines of *path*, skipping blank or torn ones."""
+
     try:
+        f = Path(path).open("rb")
+    except OSError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json_codec.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def file_signature(path: Path) -> tuple[int, int, int] | None:
+    """Return ``(inode, size, mtime_ns)`` for *path*, or ``None`` if missing.
+
+    ``atomic_write_json`` always swaps in a fresh temp file, so the inode
+    changes on every commit even when size and mtime happen to collide.
+    """
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def register_commit_hook(path: Path, callback: Callable[[Path, Any], None]) -> None:
+    """Call *callback(path, data)* after every successful write to *path*."""
+
+    key = str(Path(path).resolve())
+    with _HOOKS_GUARD:
+        _COMMIT_HOOKS.setdefault(key, []).append(callback)
+
+
+def _notify_commit(path: Path, data: Any) -> None:
+    with _HOOKS_GUARD:
+        hooks = list(_COMMIT_HOOKS.get(str(path.resolve()), ()))
+    for hook in hooks:
+        try:
+            hook(path, data)
+        except Exception:
+            pass
+
+
+@contextmanager
+def atomic_write_json(
+    path: Path,
+    default_factory: Callable[[], T] | None = None,
+    on_commit: Callable[[Any, Any], None] | None = None,
+):
+    """Read-modify-write JSON atomically.
+
+    The file is re-read after both the in-process lock and the exclusive
+    sidecar ``flock`` are held, so concurrent writers in other processes
+    never lose each other's updates.
+
+    *on_commit(previous_signature, new_signature)* runs after the new file is
+    in place while the lock is still held, so callers can patch in-memory
+    indexes knowing exactly which file version the write replaced.
+    """
+
+    if default_factory is None:
+        default_factory = dict  # type: ignore[assignment]
+
+    path = Path(path)
+    _ensure_parent_dir(path)
+    sample = default_factory()
+    with _get_lock(path), _file_lock(path, exclusive=True):
+        previous_signature = file_signature(path)
         data: T
         if path.exists():
             try:
-                with path.open("r", encoding="utf-8") as f:
-                    loaded = json.load(f)
+                loaded = _load(path)
                 if isinstance(loaded, type(sample)):
                     data = loaded  # type: ignore[assignment]
                 else:
@@ -68,8 +245,8 @@ def atomic_write_json(path: Path, default_factory: Callable[[], T] | None = None
             suffix=".tmp",
         )
         try:
-            with os.fdopen(tmp_fd, "w", encoding="utf-8") as tmp:
-                json.dump(data, tmp, ensure_ascii=False, indent=2)
+            with os.fdopen(tmp_fd, "wb") as tmp:
+                tmp.write(json_codec.dumps_bytes(data))
                 tmp.flush()
                 os.fsync(tmp.fileno())
             os.replace(tmp_name, path)
@@ -79,5 +256,140 @@ def atomic_write_json(path: Path, default_factory: Callable[[], T] | None = None
                     os.remove(tmp_name)
             except OSError:
                 pass
-    finally:
-        lock.release()
\ No newline at end of file
+        if on_commit is not None:
+            try:
+                on_commit(previous_signature, file_signature(path))
+            except Exception:
+                pass
+        _notify_commit(path, data)
+
+
+# ------------------------------
+# group commit
+# ------------------------------
+class _QueuedMutation:
+    __slots__ = ("mutation", "on_commit", "future")
+
+    def __init__(self, mutation, on_commit) -> None:
+        self.mutation = mutation
+        self.on_commit = on_commit
+        self.future: Future = Future()
+
+
+def _restore(data: Any, snapshot: Any) -> None:
+    """Put *snapshot*'s contents back into *data* (the object being written)."""
+
+    if isinstance(data, dict):
+        data.clear()
+        data.update(snapshot)
+    elif isinstance(data, list):
+        data[:] = snapshot
+
+
+class GroupCommitWriter:
+    """Coalesce mutations of the same file into one read-modify-write.
+
+    ``submit(path, mutation)`` queues *mutation(data)* and returns a
+    ``Future`` that resolves to its return value once the batch holding it
+    is durable (fsync + ``os.replace``). Mutations submitted for the same
+    path within *window* seconds share a single ``atomic_write_json``, so a
+    burst of N writes costs one read, one fsync and one lock hold instead of
+    N. Atomicity per file is unchanged: the whole batch lands or none of it.
+
+    A mutation that raises fails only its own future, and none of its edits
+    are written: *data* is snapshotted once per batch, and if a mutation
+    raises the snapshot is restored and the mutations that succeeded are run
+    again without it (so a mutation may run more than once, and must only
+    touch *data*). ``on_commit`` callbacks run in submission order
+    while the file lock is held; the first one called gets
+    ``(previous, current)`` and the rest ``(current, current)``, since all of
+    their changes land in the same new version.
+    """
+
+    def __init__(self, window: float = 0.005, max_batch: int = 256) -> None:
+        self.window = window
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._queues: dict[str, tuple[Path, Callable[[], Any], list[_QueuedMutation]]] = {}
+        self._due: dict[str, float] = {}
+        self._thread: threading.Thread | None = None
+
+    def submit(
+        self,
+        path: Path,
+        mutation: Callable[[Any], Any],
+        default_factory: Callable[[], Any] | None = None,
+        on_commit: Callable[[Any, Any], None] | None = None,
+    ) -> Future:
+        path = Path(path)
+        key = str(path.resolve())
+        op = _QueuedMutation(mutation, on_commit)
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="json-group-commit", daemon=True)
+                self._thread.start()
+            entry = self._queues.get(key)
+            if entry is None:
+                entry = self._queues[key] = (path, default_factory or dict, [])
+                self._due[key] = time.monotonic() + self.window
+            entry[2].append(op)
+            if len(entry[2]) >= self.max_batch:
+                self._due[key] = time.monotonic()
+            self._cond.notify()
+        return op.future
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._due:
+                    self._cond.wait()
+                key, deadline = min(self._due.items(), key=lambda kv: kv[1])
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                del self._due[key]
+                path, default_factory, ops = self._queues.pop(key)
+            self._commit(path, default_factory, ops)
+
+    @staticmethod
+    def _commit(path: Path, default_factory, ops: list[_QueuedMutation]) -> None:
+        outcomes: list[tuple[bool, Any]] = [(False, None)] * len(ops)
+
+        def _committed(previous, current):
+            before = previous
+            for op, (ok, _) in zip(ops, outcomes):
+                if op.on_commit is None or not ok:
+                    continue
+                try:
+                    op.on_commit(before, current)
+                except Exception:
+                    pass
+                before = current
+
+        try:
+            with atomic_write_json(path, default_factory=default_factory, on_commit=_committed) as data:
+                snapshot = copy.deepcopy(data)
+                pending = range(len(ops))
+                while True:
+                    failed = False
+                    for i in pending:
+                        try:
+                            outcomes[i] = (True, ops[i].mutation(data))
+                        except Exception as exc:
+                            outcomes[i] = (False, exc)
+                            failed = True
+                    if not failed:
+                        break
+                    # only the failed callers fail: drop every partial edit and replay the rest
+                    pending = [i for i in pending if outcomes[i][0]]
+                    _restore(data, copy.deepcopy(snapshot))
+        except Exception as exc:
+            for op in ops:
+                op.future.set_exception(exc)
+            return
+        for op, (ok, value) in zip(ops, outcomes):
+            if ok:
+                op.future.set_result(value)
+            else:
+                op.future.set_exception(value)
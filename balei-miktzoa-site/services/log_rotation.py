@@ -0,0 +1,234 @@
+"""Compression, rolling and retention for the append-only logs under ``data/``.
+
+Two kinds of stream are handled:
+
+* **day files** – ``data/analytics/YYYY-MM-DD.jsonl``. Once a day is closed
+  (and has not been written for ``min_age`` seconds) it is compressed to
+  ``YYYY-MM-DD.jsonl.gz`` (or ``.zst``) and the plain file removed. Should a
+  late append recreate the plain file, the next run appends it to the
+  compressed file as another gzip member / zstd frame, so nothing is lost.
+* **rolling logs** – a single ever-growing file such as ``data/events.log``.
+  It is rolled to ``events-YYYY-MM-DD.log`` (``-N`` suffixes for several
+  rolls a day) when it passes ``max_bytes`` or when the day it was last
+  written is over, and the rolled file is compressed.
+
+Each stream has its own retention in days (``0`` keeps everything).
+:func:`open_log` opens any of these files for reading as one binary stream,
+whatever the compression.
+
+``zstd`` needs the optional ``zstandard`` package; without it the codec
+falls back to ``gzip``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+from .json_store import exclusive_lock
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None  # type: ignore[assignment]
+
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+COMPRESSED = tuple(SUFFIXES.values())
+
+_DAY_PREFIX = re.compile(r"^(\d{4}-\d{2}-\d{2})\.")
+
+
+def resolve_codec(codec: Optional[str]) -> Optional[str]:
+    """Normalize a codec name; ``None``/``"none"`` disables compression."""
+
+    codec = (codec or "").strip().lower()
+    if codec in ("", "none", "off"):
+        return None
+    if codec == "zstd" and zstandard is None:
+        return "gzip"
+    if codec not in SUFFIXES:
+        raise ValueError(f"unknown log codec {codec!r} (expected gzip, zstd or none)")
+    return codec
+
+
+def open_log(path) -> BinaryIO:
+    """Open a plain, ``.gz`` or ``.zst`` log for streaming binary reads."""
+
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{path.name}: reading .zst files needs the zstandard package")
+        raw = path.open("rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader)  # type: ignore[arg-type]
+    return path.open("rb")
+
+
+def compress_file(src, codec: str = "gzip", level: Optional[int] = None) -> Path:
+    """Compress *src* into ``<src><suffix>`` (appending if it exists) and delete *src*."""
+
+    src = Path(src)
+    codec = resolve_codec(codec) or "gzip"
+    dest = src.with_name(src.name + SUFFIXES[codec])
+    fd, tmp_name = tempfile.mkstemp(dir=str(src.parent), prefix=src.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if dest.exists():
+                with dest.open("rb") as existing:
+                    shutil.copyfileobj(existing, out)
+            with src.open("rb") as raw:
+                if codec == "gzip":
+                    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=level or 6, mtime=0) as gz:
+                        shutil.copyfileobj(raw, gz)
+                else:
+                    zstandard.ZstdCompressor(level=level or 10).copy_stream(raw, out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_name, dest)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+    src.unlink()
+    return dest
+
+
+def _utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def _cutoff(retain_days: int, today: date) -> Optional[str]:
+    return (today - timedelta(days=retain_days)).isoformat() if retain_days > 0 else None
+
+
+def compress_closed_days(directory, codec: str, today: Optional[date] = None, min_age: float = 3600) -> List[Path]:
+    """Compress ``YYYY-MM-DD.jsonl`` files of days before *today*."""
+
+    directory = Path(directory)
+    today_str = (today or _utc_today()).isoformat()
+    done = []
+    now = time.time()
+    for path in sorted(directory.glob("*.jsonl")):
+        match = _DAY_PREFIX.match(path.name)
+        if not match or match.group(1) >= today_str:
+            continue
+        try:
+            if now - path.stat().st_mtime < min_age:
+                continue  # possibly still receiving buffered writes
+        except OSError:
+            continue
+        done.append(compress_file(path, codec))
+    return done
+
+
+def prune_days(directory, retain_days: int, today: Optional[date] = None) -> List[Path]:
+    """Delete ``YYYY-MM-DD.*`` files older than *retain_days*."""
+
+    cutoff = _cutoff(retain_days, today or _utc_today())
+    if cutoff is None:
+        return []
+    removed = []
+    for path in Path(directory).glob("*-*-*.*"):
+        match = _DAY_PREFIX.match(path.name)
+        if match and match.group(1) < cutoff and path.is_file():
+            path.unlink()
+            removed.append(path)
+    return removed
+
+
+def _rolled_pattern(path: Path) -> re.Pattern:
+    return re.compile(
+        rf"^{re.escape(path.stem)}-(\d{{4}}-\d{{2}}-\d{{2}})(?:-\d+)?{re.escape(path.suffix)}(?:\.gz|\.zst)?$"
+    )
+
+
+def roll_log(path, max_bytes: int, codec: Optional[str], today: Optional[date] = None) -> Optional[Path]:
+    """Roll *path* if it is over *max_bytes* or was last written before *today*."""
+
+    path = Path(path)
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if st.st_size == 0:
+        return None
+    written = datetime.fromtimestamp(st.st_mtime, timezone.utc).date()
+    if st.st_size < max_bytes and written >= (today or _utc_today()):
+        return None
+    pattern = _rolled_pattern(path)
+    day = written.isoformat()
+    taken = {p.name for p in path.parent.iterdir() if pattern.match(p.name)}
+    n = 0
+    while True:
+        stem = f"{path.stem}-{day}" + (f"-{n}" if n else "")
+        if not any(name.startswith(stem + path.suffix) for name in taken):
+            break
+        n += 1
+    rolled = path.with_name(stem + path.suffix)
+    os.replace(path, rolled)
+    codec = resolve_codec(codec)
+    return compress_file(rolled, codec) if codec else rolled
+
+
+def prune_rolled(path, retain_days: int, today: Optional[date] = None) -> List[Path]:
+    """Delete rolled copies of *path* older than *retain_days*."""
+
+    path = Path(path)
+    cutoff = _cutoff(retain_days, today or _utc_today())
+    if cutoff is None or not path.parent.is_dir():
+        return []
+    pattern = _rolled_pattern(path)
+    removed = []
+    for candidate in path.parent.iterdir():
+        match = pattern.match(candidate.name)
+        if match and match.group(1) < cutoff:
+            candidate.unlink()
+            removed.append(candidate)
+    return removed
+
+
+@dataclass
+class LogMaintenance:
+    """One maintenance pass over the analytics day files and rolling logs.
+
+    Runs under an exclusive lock on ``<analytics_dir>/maintenance.lock``, so
+    several app processes (or the CLI) can schedule it without racing.
+    """
+
+    analytics_dir: Path
+    rollup_dir: Optional[Path] = None
+    rolling_logs: tuple = ()
+    codec: Optional[str] = "gzip"
+    analytics_retain_days: int = 0
+    rollup_retain_days: int = 0
+    rolling_retain_days: int = 0
+    rolling_max_bytes: int = 50 * 1024 * 1024
+    min_age: float = 3600
+
+    def run(self, today: Optional[date] = None) -> Dict[str, List[Path]]:
+        today = today or _utc_today()
+        analytics_dir = Path(self.analytics_dir)
+        codec = resolve_codec(self.codec)
+        report: Dict[str, List[Path]] = {"compressed": [], "rolled": [], "removed": []}
+        with exclusive_lock(analytics_dir / "maintenance"):
+            if codec:
+                report["compressed"] += compress_closed_days(analytics_dir, codec, today, self.min_age)
+            report["removed"] += prune_days(analytics_dir, self.analytics_retain_days, today)
+            if self.rollup_dir is not None:
+                report["removed"] += prune_days(self.rollup_dir, self.rollup_retain_days, today)
+            for log in self.rolling_logs:
+                rolled = roll_log(log, self.rolling_max_bytes, codec, today)
+                if rolled is not None:
+                    report["rolled"].append(rolled)
+                report["removed"] += prune_rolled(log, self.rolling_retain_days, today)
+        return report
@@ -0,0 +1,173 @@
+"""``request_id`` -> (store, position) lookups over pending and approved records.
+
+Admin routes address a join request by a stable id: the ``worker_id`` once
+approved, otherwise the stored ``request_id`` (or the id derived from the
+record by the app). Resolving one used to scan both collections and hash
+every record; the registry builds the map once and answers in O(1).
+
+Writers in this process describe their change with an :class:`Edit` and
+pass its ``on_commit`` to the storage call, so the map is patched in place
+instead of being rebuilt (like ``ReviewIndex``). Any other change – another
+process, or a write without an edit – shows up in the storage signatures
+and the map is rebuilt on the next lookup.
+
+Records are returned as shallow copies, like ``WorkerCatalog``.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+Record = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Located:
+    """Where a request lives: ``store`` name, list ``position`` and the record."""
+
+    store: str
+    position: int
+    record: Record
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    signature: Optional[tuple] = None
+    built: Optional[tuple] = None  # the signature the records were loaded at
+    records: Dict[str, List[Record]] = field(default_factory=dict)
+    ids: Dict[str, List[str]] = field(default_factory=dict)
+    by_id: Dict[str, Tuple[str, int]] = field(default_factory=dict)
+
+
+def _index(ids: Mapping[str, List[str]]) -> Dict[str, Tuple[str, int]]:
+    by_id: Dict[str, Tuple[str, int]] = {}
+    for store, store_ids in ids.items():
+        for pos, rid in enumerate(store_ids):
+            if rid and rid not in by_id:
+                by_id[rid] = (store, pos)
+    return by_id
+
+
+class Edit:
+    """The changes one write makes to a store; see :meth:`RequestRegistry.edit`."""
+
+    def __init__(self, registry: "RequestRegistry", store: str) -> None:
+        self._registry = registry
+        self._store = store
+        self._ops: List[Tuple[str, Optional[int], Optional[Record]]] = []
+
+    def inserted(self, record: Record) -> None:
+        """*record* was appended (it is read when the write commits)."""
+        self._ops.append(("insert", None, record))
+
+    def updated(self, position: int, record: Record) -> None:
+        self._ops.append(("update", position, record))
+
+    def removed(self, position: int) -> None:
+        self._ops.append(("remove", position, None))
+
+    def on_commit(self, previous, current) -> None:
+        self._registry._apply(self._store, self._ops, previous, current)
+
+
+class RequestRegistry:
+    """Cached id index over several storage collections.
+
+    *sources* maps a store name to a ``storage.Collection`` and is searched
+    in order (the first store wins on duplicate ids). *id_for(record)* must
+    not mutate the record it is given.
+    """
+
+    def __init__(self, sources: Mapping[str, Any], id_for: Callable[[Record], str]) -> None:
+        self._sources = dict(sources)
+        self._id_for = id_for
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot()
+
+    def _signature(self) -> tuple:
+        return tuple(src.signature() for src in self._sources.values())
+
+    def _current(self) -> _Snapshot:
+        signature = self._signature()
+        snap = self._snapshot
+        if snap.signature == signature and snap.records:
+            return snap
+        with self._lock:
+            signature = self._signature()
+            snap = self._snapshot
+            if snap.signature != signature or not snap.records:
+                snap = self._build(signature)
+                self._snapshot = snap
+            return snap
+
+    def _rid(self, record: Record) -> str:
+        return (self._id_for(record) or "").strip()
+
+    def _build(self, signature) -> _Snapshot:
+        records: Dict[str, List[Record]] = {}
+        ids: Dict[str, List[str]] = {}
+        for store, src in self._sources.items():
+            records[store] = src.load()
+            ids[store] = [self._rid(item) for item in records[store]]
+        return _Snapshot(signature=signature, built=signature, records=records, ids=ids, by_id=_index(ids))
+
+    def invalidate(self) -> None:
+        self._snapshot = _Snapshot()
+
+    # ---- incremental updates ----
+    def edit(self, store: str) -> Edit:
+        """Record changes to *store*, then pass ``edit.on_commit`` to the write."""
+
+        if store not in self._sources:
+            raise KeyError(store)
+        return Edit(self, store)
+
+    def _apply(self, store: str, ops, previous, current) -> None:
+        slot = list(self._sources).index(store)
+        with self._lock:
+            snap = self._snapshot
+            if snap.signature is None or snap.signature[slot] != previous:
+                self._snapshot = _Snapshot()  # unknown base version: rebuild on the next lookup
+                return
+            if previous == current and snap.built[slot] == current:
+                return  # a later change of a group commit, already in the loaded records
+            items, store_ids = list(snap.records[store]), list(snap.ids[store])
+            try:
+                for op, position, record in ops:
+                    if op == "remove":
+                        del items[position], store_ids[position]
+                        continue
+                    record = copy.deepcopy(record)
+                    if op == "insert":
+                        items.append(record)
+                        store_ids.append(self._rid(record))
+                    else:
+                        items[position] = record
+                        store_ids[position] = self._rid(record)
+            except IndexError:
+                self._snapshot = _Snapshot()
+                return
+            # copy-on-write so lock-free readers keep a consistent snapshot
+            signature = snap.signature[:slot] + (current,) + snap.signature[slot + 1:]
+            records, ids = dict(snap.records, **{store: items}), dict(snap.ids, **{store: store_ids})
+            self._snapshot = _Snapshot(signature=signature, built=snap.built, records=records, ids=ids,
+                                       by_id=_index(ids))
+
+    def locate(self, req_id) -> Optional[Located]:
+        req_id = str(req_id or "").strip()
+        if not req_id:
+            return None
+        snap = self._current()
+        hit = snap.by_id.get(req_id)
+        if hit is None:
+            return None
+        store, pos = hit
+        return Located(store, pos, dict(snap.records[store][pos]))
+
+    def ids(self, store: str) -> List[str]:
+        """Ids of one store, in list order."""
+
+        return list(self._current().ids.get(store, ()))
@@ -0,0 +1,197 @@
+"""Per-worker aggregates over ``worker_reviews.json``.
+
+The index is built once per file version and maps ``worker_id`` to a
+:class:`ReviewStats` record (average rating, rated count, reviews sorted
+newest-first, latest review and its parsed date). Writers that go through
+``atomic_write_json`` can patch it in place via ``on_commit`` instead of
+forcing a full rebuild; any other change to the file is picked up by the
+``(inode, size, mtime)`` signature check on the next lookup.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .storage import as_collection
+
+Review = Dict[str, Any]
+
+
+def parse_review_date(value: Any) -> datetime | None:
+    """Parse review date strings into datetime objects."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, dt_time.min)
+    if not isinstance(value, str):
+        return None
+    cleaned = value.strip()
+    if not cleaned:
+        return None
+    cleaned = cleaned.replace('Z', '+00:00')
+    try:
+        return datetime.fromisoformat(cleaned)
+    except ValueError:
+        try:
+            base = cleaned.split('.')[0]
+            return datetime.fromisoformat(base)
+        except ValueError:
+            return None
+
+
+def parse_rating(raw: Any) -> float | None:
+    """Numeric rating in the 0..5 range (accepts "4,5"), else ``None``."""
+    if raw is None or isinstance(raw, bool):
+        return None
+    try:
+        val = float(str(raw).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+    return val if 0 <= val <= 5 else None
+
+
+def _sort_key(review: Review) -> Tuple[int, float]:
+    dt = parse_review_date(review.get('date'))
+    if dt is not None:
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        else:
+            dt = dt.astimezone(timezone.utc)
+        return (1, dt.timestamp())
+    return (0, float('-inf'))
+
+
+@dataclass(frozen=True)
+class ReviewStats:
+    worker_id: str
+    rating: Optional[float] = None          # unrounded average
+    rated_count: int = 0
+    reviews: Tuple[Review, ...] = ()        # newest first
+    latest: Optional[Review] = None
+    latest_at: Optional[datetime] = None
+
+    @classmethod
+    def build(cls, worker_id: str, reviews: Iterable[Review]) -> "ReviewStats":
+        ordered = sorted(reviews, key=_sort_key, reverse=True)
+        ratings = [v for v in (parse_rating(r.get('rating')) for r in ordered) if v is not None]
+        latest = ordered[0] if ordered else None
+        return cls(
+            worker_id=worker_id,
+            rating=(sum(ratings) / len(ratings)) if ratings else None,
+            rated_count=len(ratings),
+            reviews=tuple(ordered),
+            latest=latest,
+            latest_at=parse_review_date(latest.get('date')) if latest else None,
+        )
+
+
+_EMPTY = ReviewStats(worker_id='')
+
+
+class ReviewIndex:
+    """Cached review aggregates keyed by ``worker_id``."""
+
+    def __init__(self, source) -> None:
+        """*source* is the worker_reviews.json path or a ``storage.Collection``."""
+        self._source = as_collection(source, "reviews")
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
+        self._loaded = False
+        self._stats: Dict[str, ReviewStats] = {}
+        self._owner: Dict[str, str] = {}  # review_id -> worker_id
+
+    # ---- loading ----
+    def _rebuild(self, signature) -> None:
+        grouped: Dict[str, List[Review]] = {}
+        owner: Dict[str, str] = {}
+        for r in self._source.load() if signature is not None else []:
+            wid = str(r.get('worker_id') or '').strip()
+            if not wid:
+                continue
+            grouped.setdefault(wid, []).append(r)
+            rid = r.get('review_id')
+            if rid:
+                owner[str(rid)] = wid
+        self._stats = {wid: ReviewStats.build(wid, items) for wid, items in grouped.items()}
+        self._owner = owner
+        self._signature = signature
+        self._loaded = True
+
+    def _ensure_fresh(self) -> None:
+        signature = self._source.signature()
+        if self._loaded and signature == self._signature:
+            return
+        with self._lock:
+            signature = self._source.signature()
+            if not self._loaded or signature != self._signature:
+                self._rebuild(signature)
+
+    def invalidate(self) -> None:
+        self._loaded = False
+
+    # ---- lookups ----
+    def stats(self, worker_id) -> ReviewStats:
+        self._ensure_fresh()
+        return self._stats.get(str(worker_id or '').strip(), _EMPTY)
+
+    def reviews_for(self, worker_id) -> List[Review]:
+        """Reviews of one worker, newest first, as shallow copies."""
+        return [dict(r) for r in self.stats(worker_id).reviews]
+
+    def latest_dates(self) -> Dict[str, datetime]:
+        """``worker_id`` -> date of the most recent (parseable) review."""
+        self._ensure_fresh()
+        return {wid: st.latest_at for wid, st in self._stats.items() if st.latest_at}
+
+    # ---- incremental updates (call through atomic_write_json(on_commit=...)) ----
+    def _adopt(self, previous, current) -> bool:
+        """True if the in-memory view matched the file version just replaced."""
+        if self._loaded and self._signature == previous:
+            self._signature = current
+            return True
+        self._loaded = False
+        return False
+
+    def _replace(self, worker_id: str, stats: ReviewStats) -> None:
+        # copy-on-write so lock-free readers never iterate a dict being resized
+        updated = dict(self._stats)
+        updated[worker_id] = stats
+        self._stats = updated
+
+    def record_insert(self, review: Review, previous=None, current=None) -> None:
+        with self._lock:
+            if not self._adopt(previous, current):
+                return
+            wid = str(review.get('worker_id') or '').strip()
+            if not wid:
+                return
+            stored = copy.deepcopy(review)
+            existing = self._stats.get(wid)
+            items = list(existing.reviews) if existing else []
+            items.insert(0, stored)  # same position add_review uses in the file
+            self._replace(wid, ReviewStats.build(wid, items))
+            if stored.get('review_id'):
+                self._owner[str(stored['review_id'])] = wid
+
+    def record_rewrite(self, previous=None, current=None) -> None:
+        """The store was rewritten without changing its content (compaction)."""
+        with self._lock:
+            self._adopt(previous, current)
+
+    def record_patch(self, review_id: str, changes: Dict[str, Any], previous=None, current=None) -> None:
+        with self._lock:
+            if not self._adopt(previous, current):
+                return
+            wid = self._owner.get(str(review_id))
+            existing = self._stats.get(wid) if wid else None
+            if not existing:
+                return
+            patch = copy.deepcopy(changes)
+            items = [dict(r, **patch) if r.get('review_id') == review_id else r for r in existing.reviews]
+            self._replace(wid, ReviewStats.build(wid, items))
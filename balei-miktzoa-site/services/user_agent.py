@@ -0,0 +1,49 @@
+"""User-agent classification for analytics records.
+
+:func:`classify` maps a ``User-Agent`` header to a one-letter code that is
+stored with each analytics event (``"uc"``):
+
+* ``b`` – crawler, link-preview fetcher, monitor or HTTP library (and empty UAs);
+* ``a`` – in-app browser (Facebook, Instagram, TikTok, …);
+* ``m`` – other mobile / tablet browser;
+* ``d`` – everything else (desktop).
+
+The same few hundred strings make up almost all traffic, so results are
+memoized in an LRU cache keyed by the UA string.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+BOT, IN_APP, MOBILE, DESKTOP = "b", "a", "m", "d"
+LABELS = {BOT: "bot", IN_APP: "in-app", MOBILE: "mobile", DESKTOP: "desktop"}
+
+_BOT = re.compile(
+    r"bot\b|bot/|crawl|spider|slurp|archiver|facebookexternalhit|facebookcatalog|whatsapp/|"
+    r"preview|embedly|headless|lighthouse|pagespeed|pingdom|uptime|statuscake|"
+    r"curl/|wget/|python-requests|python-urllib|aiohttp|httpx|go-http-client|okhttp|java/|"
+    r"axios/|node-fetch|undici|scrapy|phantomjs|feedfetcher|mediapartners|google-inspectiontool|"
+    r"googleother|ahrefs|semrush|mj12|bytespider|gptbot|ccbot|chatgpt|perplexity",
+    re.IGNORECASE,
+)
+_IN_APP = re.compile(
+    r"FBAN|FBAV|FB_IAB|Instagram|TikTok|musical_ly|BytedanceWebview|Snapchat|Line/|"
+    r"MicroMessenger|LinkedInApp|Twitter|Pinterest|GSA/|; wv\)",
+)
+_MOBILE = re.compile(r"Mobi|Android|iPhone|iPad|iPod|Windows Phone|Opera Mini|IEMobile|Silk/", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def classify(ua: str) -> str:
+    """One of :data:`BOT`, :data:`IN_APP`, :data:`MOBILE`, :data:`DESKTOP`."""
+
+    ua = (ua or "").strip()
+    if not ua or _BOT.search(ua):
+        return BOT
+    if _IN_APP.search(ua):
+        return IN_APP
+    if _MOBILE.search(ua):
+        return MOBILE
+    return DESKTOP
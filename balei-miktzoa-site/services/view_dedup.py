@@ -0,0 +1,119 @@
+"""Server-side "count this view once per window" dedup.
+
+Profile views are counted at most once per ``window`` seconds for each
+``(sid, worker_id)`` pair. The pairs live in a small SQLite table (WAL mode)
+shared by every app process, so the decision is the same whichever gunicorn
+worker serves the request, and it no longer rides along in the session
+cookie.
+
+* :meth:`ViewDedup.first_seen` is a single atomic upsert: it inserts the key,
+  or refreshes it only if its last counted view is older than the window,
+  and reports whether it did either.
+* An in-process expiring LRU in front of the table answers repeats within
+  the window without touching SQLite.
+* Expired rows are purged every ``purge_every`` seconds, and the table is
+  capped at ``max_entries`` rows (oldest dropped first), so memory and disk
+  use stay bounded however many sessions come by.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    key TEXT PRIMARY KEY,
+    ts  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_ts ON seen(ts);
+"""
+
+
+class ViewDedup:
+    def __init__(
+        self,
+        db_path,
+        window: float = 30 * 60,
+        max_entries: int = 500_000,
+        local_entries: int = 20_000,
+        purge_every: float = 300,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.window = window
+        self.max_entries = max_entries
+        self.local_entries = local_entries
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._recent: "OrderedDict[str, float]" = OrderedDict()  # key -> counted at
+        self._next_purge = time.time() + purge_every
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(sid, worker_id) -> str:
+        return f"{sid}:{worker_id}"
+
+    def first_seen(self, sid, worker_id, now: Optional[float] = None) -> bool:
+        """``True`` if this view should be counted (and remember that it was)."""
+
+        now = time.time() if now is None else now
+        key = self.key(sid, worker_id)
+        with self._lock:
+            counted_at = self._recent.get(key)
+            if counted_at is not None and now - counted_at < self.window:
+                self._recent.move_to_end(key)
+                return False
+
+        cur = self._conn().execute(
+            "INSERT INTO seen(key, ts) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET ts = excluded.ts WHERE seen.ts <= ?",
+            (key, now, now - self.window),
+        )
+        counted = cur.rowcount == 1
+        if not counted:
+            row = self._conn().execute("SELECT ts FROM seen WHERE key = ?", (key,)).fetchone()
+            counted_at = row[0] if row else now
+        else:
+            counted_at = now
+
+        with self._lock:
+            self._recent[key] = counted_at
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.local_entries:
+                self._recent.popitem(last=False)
+            purge = now >= self._next_purge
+            if purge:
+                self._next_purge = now + self.purge_every
+        if purge:
+            self.purge(now)
+        return counted
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Drop expired keys, then the oldest ones beyond ``max_entries``."""
+
+        now = time.time() if now is None else now
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM seen WHERE ts <= ?", (now - self.window,)).rowcount
+        removed += conn.execute(
+            "DELETE FROM seen WHERE key IN (SELECT key FROM seen ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        with self._lock:
+            for key in [k for k, ts in self._recent.items() if now - ts >= self.window]:
+                del self._recent[key]
+        return removed
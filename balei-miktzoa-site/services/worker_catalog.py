@@ -0,0 +1,198 @@
+"""Process-wide, read-mostly view of ``approved.json``.
+
+The catalog parses the file once and keeps lookup tables in memory. It
+reloads only when the file's ``(inode, size, mtime)`` signature changes or
+when ``atomic_write_json`` reports a commit to the same path.
+
+Besides the raw lookups, the catalog keeps a listing index keyed by
+``(field, city)``: which workers the list page shows for a field in a
+city. The app decides how a raw field maps to the listing key and which
+cities a worker covers (base city, active cities, work radius) through
+:meth:`WorkerCatalog.configure`; the index is rebuilt with the rest of the
+snapshot, so list pages and the sitemap cost O(result), not O(catalog).
+
+Lookups hand out shallow copies of the cached records: callers may set
+top-level keys freely (the routes decorate workers for display), but nested
+lists/dicts are shared and must be treated as read-only.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .json_store import register_commit_hook
+from .storage import as_collection
+
+Worker = Dict[str, Any]
+FieldKey = Callable[[Worker], str]
+Coverage = Callable[[Worker], Iterable[str]]
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    signature: Optional[Tuple[int, int, int]]
+    workers: Tuple[Worker, ...] = ()
+    by_id: Dict[str, Worker] = field(default_factory=dict)
+    by_field: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+    by_city: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+    listing_fields: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+    listing: Dict[Tuple[str, str], Tuple[int, ...]] = field(default_factory=dict)
+
+
+def _raw_field(w: Worker) -> str:
+    return (w.get("field") or "").strip()
+
+
+def _declared_cities(w: Worker) -> List[str]:
+    cities = []
+    base_city = (w.get("base_city") or "").strip()
+    if base_city:
+        cities.append(base_city)
+    cities.extend(c.strip() for c in (w.get("active_cities") or []) if isinstance(c, str) and c.strip())
+    return list(dict.fromkeys(cities))
+
+
+def _build_snapshot(signature, records: List[Worker],
+                    field_key: FieldKey = _raw_field,
+                    coverage: Coverage = _declared_cities) -> _Snapshot:
+    by_id: Dict[str, Worker] = {}
+    by_field: Dict[str, List[int]] = {}
+    by_city: Dict[str, List[int]] = {}
+    listing_fields: Dict[str, List[int]] = {}
+    listing: Dict[Tuple[str, str], List[int]] = {}
+
+    for pos, w in enumerate(records):
+        wid = str(w.get("worker_id") or "").strip()
+        if wid and wid not in by_id:
+            by_id[wid] = w
+
+        field_he = _raw_field(w)
+        if field_he:
+            by_field.setdefault(field_he, []).append(pos)
+
+        for city in _declared_cities(w):
+            by_city.setdefault(city, []).append(pos)
+
+        key = (field_key(w) or "").strip()
+        if not key:
+            continue
+        listing_fields.setdefault(key, []).append(pos)
+        for city in dict.fromkeys(c.strip() for c in coverage(w) if c and c.strip()):
+            listing.setdefault((key, city), []).append(pos)
+
+    return _Snapshot(
+        signature=signature,
+        workers=tuple(records),
+        by_id=by_id,
+        by_field={k: tuple(v) for k, v in by_field.items()},
+        by_city={k: tuple(v) for k, v in by_city.items()},
+        listing_fields={k: tuple(v) for k, v in listing_fields.items()},
+        listing={k: tuple(v) for k, v in listing.items()},
+    )
+
+
+class WorkerCatalog:
+    """Cached, indexed access to the approved workers file."""
+
+    def __init__(self, source) -> None:
+        """*source* is the approved.json path or a ``storage.Collection``."""
+
+        self._source = as_collection(source, "workers")
+        self._lock = threading.Lock()
+        self._stale = True
+        self._snapshot = _Snapshot(signature=None)
+        self._field_key: FieldKey = _raw_field
+        self._coverage: Coverage = _declared_cities
+        if self._source.path is not None:
+            register_commit_hook(self._source.path, self._on_commit)
+
+    # ---- cache management ----
+    def _on_commit(self, _path: Path, _data: Any) -> None:
+        self.invalidate()
+
+    def configure(self, field_key: Optional[FieldKey] = None, coverage: Optional[Coverage] = None) -> None:
+        """Set how workers map to listing ``(field, city)`` keys and rebuild.
+
+        ``field_key(worker)`` returns the canonical field name; ``coverage(worker)``
+        returns every city the worker should be listed under.
+        """
+
+        if field_key is not None:
+            self._field_key = field_key
+        if coverage is not None:
+            self._coverage = coverage
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Force the next lookup to re-read the file."""
+
+        self._stale = True
+
+    def _current(self) -> _Snapshot:
+        snap = self._snapshot
+        signature = self._source.signature()
+        if not self._stale and signature == snap.signature:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            signature = self._source.signature()
+            if self._stale or signature != snap.signature:
+                # clear first: a commit landing mid-load marks the cache stale again
+                self._stale = False
+                records = self._source.load() if signature is not None else []
+                snap = _build_snapshot(signature, records, self._field_key, self._coverage)
+                self._snapshot = snap
+            return snap
+
+    @property
+    def version(self) -> Optional[Tuple[int, int, int]]:
+        """File signature of the data currently served (changes on reload)."""
+
+        return self._current().signature
+
+    # ---- lookups ----
+    def all(self) -> List[Worker]:
+        return [dict(w) for w in self._current().workers]
+
+    def get(self, worker_id) -> Optional[Worker]:
+        w = self._current().by_id.get(str(worker_id or "").strip())
+        return dict(w) if w is not None else None
+
+    def by_field(self, field_he: str) -> List[Worker]:
+        snap = self._current()
+        return [dict(snap.workers[i]) for i in snap.by_field.get((field_he or "").strip(), ())]
+
+    def by_city(self, city_he: str) -> List[Worker]:
+        snap = self._current()
+        return [dict(snap.workers[i]) for i in snap.by_city.get((city_he or "").strip(), ())]
+
+    @staticmethod
+    def _listed(snap: _Snapshot, field_he: str, city_he: Optional[str]) -> Tuple[int, ...]:
+        field_he = (field_he or "").strip()
+        if city_he:
+            return snap.listing.get((field_he, city_he.strip()), ())
+        return snap.listing_fields.get(field_he, ())
+
+    def listing(self, field_he: str, city_he: Optional[str] = None) -> List[Worker]:
+        """Workers listed under a canonical field (and city), in file order."""
+
+        snap = self._current()
+        return [dict(snap.workers[i]) for i in self._listed(snap, field_he, city_he)]
+
+    def listing_ids(self, field_he: str, city_he: Optional[str] = None) -> List[str]:
+        snap = self._current()
+        return [str(snap.workers[i].get("worker_id") or "") for i in self._listed(snap, field_he, city_he)]
+
+    def listing_fields(self) -> List[str]:
+        return list(self._current().listing_fields)
+
+    def listing_pairs(self) -> List[Tuple[str, str]]:
+        """Every ``(field, city)`` combination with at least one worker."""
+
+        return list(self._current().listing)
+
+    def __len__(self) -> int:
+        return len(self._current().workers)
@@ -0,0 +1,61 @@
+import importlib.util
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """``app.clean.py`` loaded once, with its side files and background threads kept out of the tree."""
+
+    tmp = tmp_path_factory.mktemp("app")
+    env = {
+        "FLASK_ENV": "development",
+        "LOG_MAINTENANCE_SECONDS": "0",
+        "REVIEW_JOURNAL_COMPACT_SECONDS": "0",
+        "VIEW_DEDUP_DB": str(tmp / "view_dedup.sqlite3"),
+        "DESCRIPTION_JOBS_DB": str(tmp / "jobs.sqlite3"),
+        "IMG_CACHE_DIR": str(tmp / "img_cache"),
+    }
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location("app_clean", ROOT / "app.clean.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    module.OG_IMAGES_READY = True  # no OG image generation into static/
+    module.app.config["TESTING"] = True
+    return module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def static_dir(app_module, monkeypatch, tmp_path):
+    root = tmp_path / "static"
+    root.mkdir()
+    Image.new("RGB", (64, 48), (200, 30, 30)).save(root / "photo.jpg", "JPEG")
+    (root / "site.css").write_text("body { color: red }\n", encoding="utf-8")
+    stamp = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    for name in ("photo.jpg", "site.css"):
+        os.utime(root / name, (stamp, stamp))
+    monkeypatch.setattr(app_module.app, "static_folder", str(root))
+    monkeypatch.setattr(app_module, "STATIC_DIR", str(root))
+    return root
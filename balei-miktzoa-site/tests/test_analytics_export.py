@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import analytics_export, analytics_rollup
+from services.analytics_rollup import AnalyticsRollups
+
+
+def _log(path, *events):
+    with path.open("a", encoding="utf-8") as f:
+        for event, wid in events:
+            f.write(json.dumps({"ts": "t", "event": event, "worker_id": wid, "path": "/w", "sid": "secret"}) + "\n")
+
+
+def _rollups(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-05")
+    _log(tmp_path / "2025-09-01.jsonl", ("view", "10"), ("view", "2"), ("click_call", "2"))
+    _log(tmp_path / "2025-09-02.jsonl", ("view", "2"))
+    _log(tmp_path / "2025-09-04.jsonl", ("click_whatsapp", "2"))
+    return AnalyticsRollups(tmp_path)
+
+
+def test_worker_rows_as_csv_in_chunks(tmp_path, monkeypatch):
+    rollups = _rollups(tmp_path, monkeypatch)
+    rows = analytics_export.worker_rows(rollups, date(2025, 9, 1), date(2025, 9, 2), names={"2": "חשמל בע\"מ"})
+    chunks = list(analytics_export.encode(rows, "csv", analytics_export.WORKER_FIELDS, chunk_rows=1))
+    assert chunks[0].startswith("﻿day,worker_id,name")
+    parsed = list(csv.DictReader(io.StringIO("".join(chunks).lstrip("﻿"))))
+    assert [(r["day"], r["worker_id"]) for r in parsed] == [("2025-09-01", "2"), ("2025-09-01", "10"), ("2025-09-02", "2")]
+    assert parsed[0]["name"] == "חשמל בע\"מ"
+    assert parsed[0]["ctr_call"] == "100.0"
+
+
+def test_event_rows_as_ndjson_without_session_ids(tmp_path, monkeypatch):
+    rollups = _rollups(tmp_path, monkeypatch)
+    rows = analytics_export.event_rows(rollups, date(2025, 9, 2), date(2025, 9, 30), worker_ids=["2"])
+    lines = "".join(analytics_export.encode(rows, "ndjson", analytics_export.EVENT_FIELDS)).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r["event"] for r in records] == ["view", "click_whatsapp"]
+    assert all("sid" not in r for r in records)
+
+
+def test_worker_export_leaves_the_memo_alone_and_escapes_formulas(tmp_path, monkeypatch):
+    rollups = _rollups(tmp_path, monkeypatch)
+    names = {"2": "=HYPERLINK(\"http://x\")", "10": "@SUM(A1)"}
+    rows = analytics_export.worker_rows(rollups, date(2025, 9, 1), date(2025, 9, 30), names=names)
+    text = "".join(analytics_export.encode(rows, "csv", analytics_export.WORKER_FIELDS)).lstrip("﻿")
+    assert rollups._memo == {}
+
+    parsed = list(csv.DictReader(io.StringIO(text)))
+    assert {r["name"] for r in parsed} == {"'=HYPERLINK(\"http://x\")", "'@SUM(A1)"}
+    assert analytics_export.csv_safe("-1+1") == "'-1+1"
+    assert analytics_export.csv_safe("\tx") == "'\tx"
+    assert analytics_export.csv_safe(-3) == -3
+    assert analytics_export.csv_safe("חשמלאי") == "חשמלאי"
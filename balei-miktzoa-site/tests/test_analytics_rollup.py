@@ -0,0 +1,164 @@
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import analytics_rollup
+from services.analytics_rollup import AnalyticsRollups
+
+
+def _log(path, *events):
+    with path.open("a", encoding="utf-8") as f:
+        for event, wid, page, *sid in events:
+            f.write(json.dumps({"event": event, "worker_id": wid, "path": page, "sid": (sid or [None])[0]}) + "\n")
+
+
+def test_closed_days_are_rolled_up_once_and_rebuilt_on_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-03")
+    _log(tmp_path / "2025-09-01.jsonl", ("view", "1", "/a"), ("view", "1", "/a"), ("click_call", "1", "/a"))
+    _log(tmp_path / "2025-09-02.jsonl", ("click_whatsapp", "2", "/b"), ("bogus", "2", "/b"))
+    _log(tmp_path / "2025-09-03.jsonl", ("view", "2", "/b"))
+    rollups = AnalyticsRollups(tmp_path)
+
+    month = rollups.month("2025-09")
+    assert month["workers"] == {"1": {"views": 2, "calls": 1, "wa": 0}, "2": {"views": 1, "calls": 0, "wa": 1}}
+    assert month["paths"]["/b"] == {"views": 1, "calls": 0, "wa": 1}
+    # closed days are materialized, the live day is not
+    assert sorted(p.name for p in (tmp_path / "rollups").iterdir()) == ["2025-09-01.json", "2025-09-02.json"]
+
+    # a fresh instance answers closed days from the rollups without reading the logs
+    seen = []
+    real = analytics_rollup.summarize_file
+    monkeypatch.setattr(analytics_rollup, "summarize_file", lambda p: (seen.extend(Path(x).name for x in p), real(p))[1])
+    fresh = AnalyticsRollups(tmp_path)
+    assert analytics_rollup.totals(fresh.all_time()) == {"views": 3, "calls": 1, "wa": 1, "visitors": 0, "clickers": 0}
+    assert seen == ["2025-09-03.jsonl"]
+
+    # a late append to a closed day rebuilds just that day
+    _log(tmp_path / "2025-09-01.jsonl", ("view", "3", "/c"))
+    assert fresh.day("2025-09-01")["workers"]["3"]["views"] == 1
+    assert fresh.month("2025-09")["workers"]["3"]["views"] == 1
+    assert fresh.months() == ["2025-09"]
+
+
+def test_unique_sessions_are_merged_across_days(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-10-01")
+    # sessions s0..s299 view worker 1 on both days; s0..s9 also click on day two
+    _log(tmp_path / "2025-09-01.jsonl", *[("view", "1", "/a", f"s{i}") for i in range(300)])
+    _log(tmp_path / "2025-09-02.jsonl", *[("view", "1", "/a", f"s{i}") for i in range(150, 450)],
+         *[("click_call", "1", "/a", f"s{i}") for i in range(10)], ("view", "2", "/b", "s0"))
+    rollups = AnalyticsRollups(tmp_path)
+
+    month = rollups.month("2025-09")
+    site = analytics_rollup.totals(month)
+    assert site["views"] == 601 and abs(site["visitors"] - 450) <= 450 * 0.1
+    assert site["clickers"] == 10
+    per_worker = analytics_rollup.worker_uniques(month)
+    assert abs(per_worker["1"]["visitors"] - 450) <= 45 and per_worker["2"] == {"visitors": 1, "clickers": 0}
+    # sketches survive the round trip through a rollup file
+    assert analytics_rollup.worker_uniques(AnalyticsRollups(tmp_path).all_time()) == per_worker
+
+
+def test_build_materializes_closed_days(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-02")
+    _log(tmp_path / "2025-09-01.jsonl", ("view", "1", "/a"))
+    _log(tmp_path / "2025-09-02.jsonl", ("view", "1", "/a"))
+    rollups = AnalyticsRollups(tmp_path)
+
+    assert rollups.build() == 1
+    assert rollups.build() == 0
+    assert rollups.build(force=True) == 1
+
+
+def test_mmap_scan_skips_torn_lines_and_parallel_matches_serial(tmp_path):
+    (tmp_path / "empty.jsonl").write_bytes(b"")
+    (tmp_path / "torn.jsonl").write_bytes(
+        b'{"event":"view","worker_id":"1","path":"/a"}\r\n\n{"event":"vi\n[1]\n'
+        b'{"event":"click_call","worker_id":"1","path":"/a"}'  # no trailing newline
+    )
+    assert [e["event"] for e in analytics_rollup.iter_events(tmp_path / "torn.jsonl")] == ["view", "click_call"]
+    assert list(analytics_rollup.iter_events(tmp_path / "empty.jsonl")) == []
+
+    paths = []
+    for day in range(1, 5):
+        path = tmp_path / f"2025-09-0{day}.jsonl"
+        _log(path, *[("view", str(i % 3), f"/p{i % 2}") for i in range(day * 10)])
+        paths.append(path)
+    assert analytics_rollup.scan(paths, workers=2) == analytics_rollup.scan(paths, workers=1)
+
+
+def test_request_path_reads_never_start_a_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-20")
+    for day in range(1, 13):
+        _log(tmp_path / f"2025-09-{day:02d}.jsonl", ("view", "1", "/a"))
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started on the request path")
+
+    monkeypatch.setattr(analytics_rollup, "ProcessPoolExecutor", no_pool)
+    rollups = AnalyticsRollups(tmp_path, workers=4, parallel_min_days=2)
+    assert analytics_rollup.totals(rollups.all_time())["views"] == 12
+    assert rollups.month("2025-09")["workers"]["1"]["views"] == 12
+
+
+def _year_of_rollups(directory, workers=200, events_per_day=2000):
+    """365 closed days of stored rollups (the logs already rotated away)."""
+
+    rng = random.Random(7)
+    templates, visitors = [], set()
+    for week_day in range(7):
+        events = [{"event": rng.choice(("view", "view", "view", "click_call", "click_whatsapp")),
+                   "worker_id": str(rng.randrange(workers)), "path": f"/w/{rng.randrange(50)}",
+                   "sid": f"s{week_day}-{rng.randrange(800)}", "uc": "m"} for _ in range(events_per_day)]
+        templates.append(analytics_rollup.summarize(events))
+        visitors.update(e["sid"] for e in events if e["event"] == "view")
+    rollups = AnalyticsRollups(directory)
+    first = date(2024, 1, 1)
+    for offset in range(365):
+        rollups._write_rollup((first + timedelta(days=offset)).isoformat(), None, templates[offset % 7])
+    return rollups, templates, len(visitors)
+
+
+def test_all_time_over_a_year_of_history_stays_fast(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-01-01")
+    rollups, templates, visitors = _year_of_rollups(tmp_path)
+
+    start = time.perf_counter()
+    summary = rollups.all_time()
+    cold = time.perf_counter() - start
+
+    expected_views = sum(analytics_rollup.totals(templates[i % 7])["views"] for i in range(365))
+    totals = analytics_rollup.totals(summary)
+    assert totals["views"] == expected_views
+    assert abs(totals["visitors"] - visitors) / visitors < 0.1
+    # was ~14 s with a per-register Python loop in HyperLogLog.merge
+    assert cold < 8, f"all_time() over a year took {cold:.1f}s"
+
+
+def test_all_time_only_merges_the_current_month_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-01-02")
+    rollups, _, _ = _year_of_rollups(tmp_path, workers=20, events_per_day=100)
+    _log(tmp_path / "2025-01-02.jsonl", ("view", "1", "/a", "live-1"))
+    first = rollups.all_time()
+    assert rollups.all_time() is first
+
+    merged = []
+    real_merge = analytics_rollup.merge
+
+    def counting_merge(summaries):
+        summaries = list(summaries)
+        merged.extend(summaries)
+        return real_merge(summaries)
+
+    monkeypatch.setattr(analytics_rollup, "merge", counting_merge)
+    _log(tmp_path / "2025-01-02.jsonl", ("view", "1", "/a", "live-2"))
+    again = rollups.all_time()
+    assert analytics_rollup.totals(again)["views"] == analytics_rollup.totals(first)["views"] + 1
+    # today's day summary, then the closed months (one memoized summary) plus January
+    assert len(merged) == 1 + 2
@@ -0,0 +1,55 @@
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import analytics_rollup
+from services.analytics_rollup import AnalyticsRollups
+from services.analytics_series import SeriesIndex
+
+
+def _log(path, *events):
+    with path.open("a", encoding="utf-8") as f:
+        for event, wid in events:
+            f.write(json.dumps({"event": event, "worker_id": wid, "path": "/w"}) + "\n")
+
+
+def test_daily_and_weekly_buckets_include_the_live_day(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-03")
+    _log(tmp_path / "2025-08-31.jsonl", ("view", "1"), ("view", "1"), ("click_call", "1"))  # Sunday
+    _log(tmp_path / "2025-09-01.jsonl", ("view", "1"), ("click_whatsapp", "1"), ("view", "2"))
+    _log(tmp_path / "2025-09-03.jsonl", ("view", "1"))
+    index = SeriesIndex(AnalyticsRollups(tmp_path))
+
+    daily = index.query(["1", "9"], date(2025, 8, 30), date(2025, 9, 3))
+    assert daily["buckets"] == ["2025-08-30", "2025-08-31", "2025-09-01", "2025-09-02", "2025-09-03"]
+    one = daily["workers"]["1"]
+    assert one["views"] == [0, 2, 1, 0, 1]
+    assert one["ctr_call"] == [0.0, 50.0, 0.0, 0.0, 0.0]
+    assert one["totals"] == {"views": 4, "calls": 1, "wa": 1}
+    assert daily["workers"]["9"]["views"] == [0] * 5
+
+    weekly = index.query(["1"], date(2025, 8, 30), date(2025, 9, 3), bucket="week")
+    assert weekly["buckets"] == ["2025-08-25", "2025-09-01"]
+    assert weekly["workers"]["1"]["views"] == [2, 2]
+    assert weekly["workers"]["1"]["wa"] == [0, 1]
+
+
+def test_timeline_is_rebuilt_when_a_closed_day_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-03")
+    _log(tmp_path / "2025-09-01.jsonl", ("view", "2"))
+    index = SeriesIndex(AnalyticsRollups(tmp_path))
+    assert index.query(["2"], date(2025, 9, 1), date(2025, 9, 30), "month")["workers"]["2"]["views"] == [1]
+    first = index._timeline
+    index.query(["2"], date(2025, 9, 1), date(2025, 9, 2))
+    assert index._timeline is first
+
+    _log(tmp_path / "2025-09-02.jsonl", ("view", "2"), ("click_call", "2"))
+    monthly = index.query(["2"], date(2025, 9, 1), date(2025, 9, 30), "month")
+    assert monthly["buckets"] == ["2025-09"]
+    assert monthly["workers"]["2"]["views"] == [2]
+    assert monthly["workers"]["2"]["ctr_call"] == [50.0]
@@ -0,0 +1,83 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from werkzeug.http import http_date
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _touch(path, when):
+    os.utime(path, (when.timestamp(), when.timestamp()))
+
+
+def test_img_etag_and_last_modified_give_304(client, static_dir):
+    url = "/img/photo.jpg?w=32&format=jpg"
+    first = client.get(url)
+    assert first.status_code == 200 and first.data
+    assert first.headers["Cache-Control"] == IMMUTABLE
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.data == b""
+    assert r.headers["ETag"] == etag
+
+    r = client.get(url, headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 304
+
+    # other output parameters are another variant with another validator
+    r = client.get("/img/photo.jpg?w=32&format=png", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+
+
+def test_img_changed_source_gives_200(client, static_dir):
+    url = "/img/photo.jpg?w=32&format=jpg"
+    first = client.get(url)
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+
+    _touch(static_dir / "photo.jpg", datetime(2025, 6, 1, tzinfo=timezone.utc))
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.data
+    assert r.headers["ETag"] != etag
+    r = client.get(url, headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 200
+
+
+def test_static_etag_and_last_modified_give_304(client, static_dir):
+    first = client.get("/static/site.css")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "public, no-cache"
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+
+    r = client.get("/static/site.css", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.data == b""
+    r = client.get("/static/site.css", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 304
+
+    r = client.get("/static/site.css", headers={"If-None-Match": '"something-else"'})
+    assert r.status_code == 200
+    older = http_date(datetime(2025, 1, 1, tzinfo=timezone.utc) - timedelta(days=1))
+    r = client.get("/static/site.css", headers={"If-Modified-Since": older})
+    assert r.status_code == 200
+
+
+def test_static_changed_file_gives_200(client, static_dir):
+    first = client.get("/static/site.css")
+    etag = first.headers["ETag"]
+
+    (static_dir / "site.css").write_text("body { color: blue }\n", encoding="utf-8")
+    r = client.get("/static/site.css", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.data == b"body { color: blue }\n"
+
+
+def test_versioned_static_urls_are_immutable(client, static_dir, app_module):
+    with app_module.app.test_request_context():
+        url = app_module.static_url("site.css")
+    assert url.endswith(f"?v={app_module.ASSETS_V}")
+
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"] == IMMUTABLE
+    r = client.get(url, headers={"If-None-Match": r.headers["ETag"]})
+    assert r.status_code == 304
+    assert r.headers["Cache-Control"] == IMMUTABLE
@@ -0,0 +1,48 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.event_log import BufferedEventWriter
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_batches_are_written_per_file_on_flush(tmp_path, monkeypatch):
+    writer = BufferedEventWriter(batch_size=100, flush_interval=60)
+    writes = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda p, *a, **kw: (writes.append(Path(p).name), real_open(p, *a, **kw))[1])
+
+    for i in range(5):
+        assert writer.submit(tmp_path / "a.jsonl", {"n": i})
+    writer.submit(tmp_path / "b.jsonl", {"n": 99})
+    assert writer.stats()["queued"] == 6  # nothing due yet
+
+    assert writer.flush(timeout=5)
+    assert [r["n"] for r in _lines(tmp_path / "a.jsonl")] == [0, 1, 2, 3, 4]
+    assert sorted(writes) == ["a.jsonl", "b.jsonl"]
+    assert writer.stats()["written"] == 6
+    writer.close()
+    assert not writer.submit(tmp_path / "a.jsonl", {"n": 5})
+
+
+def test_full_queue_applies_the_drop_policy(tmp_path):
+    for policy, expected in (("drop_new", [0, 1]), ("drop_oldest", [2, 3])):
+        writer = BufferedEventWriter(max_queue=2, flush_interval=60, policy=policy)
+        writer._ensure_thread = lambda: None  # keep the drainer stopped while filling the queue
+        path = tmp_path / f"{policy}.jsonl"
+        results = [writer.submit(path, {"n": i}) for i in range(4)]
+        del writer._ensure_thread
+        assert writer.flush(timeout=5)
+
+        stats = writer.stats()
+        assert stats["dropped"] == 2 and stats["written"] == 2
+        assert results == ([True, True, False, False] if policy == "drop_new" else [True] * 4)
+        assert [r["n"] for r in _lines(path)] == expected
+        writer.close()
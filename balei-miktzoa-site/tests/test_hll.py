@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.hll import HyperLogLog
+
+
+def test_estimates_and_unions_within_error():
+    a = HyperLogLog().update(f"a{i}" for i in range(20000))
+    b = HyperLogLog().update(f"a{i}" for i in range(10000, 30000))
+    assert abs(a.count() - 20000) / 20000 < 0.1
+    union = a.copy().merge(b)
+    assert abs(union.count() - 30000) / 30000 < 0.1
+    assert a.count() <= union.count()
+
+    small = HyperLogLog().update(["x", "y", "x", "z"])
+    assert small.count() == 3
+    assert HyperLogLog().count() == 0
+
+
+def test_serialization_round_trip_sparse_and_dense():
+    small = HyperLogLog().update(range(5))
+    big = HyperLogLog().update(range(5000))
+    assert small.to_str().startswith("s10:") and big.to_str().startswith("d10:")
+    for sketch in (small, big):
+        assert HyperLogLog.from_str(sketch.to_str()).registers == sketch.registers
+
+
+def test_merge_is_the_register_wise_max():
+    a = HyperLogLog(6).update(range(0, 300, 3))
+    b = HyperLogLog(6).update(range(0, 300, 7))
+    expected = bytearray(map(max, a.registers, b.registers))
+    assert a.copy().merge(b).registers == expected == b.copy().merge(a).registers
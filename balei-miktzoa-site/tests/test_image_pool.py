@@ -0,0 +1,55 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.image_pool import ImagePool, PoolBusy
+
+
+def test_identical_keys_share_one_job():
+    pool = ImagePool(workers=1, max_pending=4)
+    gate = threading.Event()
+    calls = []
+
+    def render(name):
+        calls.append(name)
+        gate.wait(5)
+        return name.upper()
+
+    first = pool.submit("k", render, "a")
+    second = pool.submit("k", render, "a")
+    assert first is second
+    gate.set()
+    assert pool.run("k2", render, "b") == "B"
+    assert first.result(5) == "A"
+    assert calls == ["a", "b"]
+    assert pool.stats()["deduped"] == 1
+
+
+def test_full_pool_and_slow_jobs_raise_busy():
+    pool = ImagePool(workers=1, max_pending=1, wait=0.05)
+    gate = threading.Event()
+    pool.submit("slow", gate.wait, 5)
+    with pytest.raises(PoolBusy):
+        pool.submit("other", lambda: None)
+    with pytest.raises(PoolBusy):
+        pool.run("slow", gate.wait, 5)  # joins the job in flight, which outlasts `wait`
+    gate.set()
+    stats = pool.stats()
+    assert (stats["rejected"], stats["timeouts"]) == (1, 1)
+
+
+def test_job_errors_propagate_and_free_the_slot():
+    pool = ImagePool(workers=1, max_pending=1)
+
+    def boom():
+        raise ValueError("bad image")
+
+    with pytest.raises(ValueError):
+        pool.run("k", boom)
+    assert pool.run("k", lambda: 42) == 42
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageStat
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import image_variants
+from services.image_variants import VariantCache, render_variant
+
+
+def test_render_variant_cover_and_contain(tmp_path):
+    src = tmp_path / "src.png"
+    Image.new("RGBA", (400, 200), (10, 20, 30, 128)).save(src)
+
+    from io import BytesIO
+    with Image.open(BytesIO(render_variant(src, 100, 100, "cover", 80, "JPEG"))) as im:
+        assert (im.format, im.size, im.mode) == ("JPEG", (100, 100), "RGB")
+    with Image.open(BytesIO(render_variant(src, 100, 100, "contain", 80, "WEBP", webp_method=0))) as im:
+        assert (im.format, im.size) == ("WEBP", (100, 50))
+
+
+def test_keys_follow_source_and_params(tmp_path):
+    src = tmp_path / "a.jpg"
+    src.write_bytes(b"x")
+    st = os.stat(src)
+    cache = VariantCache(tmp_path / "cache")
+    base = cache.key(src, st, 100, None, "cover", 80, "WEBP")
+    assert base == cache.key(src, st, 100, None, "cover", 80, "WEBP")
+    assert base != cache.key(src, st, 100, None, "cover", 81, "WEBP")
+    assert base != cache.key(src, st, 100, None, "cover", 80, "JPEG")
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert base != cache.key(src, os.stat(src), 100, None, "cover", 80, "WEBP")
+
+
+def test_put_get_and_lru_eviction(tmp_path):
+    cache = VariantCache(tmp_path / "cache", max_bytes=250, low_water=0.8)
+    now = time.time()
+    for i, key in enumerate(("aa01", "bb02")):
+        path = cache.put(key, "JPEG", b"x" * 100)
+        os.utime(path, (now - 1000 + i, now - 1000 + i))
+    assert cache.get("aa01", "JPEG").read_bytes() == b"x" * 100  # refreshes aa01
+    assert cache.get("zz99", "JPEG") is None
+
+    cache.put("cc03", "JPEG", b"y" * 100)  # 300 > 250: evict the least recently used down to 200
+    assert cache.get("bb02", "JPEG") is None
+    assert cache.get("aa01", "JPEG") is not None
+    assert cache.get("cc03", "JPEG") is not None
+
+
+def test_sizes_and_quality_snap_to_steps():
+    steps = image_variants.parse_steps("640, 320,bogus", (100,))
+    assert steps == (100,)
+    steps = image_variants.parse_steps(" 640,320 ,1200", (100,))
+    assert steps == (320, 640, 1200)
+    assert image_variants.snap_size(321, None, steps) == (640, None)
+    assert image_variants.snap_size(5000, 2500, steps) == (1200, 600)  # ratio kept, clamped
+    assert image_variants.snap_size(None, 200, steps) == (None, 320)
+    assert image_variants.snap_size(-5, 0, steps) == (None, None)
+    assert image_variants.snap_size(320, 240, steps) == (320, 240)  # 4:3 is kept exactly
+    assert image_variants.snap_size(320, 90000, steps) == (320, 960)  # tallest ratio
+    assert image_variants.snap(77, (50, 75, 80), up=False) == 75
+    assert image_variants.snap(99, (50, 75, 80), up=False) == 80
+
+
+def test_jpeg_fast_path_matches_full_decode(tmp_path):
+    src = tmp_path / "big.jpg"
+    Image.linear_gradient("L").resize((1600, 1000)).convert("RGB").save(src, quality=90)
+
+    from io import BytesIO
+    for fit, size in (("cover", (200, 150)), ("contain", (200, 200))):
+        fast = render_variant(src, size[0], size[1], fit, 85, "JPEG")
+        slow = render_variant(src, size[0], size[1], fit, 85, "JPEG", fast=False)
+        with Image.open(BytesIO(fast)) as a, Image.open(BytesIO(slow)) as b:
+            assert a.size == b.size
+            diff = ImageChops.difference(a.convert("L"), b.convert("L"))
+            assert ImageStat.Stat(diff).mean[0] < 3
+
+
+def test_snapped_sizes_stay_bounded_whatever_the_height():
+    steps = image_variants.DEFAULT_WIDTHS
+    sizes = {image_variants.snap_size(160, h, steps) for h in range(1, 5000)}
+    assert len(sizes) <= len(image_variants.ASPECT_RATIOS)
+    assert max(h for _, h in sizes) <= steps[-1]
+    every = {image_variants.snap_size(w, h, steps) for w in range(1, 3000, 31) for h in range(1, 100000, 331)}
+    assert len(every) <= len(steps) * len(image_variants.ASPECT_RATIOS)
+    assert all(h <= steps[-1] for _, h in every)
@@ -0,0 +1,34 @@
+from services.image_pool import PoolBusy
+
+
+def _assert_plain_error(resp, status):
+    assert resp.status_code == status
+    assert resp.headers["Content-Type"].startswith("text/plain")
+    assert "immutable" not in resp.headers.get("Cache-Control", "")
+    assert resp.headers["X-Which-Route"] == "/img"
+
+
+def test_missing_source_is_a_plain_404(client, static_dir):
+    r = client.get("/img/nope.jpg?w=160", headers={"Accept": "image/webp"})
+    _assert_plain_error(r, 404)
+
+
+def test_busy_pool_is_a_plain_503(client, static_dir, app_module, monkeypatch):
+    def busy(*args, **kwargs):
+        raise PoolBusy("full")
+
+    monkeypatch.setattr(app_module.IMG_POOL, "run", busy)
+    r = client.get("/img/photo.jpg?w=240&format=jpg")
+    _assert_plain_error(r, 503)
+    assert r.headers["Retry-After"] == app_module.IMG_RETRY_AFTER
+    assert r.headers["Cache-Control"] == "no-store"
+    assert r.data == b"Image service busy, retry shortly"
+
+
+def test_render_failure_is_a_plain_500(client, static_dir, app_module, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("truncated file")
+
+    monkeypatch.setattr(app_module, "render_variant", broken)
+    r = client.get("/img/photo.jpg?w=320&format=webp")
+    _assert_plain_error(r, 500)
@@ -0,0 +1,82 @@
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.job_store import JobStore
+
+
+def test_start_reuses_the_live_job_of_a_request(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3", kind="description")
+    job, created = store.start("req1", "pending")
+    again, created_again = store.start("req1", "pending")
+
+    assert created and not created_again
+    assert again["job_id"] == job["job_id"] and again["status"] == "queued"
+    # another process opening the same file sees the same job
+    other = JobStore(tmp_path / "jobs.sqlite3", kind="description")
+    assert other.latest_for("req1")["job_id"] == job["job_id"]
+
+    assert store.transition(job["job_id"], "done", result={"he": "תיאור"}, generated_at="2024-01-01")
+    _, created = store.start("req1", "pending")
+    assert created
+
+
+def test_transition_only_from_expected_states(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job, _ = store.start("req1")
+
+    assert store.transition(job["job_id"], "running", expected=("queued",))
+    assert not store.transition(job["job_id"], "running", expected=("queued",))
+    assert store.transition(job["job_id"], "error", error="boom")
+    assert not store.transition(job["job_id"], "done", result={"x": 1})
+
+    saved = store.get(job["job_id"])
+    assert saved["status"] == "error" and saved["error"] == "boom" and saved["result"] is None
+
+
+def test_prune_and_ttl_hide_old_jobs(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3", ttl=60)
+    job, _ = store.start("req1")
+    assert store.transition(job["job_id"], "done", result={"ok": True})
+    assert store.latest_for("req1") is not None
+
+    store._conn().execute("UPDATE jobs SET updated_at = updated_at - 120")
+    assert store.latest_for("req1") is None
+    assert store.prune() == 1
+    assert store.get(job["job_id"]) is None
+
+
+def test_prune_keeps_running_jobs_until_they_are_stale(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3", ttl=60, stale_after=300)
+    job, _ = store.start("req1")
+    assert store.transition(job["job_id"], "running", expected=("queued",))
+
+    store._conn().execute("UPDATE jobs SET updated_at = updated_at - 120")
+    assert store.prune() == 0
+    assert store.get(job["job_id"])["status"] == "running"
+
+    store._conn().execute("UPDATE jobs SET updated_at = updated_at - 300")
+    assert store.prune() == 1
+    assert store.get(job["job_id"]) is None
+
+
+def test_heartbeat_keeps_a_long_running_job_alive(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3", ttl=60, stale_after=0.3)
+    job, _ = store.start("req1")
+    assert store.transition(job["job_id"], "running", expected=("queued",))
+
+    with store.keepalive(job["job_id"], interval=0.05):
+        time.sleep(0.6)  # twice stale_after without a status change
+        assert store.prune(max_age=0) == 0
+        again, created = store.start("req1")
+        assert not created and again["job_id"] == job["job_id"]
+
+    assert store.transition(job["job_id"], "done")
+    assert not store.heartbeat(job["job_id"])
+    time.sleep(0.4)
+    again, created = store.start("req1")
+    assert created  # the finished job no longer blocks a new one
@@ -0,0 +1,38 @@
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import json_codec
+
+SAMPLE = {"name": "חשמלאי", "tags": ["a", "ב"], 7: None, "when": datetime(2025, 1, 2, 3, 4, 5)}
+
+
+@pytest.fixture(params=["native", "stdlib"])
+def codec(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_codec, "orjson", None)
+    elif json_codec.orjson is None:
+        pytest.skip("orjson not installed")
+    return json_codec
+
+
+def test_output_matches_stdlib_layouts(codec):
+    compact = json.dumps(SAMPLE, ensure_ascii=False, separators=(",", ":"), default=str)
+    pretty = json.dumps(SAMPLE, ensure_ascii=False, indent=2, default=str)
+    assert codec.dumps(SAMPLE, pretty=False, default=str) == compact
+    assert codec.dumps(SAMPLE, pretty=True, default=str) == pretty
+    assert codec.dumps_bytes(SAMPLE, pretty=False, default=str) == compact.encode("utf-8")
+
+
+def test_loads_accepts_text_and_bytes_and_raises_stdlib_errors(codec):
+    assert codec.loads('{"a": [1]}') == codec.loads(b'{"a": [1]}') == {"a": [1]}
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(b"{broken")
+    assert codec.to_plain({"when": SAMPLE["when"]}) == {"when": "2025-01-02 03:04:05"}
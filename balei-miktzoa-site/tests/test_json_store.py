@@ -0,0 +1,105 @@
+import json
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import json_store
+from services.json_store import atomic_write_json, read_json
+
+
+def _bump(path: str, times: int) -> None:
+    for _ in range(times):
+        with atomic_write_json(Path(path), default_factory=dict) as data:
+            data["n"] = data.get("n", 0) + 1
+
+
+@pytest.mark.skipif(json_store.fcntl is None, reason="needs fcntl")
+def test_writers_in_separate_processes_do_not_lose_updates(tmp_path):
+    path = tmp_path / "counter.json"
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_bump, args=(str(path), 25)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+
+    assert all(p.exitcode == 0 for p in procs)
+    assert json.loads(path.read_text(encoding="utf-8"))["n"] == 100
+
+
+def test_read_json_defaults_and_nested_read_inside_write(tmp_path):
+    path = tmp_path / "items.json"
+    assert read_json(path, default_factory=list) == []
+
+    with atomic_write_json(path, default_factory=list) as items:
+        items.append(1)
+        # reading the same file while holding the write lock must not deadlock
+        assert read_json(path, default_factory=list) == []
+
+    assert read_json(path, default_factory=list) == [1]
+    path.write_text("{broken", encoding="utf-8")
+    assert read_json(path, default_factory=list) == []
+
+
+def test_group_commit_coalesces_concurrent_mutations(tmp_path, monkeypatch):
+    path = tmp_path / "items.json"
+    writes = []
+    real_replace = json_store.os.replace
+    monkeypatch.setattr(json_store.os, "replace", lambda a, b: (writes.append(b), real_replace(a, b)))
+
+    writer = json_store.GroupCommitWriter(window=0.05)
+    commits = []
+    futures = [
+        writer.submit(path, lambda data, i=i: data.append(i) or i, list,
+                      on_commit=lambda prev, cur: commits.append((prev, cur)))
+        for i in range(10)
+    ]
+    futures.append(writer.submit(path, lambda data: 1 / 0, list))
+
+    assert [f.result(timeout=5) for f in futures[:10]] == list(range(10))
+    with pytest.raises(ZeroDivisionError):
+        futures[10].result(timeout=5)
+    assert json.loads(path.read_text(encoding="utf-8")) == list(range(10))
+    assert len(writes) == 1
+    # the first callback sees the replaced version, the rest the new one
+    assert commits[0][0] is None and all(prev == commits[0][1] for prev, _ in commits[1:])
+
+
+def test_group_commit_drops_partial_edits_of_a_failed_mutation(tmp_path):
+    path = tmp_path / "items.json"
+    writer = json_store.GroupCommitWriter(window=0.05)
+
+    def half_done(data):
+        data["a"]["n"] = 99
+        data["b"] = "leaked"
+        raise ValueError("validation failed")
+
+    ok_before = writer.submit(path, lambda data: dict(data.setdefault("a", {"n": 1})))
+    failed = writer.submit(path, half_done)
+    ok_after = writer.submit(path, lambda data: data.setdefault("c", 3))
+
+    assert ok_before.result(timeout=5) == {"n": 1}
+    with pytest.raises(ValueError):
+        failed.result(timeout=5)
+    assert ok_after.result(timeout=5) == 3
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": {"n": 1}, "c": 3}
+
+
+def test_group_commit_snapshots_once_per_batch(tmp_path, monkeypatch):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(list(range(100))), encoding="utf-8")
+    copies = []
+    real_deepcopy = json_store.copy.deepcopy
+    monkeypatch.setattr(json_store.copy, "deepcopy", lambda obj: copies.append(1) or real_deepcopy(obj))
+
+    writer = json_store.GroupCommitWriter(window=0.05)
+    futures = [writer.submit(path, lambda data, i=i: data.append(i), list) for i in range(20)]
+    for f in futures:
+        f.result(timeout=5)
+    assert len(copies) == 1
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import analytics_rollup, log_rotation
+from services.analytics_rollup import AnalyticsRollups
+from services.log_rotation import LogMaintenance
+
+
+def _log(path, *workers):
+    with path.open("a", encoding="utf-8") as f:
+        for wid in workers:
+            f.write(json.dumps({"event": "view", "worker_id": wid, "path": "/"}) + "\n")
+
+
+def _age(path, seconds=7200):
+    st = path.stat()
+    os.utime(path, (st.st_atime - seconds, st.st_mtime - seconds))
+
+
+def test_closed_days_are_compressed_and_still_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-03")
+    for day in ("2025-09-01", "2025-09-02", "2025-09-03"):
+        _log(tmp_path / f"{day}.jsonl", "1", "2")
+        _age(tmp_path / f"{day}.jsonl")
+    maintenance = LogMaintenance(tmp_path, codec="gzip")
+
+    report = maintenance.run(today=date(2025, 9, 3))
+    assert sorted(p.name for p in report["compressed"]) == ["2025-09-01.jsonl.gz", "2025-09-02.jsonl.gz"]
+    assert (tmp_path / "2025-09-03.jsonl").exists() and not (tmp_path / "2025-09-01.jsonl").exists()
+
+    # a late append to a compressed day lands in a new plain file, then in the archive
+    _log(tmp_path / "2025-09-01.jsonl", "3")
+    rollups = AnalyticsRollups(tmp_path)
+    assert set(rollups.day("2025-09-01")["workers"]) == {"1", "2", "3"}
+    _age(tmp_path / "2025-09-01.jsonl")
+    maintenance.run(today=date(2025, 9, 3))
+    assert [e["worker_id"] for e in rollups.events("2025-09-01")] == ["1", "2", "3"]
+    assert gzip.decompress((tmp_path / "2025-09-01.jsonl.gz").read_bytes()).count(b"\n") == 3
+    assert analytics_rollup.totals(rollups.all_time())["views"] == 7
+
+
+def test_retention_keeps_rollups_and_rolls_the_events_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_rollup, "_today", lambda: "2025-09-10")
+    _log(tmp_path / "2025-09-01.jsonl", "1")
+    _log(tmp_path / "2025-09-09.jsonl", "1")
+    AnalyticsRollups(tmp_path).build()
+    events = tmp_path / "events.log"
+    events.write_text("x" * 100)
+    old = tmp_path / "events-2025-08-01.log.gz"
+    old.write_bytes(b"")
+
+    report = LogMaintenance(
+        tmp_path, rollup_dir=tmp_path / "rollups", rolling_logs=(events,), codec="none",
+        analytics_retain_days=5, rolling_retain_days=30, rolling_max_bytes=10,
+    ).run(today=date(2025, 9, 10))
+
+    assert {p.name for p in report["removed"]} == {"2025-09-01.jsonl", "events-2025-08-01.log.gz"}
+    today = datetime.now(timezone.utc).date().isoformat()  # the log was last written today
+    assert [p.name for p in report["rolled"]] == [f"events-{today}.log"]
+    assert not events.exists()
+    # the day's raw log is gone but its rollup still counts
+    assert AnalyticsRollups(tmp_path).month("2025-09")["workers"]["1"]["views"] == 2
+
+
+def test_roll_log_numbers_several_rolls_a_day(tmp_path):
+    log = tmp_path / "events.log"
+    names = []
+    for _ in range(2):
+        log.write_text("line\n")
+        names.append(log_rotation.roll_log(log, 1, "gzip").name)
+    today = datetime.now(timezone.utc).date().isoformat()
+    assert names == [f"events-{today}.log.gz", f"events-{today}-1.log.gz"]
+
+
+def test_rolled_events_logs_are_kept_by_default(tmp_path):
+    events = tmp_path / "events.log"
+    old = tmp_path / "events-2020-01-01.log.gz"
+    old.write_bytes(b"")
+
+    report = LogMaintenance(tmp_path, rolling_logs=(events,), codec="none").run(today=date(2025, 9, 10))
+
+    assert report["removed"] == []
+    assert old.exists()
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.request_registry import RequestRegistry
+from services.storage import JsonRepository
+
+
+def _id_for(item):
+    return str(item.get("worker_id") or item.get("request_id") or "")
+
+
+def test_locates_by_stable_id_and_follows_writes(tmp_path):
+    repo = JsonRepository(tmp_path)
+    repo.insert("pending", {"request_id": "p1", "name": "a"})
+    repo.insert("pending", {"request_id": "p2", "name": "b"})
+    repo.insert("workers", {"worker_id": "7", "request_id": "p0"})
+    registry = RequestRegistry(
+        {"pending": repo.collection("pending"), "approved": repo.collection("workers")}, _id_for
+    )
+
+    hit = registry.locate("p2")
+    assert (hit.store, hit.position, hit.record["name"]) == ("pending", 1, "b")
+    assert registry.locate("7").store == "approved"
+    assert registry.locate("missing") is None
+
+    hit.record["name"] = "changed"
+    assert registry.locate("p2").record["name"] == "b"
+
+    with repo.mutate("pending") as items:
+        items.pop(0)
+    assert registry.locate("p2").position == 0
+    assert registry.locate("p1") is None
+    assert registry.ids("pending") == ["p2"]
+
+
+def test_edits_patch_the_map_without_reloading(tmp_path):
+    repo = JsonRepository(tmp_path)
+    repo.insert("pending", {"request_id": "p1"})
+    repo.insert("pending", {"request_id": "p2"})
+    loads = []
+    pending = repo.collection("pending")
+    original_load = pending.load
+    pending.load = lambda: loads.append(1) or original_load()
+    registry = RequestRegistry({"pending": pending, "approved": repo.collection("workers")}, _id_for)
+    assert registry.locate("p2").position == 1
+    assert len(loads) == 1
+
+    edit = registry.edit("pending")
+    with repo.mutate("pending", on_commit=edit.on_commit) as items:
+        items.pop(0)
+        edit.removed(0)
+    edit = registry.edit("pending")
+    new = {"request_id": "p3"}
+    edit.inserted(new)
+    repo.insert("pending", new, on_commit=edit.on_commit)
+    edit = registry.edit("approved")
+    worker = {"request_id": "p9"}
+    edit.inserted(worker)
+    repo.insert("workers", worker, assign_id="worker_id", on_commit=edit.on_commit)
+
+    assert registry.ids("pending") == ["p2", "p3"]
+    assert registry.locate("p3").position == 1
+    assert registry.locate("1").record == {"request_id": "p9", "worker_id": "1"}
+    assert len(loads) == 1
+
+    # a write that does not go through an edit is still picked up
+    with repo.mutate("pending") as items:
+        items.append({"request_id": "p4"})
+    assert registry.locate("p4").position == 2
+    assert len(loads) == 2
@@ -0,0 +1,67 @@
+import functools
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.json_store import atomic_write_json
+from services.review_index import ReviewIndex
+
+
+def _seed(path):
+    path.write_text(json.dumps([
+        {"review_id": "a", "worker_id": "1", "rating": 5, "date": "2025-01-01T10:00:00"},
+        {"review_id": "b", "worker_id": "1", "rating": "4,0", "date": "2025-03-01T10:00:00"},
+        {"review_id": "c", "worker_id": "2", "rating": None, "date": "2025-02-01T10:00:00"},
+    ]), encoding="utf-8")
+
+
+def test_aggregates_per_worker(tmp_path):
+    path = tmp_path / "worker_reviews.json"
+    _seed(path)
+    index = ReviewIndex(path)
+
+    stats = index.stats("1")
+    assert stats.rated_count == 2
+    assert stats.rating == 4.5
+    assert [r["review_id"] for r in stats.reviews] == ["b", "a"]
+    assert stats.latest["review_id"] == "b"
+    assert index.stats("2").rated_count == 0
+    assert index.stats("missing").reviews == ()
+    assert set(index.latest_dates()) == {"1", "2"}
+
+
+def test_incremental_insert_and_patch(tmp_path):
+    path = tmp_path / "worker_reviews.json"
+    _seed(path)
+    index = ReviewIndex(path)
+    index.stats("1")
+
+    review = {"review_id": "d", "worker_id": "1", "rating": 3, "date": "2025-04-01T10:00:00"}
+    with atomic_write_json(path, default_factory=list,
+                           on_commit=functools.partial(index.record_insert, review)) as rows:
+        rows.insert(0, review)
+
+    stats = index.stats("1")
+    assert stats.rated_count == 3
+    assert stats.latest["review_id"] == "d"
+
+    changes = {"translations": {"en": "ok"}}
+    with atomic_write_json(path, default_factory=list,
+                           on_commit=functools.partial(index.record_patch, "d", changes)) as rows:
+        rows[0].update(changes)
+
+    assert index.stats("1").latest["translations"] == {"en": "ok"}
+
+
+def test_external_change_triggers_rebuild(tmp_path):
+    path = tmp_path / "worker_reviews.json"
+    _seed(path)
+    index = ReviewIndex(path)
+    assert index.stats("2").reviews
+
+    path.write_text("[]", encoding="utf-8")
+    assert index.stats("1").reviews == ()
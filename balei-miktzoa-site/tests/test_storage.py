@@ -0,0 +1,111 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.review_index import ReviewIndex
+from services.storage import JsonRepository, SqliteRepository, StorageError, copy_collections
+from services.worker_catalog import WorkerCatalog
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "json":
+        return JsonRepository(tmp_path)
+    return SqliteRepository(tmp_path / "site.sqlite3")
+
+
+def test_insert_order_and_assigned_ids(repo):
+    repo.insert("workers", {"worker_id": "7", "field": "חשמלאים"})
+    added = repo.insert("workers", {"field": "שיפוצים"}, assign_id="worker_id")
+    assert added["worker_id"] == "8"
+
+    repo.insert("reviews", {"review_id": "a", "worker_id": "7"}, first=True)
+    repo.insert("reviews", {"review_id": "b", "worker_id": "7"}, first=True)
+    assert [r["review_id"] for r in repo.load("reviews")] == ["b", "a"]
+    assert [w["worker_id"] for w in repo.find("workers", field="שיפוצים")] == ["8"]
+
+
+def test_update_and_mutate_bump_signature(repo):
+    repo.insert("reviews", {"review_id": "a", "worker_id": "1", "text": "x"})
+    seen = []
+    before = repo.signature("reviews")
+    repo.update("reviews", {"review_id": "a"}, {"text": "y"}, on_commit=lambda p, c: seen.append((p, c)))
+    assert repo.load("reviews")[0]["text"] == "y"
+    assert seen and seen[0][0] == before and seen[0][1] == repo.signature("reviews")
+
+    with repo.mutate("reviews") as items:
+        items.append({"review_id": "b", "worker_id": "2"})
+        items.pop(0)
+    assert [r["review_id"] for r in repo.load("reviews")] == ["b"]
+
+
+def test_caches_follow_sqlite_writes(tmp_path):
+    repo = SqliteRepository(tmp_path / "site.sqlite3")
+    catalog = WorkerCatalog(repo.collection("workers"))
+    index = ReviewIndex(repo.collection("reviews"))
+    assert len(catalog) == 0
+
+    repo.insert("workers", {"field": "חשמלאים"}, assign_id="worker_id")
+    repo.insert("reviews", {"review_id": "r", "worker_id": "1", "rating": 4, "date": "2025-01-01"}, first=True)
+
+    assert catalog.get("1")["field"] == "חשמלאים"
+    assert index.stats("1").rated_count == 1
+
+
+def test_round_trip_between_backends(tmp_path):
+    src = tmp_path / "json"
+    src.mkdir()
+    (src / "approved.json").write_text(json.dumps([{"worker_id": "1", "field": "חשמלאים"}]), encoding="utf-8")
+    (src / "worker_reviews.json").write_text(json.dumps([{"review_id": "r", "worker_id": "1"}]), encoding="utf-8")
+
+    db = SqliteRepository(tmp_path / "site.sqlite3")
+    counts = copy_collections(JsonRepository(src), db)
+    assert counts == {"workers": 1, "pending": 0, "reviews": 1}
+
+    out = tmp_path / "export"
+    copy_collections(db, JsonRepository(out))
+    assert json.loads((out / "approved.json").read_text(encoding="utf-8")) == [{"worker_id": "1", "field": "חשמלאים"}]
+
+
+def test_sqlite_rejects_unindexed_filters(tmp_path):
+    repo = SqliteRepository(tmp_path / "site.sqlite3")
+    with pytest.raises(StorageError):
+        repo.find("workers", phone="050")
+
+
+def test_review_journal_merges_and_compacts(tmp_path):
+    repo = JsonRepository(tmp_path)
+    snapshot = tmp_path / "worker_reviews.json"
+    snapshot.write_text(json.dumps([{"review_id": "a", "worker_id": "1"}]), encoding="utf-8")
+    index = ReviewIndex(repo.collection("reviews"))
+    assert len(index.stats("1").reviews) == 1
+
+    review = {"review_id": "b", "worker_id": "1", "rating": 5, "date": "2025-05-01"}
+    repo.insert("reviews", review, first=True, on_commit=lambda p, c: index.record_insert(review, p, c))
+    repo.update("reviews", {"review_id": "b"}, {"translations": {"en": "hi"}})
+
+    # the snapshot is untouched; the merged view has both writes
+    assert json.loads(snapshot.read_text(encoding="utf-8")) == [{"review_id": "a", "worker_id": "1"}]
+    assert [r["review_id"] for r in repo.load("reviews")] == ["b", "a"]
+    assert repo.load("reviews")[0]["translations"] == {"en": "hi"}
+    assert index.stats("1").latest["review_id"] == "b"
+
+    assert repo.compact("reviews") == 2
+    assert repo.journal_for("reviews").stat().st_size == 0
+    assert [r["review_id"] for r in json.loads(snapshot.read_text(encoding="utf-8"))] == ["b", "a"]
+
+
+def test_journal_replay_is_idempotent(tmp_path):
+    repo = JsonRepository(tmp_path)
+    repo.insert("reviews", {"review_id": "a", "worker_id": "1"})
+    journal = repo.journal_for("reviews").read_text(encoding="utf-8")
+    repo.compact("reviews")
+    # simulate a crash after the snapshot rewrite but before the truncate
+    repo.journal_for("reviews").write_text(journal, encoding="utf-8")
+    assert [r["review_id"] for r in repo.load("reviews")] == ["a"]
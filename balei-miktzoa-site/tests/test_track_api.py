@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def logged(app_module, monkeypatch):
+    calls = []
+
+    def fake_log(event, worker_id, page_path=None):
+        calls.append((event, worker_id, page_path))
+        return event != "view" or worker_id != "dup"
+
+    monkeypatch.setattr(app_module, "log_analytics_event", fake_log)
+    return calls
+
+
+def test_normalize_accepts_single_list_and_envelope(app_module):
+    normalize = app_module._normalize_track_events
+
+    assert normalize({"event": "view", "worker_id": 7}, "/ref") == ([("view", "7", "/ref")], 0)
+    assert normalize([{"event": "click_call", "worker_id": "1", "path": "/p"}], "/ref") == (
+        [("click_call", "1", "/p")], 0)
+
+    events, rejected = normalize({"path": "/he/worker/2", "events": [
+        {"event": "view", "worker_id": "2"},
+        {"event": "click_whatsapp", "worker_id": "2", "path": "/other"},
+        {"event": "bogus", "worker_id": "2"},
+        {"event": "view"},
+        "not-an-object",
+    ]}, "/ref")
+    assert events == [("view", "2", "/he/worker/2"), ("click_whatsapp", "2", "/other")]
+    assert rejected == 3
+
+
+def test_normalize_caps_the_batch(app_module):
+    batch = [{"event": "view", "worker_id": str(i)} for i in range(app_module.TRACK_MAX_BATCH + 7)]
+    events, rejected = app_module._normalize_track_events(batch, "/")
+    assert len(events) == app_module.TRACK_MAX_BATCH
+    assert rejected == 7
+
+
+def test_track_accepts_a_batch(client, logged):
+    r = client.post("/api/track", json={"path": "/he/worker/5", "events": [
+        {"event": "view", "worker_id": "5"},
+        {"event": "click_call", "worker_id": "5"},
+        {"event": "view", "worker_id": "dup"},
+        {"event": "nope", "worker_id": "5"},
+    ]})
+    assert r.status_code == 200
+    assert r.json == {"ok": True, "accepted": 3, "logged": 2, "rejected": 1}
+    assert logged == [("view", "5", "/he/worker/5"), ("click_call", "5", "/he/worker/5"),
+                      ("view", "dup", "/he/worker/5")]
+
+
+def test_track_reads_beacon_bodies_and_referer(client, logged):
+    r = client.post("/api/track", data=json.dumps({"event": "click_whatsapp", "worker_id": "3"}),
+                    content_type="text/plain;charset=UTF-8",
+                    headers={"Referer": "https://example.com/en/worker/3?x=1"})
+    assert r.status_code == 200 and r.json["accepted"] == 1
+    assert logged == [("click_whatsapp", "3", "/en/worker/3?x=1")]
+
+
+def test_track_oversized_batch_is_truncated(client, app_module, logged):
+    batch = [{"event": "view", "worker_id": str(i)} for i in range(app_module.TRACK_MAX_BATCH * 2)]
+    r = client.post("/api/track", json=batch)
+    assert r.status_code == 200
+    assert r.json["accepted"] == app_module.TRACK_MAX_BATCH
+    assert r.json["rejected"] == app_module.TRACK_MAX_BATCH
+    assert len(logged) == app_module.TRACK_MAX_BATCH
+
+
+@pytest.mark.parametrize("body, content_type", [
+    ("not json", "text/plain"),
+    ("", "application/json"),
+    ("{}", "application/json"),
+    ("[]", "application/json"),
+    ('{"events": [{"event": "bogus", "worker_id": "1"}, 5]}', "application/json"),
+])
+def test_track_bad_bodies_are_400(client, logged, body, content_type):
+    r = client.post("/api/track", data=body, content_type=content_type)
+    assert r.status_code == 400
+    assert r.json["ok"] is False and r.json["error"] == "bad_request"
+    assert logged == []
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import analytics_rollup, user_agent
+from services.user_agent import BOT, DESKTOP, IN_APP, MOBILE, classify
+
+IPHONE_FB = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Mobile/15E148 [FBAN/FBIOS;FBAV/440.0.0.31.105]"
+)
+ANDROID = "Mozilla/5.0 (Linux; Android 13; SM-S911B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0 Mobile Safari/537.36"
+WINDOWS = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+def test_classify_codes_and_cache():
+    assert classify("Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)") == BOT
+    assert classify("facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)") == BOT
+    assert classify("WhatsApp/2.23.20.0") == BOT
+    assert classify("") == BOT
+    assert classify(IPHONE_FB) == IN_APP
+    assert classify(ANDROID) == MOBILE
+    assert classify(WINDOWS) == DESKTOP
+
+    user_agent.classify.cache_clear()
+    for _ in range(3):
+        classify(WINDOWS)
+    assert user_agent.classify.cache_info().hits == 2
+
+
+def test_summaries_leave_bots_out():
+    events = [
+        {"event": "view", "worker_id": "1", "path": "/w/1", "sid": "s1", "uc": MOBILE},
+        {"event": "view", "worker_id": "1", "path": "/w/1", "sid": "s2", "uc": BOT},
+        # older records carry only the raw user agent
+        {"event": "click_call", "worker_id": "1", "path": "/w/1", "sid": "s3", "ua": "Slackbot-LinkExpanding 1.0"},
+        {"event": "click_call", "worker_id": "1", "path": "/w/1", "sid": "s1", "ua": WINDOWS},
+    ]
+    summary = analytics_rollup.summarize(events)
+    assert summary["workers"] == {"1": {"views": 1, "calls": 1, "wa": 0}}
+    assert summary["bots"] == {"views": 1, "calls": 1}
+
+    merged = analytics_rollup.merge([summary, summary])
+    assert analytics_rollup.bot_hits(merged) == 4
+    assert analytics_rollup.totals(merged)["visitors"] == 1
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.view_dedup import ViewDedup
+
+
+def test_views_count_once_per_window_across_instances(tmp_path):
+    db = tmp_path / "dedup.sqlite3"
+    a = ViewDedup(db, window=60)
+    b = ViewDedup(db, window=60)  # another process sharing the file
+
+    assert a.first_seen("s1", "7", now=1000)
+    assert not a.first_seen("s1", "7", now=1010)
+    assert not b.first_seen("s1", "7", now=1020)
+    assert b.first_seen("s1", "8", now=1020)
+    assert b.first_seen("s2", "7", now=1020)
+    # the window is measured from the last counted view
+    assert a.first_seen("s1", "7", now=1061)
+    assert not b.first_seen("s1", "7", now=1100)
+
+
+def test_purge_bounds_the_table(tmp_path):
+    dedup = ViewDedup(tmp_path / "dedup.sqlite3", window=60, max_entries=3, local_entries=2)
+    for i in range(5):
+        dedup.first_seen(f"s{i}", "1", now=1000 + i)
+    assert len(dedup._recent) == 2
+
+    assert dedup.purge(now=1004) == 2  # over the cap: the two oldest go
+    assert dedup.purge(now=1063) == 2  # expired
+    assert dedup._conn().execute("SELECT key FROM seen").fetchall() == [("s4:1",)]
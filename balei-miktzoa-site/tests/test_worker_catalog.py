@@ -0,0 +1,73 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.json_store import atomic_write_json
+from services.worker_catalog import WorkerCatalog
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_lookups_by_id_field_and_city(tmp_path):
+    path = tmp_path / "approved.json"
+    _write(path, [
+        {"worker_id": "1", "field": "חשמלאים", "base_city": "תל אביב", "active_cities": ["תל אביב", "חיפה"]},
+        {"worker_id": "2", "field": "אינסטלטורים", "base_city": "חיפה"},
+    ])
+    catalog = WorkerCatalog(path)
+
+    assert catalog.get(1)["field"] == "חשמלאים"
+    assert catalog.get("missing") is None
+    assert [w["worker_id"] for w in catalog.by_field("חשמלאים")] == ["1"]
+    assert [w["worker_id"] for w in catalog.by_city("חיפה")] == ["1", "2"]
+
+
+def test_returned_records_do_not_leak_mutations(tmp_path):
+    path = tmp_path / "approved.json"
+    _write(path, [{"worker_id": "1", "field": "חשמלאים"}])
+    catalog = WorkerCatalog(path)
+
+    catalog.get("1")["rating"] = 5
+    assert "rating" not in catalog.get("1")
+
+
+def test_reloads_after_atomic_write(tmp_path):
+    path = tmp_path / "approved.json"
+    _write(path, [{"worker_id": "1", "field": "חשמלאים"}])
+    catalog = WorkerCatalog(path)
+    assert len(catalog) == 1
+
+    with atomic_write_json(path, default_factory=list) as records:
+        records.append({"worker_id": "2", "field": "חשמלאים"})
+
+    assert len(catalog) == 2
+    assert catalog.get("2") is not None
+
+
+def test_listing_index_uses_configured_field_and_coverage(tmp_path):
+    path = tmp_path / "approved.json"
+    _write(path, [
+        {"worker_id": "1", "field": "חשמלאי", "base_city": "תל אביב", "work_radius": 10},
+        {"worker_id": "2", "field": "חשמלאים", "base_city": "חיפה", "active_cities": ["תל אביב"]},
+    ])
+    nearby = {"תל אביב": ["רמת גן"]}
+    catalog = WorkerCatalog(path)
+    catalog.configure(
+        field_key=lambda w: {"חשמלאי": "חשמלאים"}.get(w.get("field"), w.get("field")),
+        coverage=lambda w: [w.get("base_city"), *w.get("active_cities", []),
+                            *(nearby.get(w.get("base_city"), []) if w.get("work_radius") else [])],
+    )
+
+    assert catalog.listing_ids("חשמלאים") == ["1", "2"]
+    assert catalog.listing_ids("חשמלאים", "תל אביב") == ["1", "2"]
+    assert catalog.listing_ids("חשמלאים", "רמת גן") == ["1"]
+    assert [w["worker_id"] for w in catalog.listing("חשמלאים", "חיפה")] == ["2"]
+    assert set(catalog.listing_pairs()) == {
+        ("חשמלאים", "תל אביב"), ("חשמלאים", "רמת גן"), ("חשמלאים", "חיפה"),
+    }